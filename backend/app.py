@@ -1,36 +1,164 @@
+from utils.startup import StartupReport
 from flask import Flask
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from config import Config
-from database.db import init_db
+from database.db import db, init_db
 from routes.auth_routes import auth_bp
 from routes.message_routes import message_bp
 from routes.user_routes import user_bp
-from services.socket_service import SocketServer
+from routes.conversation_routes import conversation_bp
+from routes.attachment_routes import attachment_bp
+from routes.group_routes import group_bp
+from utils.health import RequestCapacity
+from services.rate_limiter import RateLimiter
+from services.expiry_sweeper import ExpirySweeper
+from services.message_archive import MessageArchive
+from services.message_archiver import MessageArchiver
+from services.attachment_store import AttachmentStore
+from services.request_profiler import RequestProfiler
+from sqlalchemy import text
 import threading
+import os
 
 def create_app(config_class=Config):
     """Application factory"""
+    startup = StartupReport()
+    startup.mark('imports')
+    
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.extensions['startup'] = startup
+    capacity = RequestCapacity(app.config['API_THREADS'])
+    app.extensions['capacity'] = capacity
     
     # Initialize extensions
     CORS(app, origins=app.config['CORS_ORIGINS'])
     JWTManager(app)
+    if app.config['RATE_LIMIT_ENABLED']:
+        app.extensions['rate_limiter'] = RateLimiter.from_config(app.config)
+    startup.mark('extensions')
     
     # Initialize database
     init_db(app)
+    startup.mark('database')
+    
+    # Registered before the other request hooks so the whole request is measured
+    profiler = None
+    if app.config['REQUEST_PROFILING_ENABLED']:
+        os.makedirs(app.instance_path, exist_ok=True)
+        profiler = RequestProfiler.from_config(
+            app.config, os.path.join(app.instance_path, app.config['REQUEST_PROFILE_LOG'])
+        )
+        with app.app_context():
+            profiler.install(app, db.engine)
+        app.extensions['request_profiler'] = profiler
+    
+    # Started on the first request, i.e. after any pre-fork, in every worker
+    sweeper = None
+    if app.config['MESSAGE_SWEEPER_ENABLED']:
+        sweeper = ExpirySweeper(
+            app,
+            interval=app.config['MESSAGE_SWEEP_INTERVAL'],
+            batch_size=app.config['MESSAGE_SWEEP_BATCH']
+        )
+        app.extensions['expiry_sweeper'] = sweeper
+    
+    # Relative archive paths sit next to the SQLite database in the instance folder
+    archive = MessageArchive(os.path.join(app.instance_path, app.config['MESSAGE_ARCHIVE_DIR']))
+    app.extensions['message_archive'] = archive
+    archiver = MessageArchiver(
+        app,
+        archive,
+        retention_days=app.config['MESSAGE_RETENTION_DAYS'],
+        interval=app.config['MESSAGE_ARCHIVE_INTERVAL'],
+        segment_size=app.config['MESSAGE_ARCHIVE_SEGMENT_SIZE'],
+        batch_size=app.config['MESSAGE_SWEEP_BATCH']
+    )
+    app.extensions['message_archiver'] = archiver
+    app.extensions['attachment_store'] = AttachmentStore(
+        os.path.join(app.instance_path, app.config['ATTACHMENT_DIR'])
+    )
     
     # Register blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(message_bp)
     app.register_blueprint(user_bp)
+    app.register_blueprint(conversation_bp)
+    app.register_blueprint(attachment_bp)
+    app.register_blueprint(group_bp)
     
     # Health check endpoint
     @app.route('/api/health', methods=['GET'])
     def health_check():
         return {'status': 'healthy', 'message': 'SecureLink API is running'}, 200
     
+    @app.route('/api/ready', methods=['GET'])
+    def readiness_check():
+        """Readiness: database reachable and request threads to spare"""
+        checks = {'capacity': capacity.to_dict()}
+        ready = checks['capacity']['available'] > 0
+        
+        try:
+            db.session.execute(text('SELECT 1'))
+            checks['database'] = 'ok'
+        except Exception as e:
+            checks['database'] = f'error: {e}'
+            ready = False
+        
+        socket_server = app.extensions.get('socket_server')
+        if socket_server:
+            connections = socket_server.connection_metrics()
+            socket_ready = socket_server.ready.is_set() and \
+                connections['connections'] < connections['max_connections']
+            checks['socket'] = {'ready': socket_ready, 'connections': connections['connections'],
+                                'max_connections': connections['max_connections']}
+            ready = ready and socket_ready
+        
+        return {'status': 'ready' if ready else 'unavailable', 'checks': checks}, 200 if ready else 503
+    
+    @app.route('/api/socket/metrics', methods=['GET'])
+    def socket_metrics():
+        socket_server = app.extensions.get('socket_server')
+        if not socket_server or not socket_server.running:
+            return {'error': 'Socket server is not running in this process'}, 503
+        return {
+            'connections': socket_server.connection_metrics(),
+            'queues': socket_server.queue_metrics(),
+            'deliveries': socket_server.delivery_metrics()
+        }, 200
+    
+    @app.route('/api/rate-limits/metrics', methods=['GET'])
+    def rate_limit_metrics():
+        limiter = app.extensions.get('rate_limiter')
+        if not limiter:
+            return {'error': 'Rate limiting is disabled'}, 503
+        return {'rate_limits': limiter.metrics()}, 200
+    
+    @app.route('/api/profiling/metrics', methods=['GET'])
+    def profiling_metrics():
+        if not profiler:
+            return {'error': 'Request profiling is disabled'}, 503
+        return {'profiling': profiler.metrics()}, 200
+    
+    @app.route('/api/startup', methods=['GET'])
+    def startup_report():
+        return {'startup': startup.to_dict()}, 200
+    
+    @app.before_request
+    def track_request():
+        capacity.begin()
+        if startup.time_to_first_request is None:
+            startup.first_request()
+            if sweeper:
+                sweeper.start()
+            if app.config['MESSAGE_ARCHIVER_ENABLED']:
+                archiver.start()
+    
+    @app.teardown_request
+    def untrack_request(exc):
+        capacity.end()
+    
     @app.route('/', methods=['GET'])
     def index():
         return {
@@ -41,19 +169,50 @@ def create_app(config_class=Config):
                 'auth': '/api/auth/*',
                 'messages': '/api/messages/*',
                 'users': '/api/users/*',
-                'health': '/api/health'
+                'conversations': '/api/conversations',
+                'attachments': '/api/attachments/*',
+                'groups': '/api/groups/*',
+                'health': '/api/health',
+                'ready': '/api/ready'
             }
         }, 200
     
+    startup.mark('routes')
+    app.logger.info(f"App ready in {startup.total() * 1000:.1f} ms")
     return app
 
 def start_socket_server(app):
     """Start the socket server in a separate thread"""
+    from services.socket_service import SocketServer
+    
+    # Relative delivery paths sit in the instance folder, shared with a standalone socket_server.py
+    delivery_path = app.config['SOCKET_DELIVERY_PATH']
+    if delivery_path:
+        os.makedirs(app.instance_path, exist_ok=True)
+        delivery_path = os.path.join(app.instance_path, delivery_path)
+    
+    # The RSA keypair is generated on the accept thread, so this returns immediately
     socket_server = SocketServer(
         host=app.config['SOCKET_HOST'],
-        port=app.config['SOCKET_PORT']
+        port=app.config['SOCKET_PORT'],
+        queue_max_bytes=app.config['SOCKET_QUEUE_MAX_BYTES'],
+        queue_max_age=app.config['SOCKET_QUEUE_MAX_AGE'],
+        heartbeat_interval=app.config['SOCKET_HEARTBEAT_INTERVAL'],
+        idle_timeout=app.config['SOCKET_IDLE_TIMEOUT'],
+        handshake_timeout=app.config['SOCKET_HANDSHAKE_TIMEOUT'],
+        max_connections=app.config['SOCKET_MAX_CONNECTIONS'],
+        max_connections_per_ip=app.config['SOCKET_MAX_CONNECTIONS_PER_IP'],
+        jwt_secret=app.config['JWT_SECRET_KEY'],
+        require_auth=app.config['SOCKET_REQUIRE_AUTH'],
+        delivery_path=delivery_path,
+        delivery_max_per_user=app.config['SOCKET_DELIVERY_MAX_PER_USER'],
+        delivery_max_age=app.config['SOCKET_DELIVERY_MAX_AGE'],
+        delivery_batch=app.config['SOCKET_DELIVERY_BATCH'],
+        drain_timeout=app.config['SOCKET_DRAIN_TIMEOUT'],
+        reconnect_window=app.config['SOCKET_RECONNECT_WINDOW']
     )
     socket_server.start()
+    app.extensions['socket_server'] = socket_server
     return socket_server
 
 if __name__ == '__main__':
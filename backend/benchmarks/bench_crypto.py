@@ -0,0 +1,90 @@
+import os
+from services.crypto_service import CryptoService
+from benchmarks.harness import run_benchmark
+
+PAYLOAD_SIZES = [64, 1024, 16 * 1024, 256 * 1024]
+
+# RSA-OAEP-SHA256 with a 2048-bit key can wrap at most 190 bytes
+RSA_PAYLOAD_SIZES = [32, 190]
+
+
+def run(min_time=1.0, payload_sizes=None):
+    """
+    Benchmark every CryptoService primitive
+
+    Args:
+        min_time (float): Seconds to spend on each benchmark
+        payload_sizes (list): Payload sizes in bytes for the size-dependent primitives
+
+    Returns:
+        list: BenchmarkResult objects
+    """
+    sizes = payload_sizes or PAYLOAD_SIZES
+    results = []
+
+    results.append(run_benchmark(
+        'crypto.generate_aes_key', 'crypto',
+        lambda _: CryptoService.generate_aes_key(), min_time=min_time
+    ))
+    results.append(run_benchmark(
+        'crypto.generate_iv', 'crypto',
+        lambda _: CryptoService.generate_iv(), min_time=min_time
+    ))
+    results.append(run_benchmark(
+        'crypto.generate_rsa_keypair', 'crypto',
+        lambda _: CryptoService.generate_rsa_keypair(), min_time=min_time, max_iterations=50
+    ))
+
+    key = CryptoService.generate_aes_key()
+    iv = CryptoService.generate_iv()
+    hmac_key = os.urandom(32)
+    private_pem, public_pem = CryptoService.generate_rsa_keypair()
+
+    for size in sizes:
+        params = {'payload_bytes': size}
+        plaintext = 'a' * size
+        raw = os.urandom(size)
+        ciphertext = CryptoService.encrypt_aes(plaintext, key, iv)
+        signature = CryptoService.generate_hmac(raw, hmac_key)
+        encoded = CryptoService.encode_base64(raw)
+
+        results.append(run_benchmark(
+            f'crypto.encrypt_aes[{size}]', 'crypto',
+            lambda _: CryptoService.encrypt_aes(plaintext, key, iv), params, min_time
+        ))
+        results.append(run_benchmark(
+            f'crypto.decrypt_aes[{size}]', 'crypto',
+            lambda _: CryptoService.decrypt_aes(ciphertext, key, iv), params, min_time
+        ))
+        results.append(run_benchmark(
+            f'crypto.generate_hmac[{size}]', 'crypto',
+            lambda _: CryptoService.generate_hmac(raw, hmac_key), params, min_time
+        ))
+        results.append(run_benchmark(
+            f'crypto.verify_hmac[{size}]', 'crypto',
+            lambda _: CryptoService.verify_hmac(raw, hmac_key, signature), params, min_time
+        ))
+        results.append(run_benchmark(
+            f'crypto.encode_base64[{size}]', 'crypto',
+            lambda _: CryptoService.encode_base64(raw), params, min_time
+        ))
+        results.append(run_benchmark(
+            f'crypto.decode_base64[{size}]', 'crypto',
+            lambda _: CryptoService.decode_base64(encoded), params, min_time
+        ))
+
+    for size in RSA_PAYLOAD_SIZES:
+        params = {'payload_bytes': size}
+        data = os.urandom(size)
+        wrapped = CryptoService.encrypt_rsa(data, public_pem)
+
+        results.append(run_benchmark(
+            f'crypto.encrypt_rsa[{size}]', 'crypto',
+            lambda _: CryptoService.encrypt_rsa(data, public_pem), params, min_time
+        ))
+        results.append(run_benchmark(
+            f'crypto.decrypt_rsa[{size}]', 'crypto',
+            lambda _: CryptoService.decrypt_rsa(wrapped, private_pem), params, min_time
+        ))
+
+    return results
@@ -0,0 +1,55 @@
+from database.db import db
+from models.user import User
+from models.message import Message
+from models.session import Session
+from models.communication_log import CommunicationLog
+from benchmarks.harness import run_benchmark
+
+BATCH = 100
+
+
+def run(app, dataset, min_time=1.0):
+    """
+    Benchmark the model to_dict serializers
+
+    Each iteration serializes a batch of rows. Message is measured twice:
+    warm, with sender and receiver already in the identity map, and cold,
+    where every batch starts from a fresh session and pays for the lazy
+    relationship loads.
+
+    Args:
+        app (Flask): Application whose database was populated by dataset.seed
+        dataset (dict): Dataset description returned by dataset.seed
+        min_time (float): Seconds to spend on each benchmark
+
+    Returns:
+        list: BenchmarkResult objects
+    """
+    params = {'batch': BATCH, 'messages': dataset['messages'], 'users': dataset['users']}
+    results = []
+
+    with app.app_context():
+        for name, model in [('user', User), ('session', Session), ('communication_log', CommunicationLog)]:
+            rows = model.query.limit(BATCH).all()
+            results.append(run_benchmark(
+                f'models.{name}_to_dict', 'models',
+                lambda _, rows=rows: [row.to_dict() for row in rows], params, min_time
+            ))
+
+        messages = Message.query.limit(BATCH).all()
+        results.append(run_benchmark(
+            'models.message_to_dict', 'models',
+            lambda _: [message.to_dict() for message in messages], params, min_time
+        ))
+
+        def fresh_messages():
+            db.session.expunge_all()
+            return Message.query.limit(BATCH).all()
+
+        results.append(run_benchmark(
+            'models.message_to_dict_cold', 'models',
+            lambda rows: [message.to_dict() for message in rows], params, min_time,
+            setup=fresh_messages
+        ))
+
+    return results
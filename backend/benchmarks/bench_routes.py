@@ -0,0 +1,121 @@
+import itertools
+import random
+from flask_jwt_extended import create_access_token
+from benchmarks.dataset import BENCH_PASSWORD, username_for
+from benchmarks.harness import run_benchmark
+
+
+def run(app, dataset, min_time=1.0):
+    """
+    Benchmark the REST endpoints through the Flask test client
+
+    Args:
+        app (Flask): Application whose database was populated by dataset.seed
+        dataset (dict): Dataset description returned by dataset.seed
+        min_time (float): Seconds to spend on each benchmark
+
+    Returns:
+        list: BenchmarkResult objects
+    """
+    client = app.test_client()
+    rng = random.Random(dataset.get('seed', 0))
+    users = dataset['users']
+    params = {'messages': dataset['messages'], 'users': users}
+
+    with app.app_context():
+        token = create_access_token(identity=1)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    def expect(response, status):
+        if response.status_code != status:
+            raise RuntimeError(f'{response.request.path} returned {response.status_code}: {response.get_data(as_text=True)}')
+
+    counter = itertools.count()
+    results = []
+
+    # Every register and login call pays for one bcrypt round
+    results.append(run_benchmark(
+        'routes.register', 'routes',
+        lambda n: expect(client.post('/api/auth/register', json={
+            'username': f'bench_new_{n}',
+            'email': f'bench_new_{n}@bench.local',
+            'password': BENCH_PASSWORD
+        }), 201),
+        params, min_time, max_iterations=200, setup=lambda: next(counter)
+    ))
+    results.append(run_benchmark(
+        'routes.login', 'routes',
+        lambda _: expect(client.post('/api/auth/login', json={
+            'username': username_for(0),
+            'password': BENCH_PASSWORD
+        }), 200),
+        params, min_time, max_iterations=200
+    ))
+    # Refresh replaces hourly re-logins; each call rotates the refresh token
+    tokens = client.post('/api/auth/login', json={
+        'username': username_for(0),
+        'password': BENCH_PASSWORD
+    }).get_json()
+
+    def refresh(_):
+        response = client.post('/api/auth/refresh', headers={'Authorization': f"Bearer {tokens['refresh_token']}"})
+        expect(response, 200)
+        tokens.update(response.get_json())
+
+    results.append(run_benchmark('routes.refresh', 'routes', refresh, params, min_time))
+    results.append(run_benchmark(
+        'routes.send', 'routes',
+        lambda receiver: expect(client.post('/api/messages/send', headers=headers, json={
+            'receiver_username': receiver,
+            'encrypted_content': 'YmVuY2htYXJr',
+            'iv': 'AAAAAAAAAAAAAAAAAAAAAA==',
+            'encrypted_aes_key': 'YmVuY2htYXJr'
+        }), 201),
+        params, min_time, setup=lambda: username_for(rng.randrange(users))
+    ))
+    results.append(run_benchmark(
+        'routes.history', 'routes',
+        lambda _: expect(client.get('/api/messages/history', headers=headers), 200),
+        params, min_time
+    ))
+    # Repeat request from a client holding the current ETag: validator query only
+    etag = client.get('/api/messages/history', headers=headers).headers['ETag']
+    results.append(run_benchmark(
+        'routes.history_not_modified', 'routes',
+        lambda _: expect(client.get('/api/messages/history', headers=dict(headers, **{'If-None-Match': etag})), 304),
+        params, min_time
+    ))
+    results.append(run_benchmark(
+        'routes.inbox', 'routes',
+        lambda _: expect(client.get('/api/conversations', headers=headers), 200),
+        params, min_time
+    ))
+    # A group message is stored once however many members the group has
+    group_params = dict(params, group_members=dataset['group_members'])
+    results.append(run_benchmark(
+        'routes.group_send', 'routes',
+        lambda _: expect(client.post('/api/groups/1/messages', headers=headers, json={
+            'encrypted_content': 'YmVuY2htYXJr',
+            'iv': 'AAAAAAAAAAAAAAAAAAAAAA==',
+            'key_version': 1
+        }), 201),
+        group_params, min_time
+    ))
+    results.append(run_benchmark(
+        'routes.group_history', 'routes',
+        lambda _: expect(client.get('/api/groups/1/messages', headers=headers), 200),
+        group_params, min_time
+    ))
+    results.append(run_benchmark(
+        'routes.logs', 'routes',
+        lambda _: expect(client.get('/api/users/logs', headers=headers), 200),
+        params, min_time
+    ))
+    results.append(run_benchmark(
+        'routes.search', 'routes',
+        lambda _: expect(client.get('/api/users/search', headers=headers,
+                                    query_string={'q': 'user_1'}), 200),
+        params, min_time
+    ))
+
+    return results
@@ -0,0 +1,177 @@
+import os
+import random
+import secrets
+from datetime import datetime, timedelta
+import bcrypt
+from config import Config
+from database.db import db
+from models.user import User
+from models.message import Message
+from models.session import Session
+from models.communication_log import CommunicationLog
+from models.group import Group, GroupMember, GroupKeyEnvelope, GroupMessage
+
+BENCH_PASSWORD = 'BenchPassw0rd'
+BATCH_SIZE = 10000
+# One group channel of this many members (user 1 included) is seeded
+GROUP_MEMBERS = 200
+
+
+def make_config(db_path):
+    """Build a Config subclass that points the app at a scratch database"""
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.abspath(db_path)
+        TESTING = True
+        RATE_LIMIT_ENABLED = False
+        MESSAGE_SWEEPER_ENABLED = False
+        MESSAGE_ARCHIVER_ENABLED = False
+        # No socket cluster runs here: don't time pushes or queue frames for it
+        SOCKET_PUSH_URL = ''
+        SOCKET_DELIVERY_PATH = ''
+
+    return BenchmarkConfig
+
+
+def username_for(index):
+    """Username of the index-th synthetic user"""
+    return f'bench_user_{index}'
+
+
+def seed(users=1000, messages=10000, logs=None, payload_bytes=256, seed_value=1234):
+    """
+    Populate the current app's database with synthetic data
+
+    Rows are bulk inserted in batches so that a 1M message dataset can be
+    built in reasonable time. Must be called inside an app context.
+
+    Args:
+        users (int): Number of users to create
+        messages (int): Number of messages to create
+        logs (int): Number of communication log rows (defaults to messages)
+        payload_bytes (int): Approximate size of each encrypted_content value
+        seed_value (int): Random seed, so datasets are reproducible
+
+    Returns:
+        dict: Description of the dataset that was created
+    """
+    rng = random.Random(seed_value)
+    logs = messages if logs is None else logs
+    now = datetime.utcnow()
+
+    # bcrypt is deliberately slow, so every synthetic user shares one hash
+    password_hash = bcrypt.hashpw(BENCH_PASSWORD.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+    _bulk_insert(User.__table__, ({
+        'username': username_for(i),
+        'email': f'{username_for(i)}@bench.local',
+        'password_hash': password_hash,
+        'public_key': None,
+        'private_key_encrypted': None,
+        'created_at': now
+    } for i in range(users)))
+
+    _bulk_insert(Session.__table__, ({
+        'user_id': i + 1,
+        'session_key': secrets.token_urlsafe(32),
+        'ip_address': '127.0.0.1',
+        'user_agent': 'benchmark',
+        'created_at': now,
+        'expires_at': now + timedelta(hours=1),
+        'is_active': True
+    } for i in range(users)))
+
+    content = secrets.token_urlsafe(payload_bytes)[:payload_bytes]
+    iv = secrets.token_urlsafe(16)
+    aes_key = secrets.token_urlsafe(256)
+
+    def message_rows():
+        for i in range(messages):
+            sender = rng.randint(1, users)
+            receiver = rng.randint(1, users)
+            yield {
+                'sender_id': sender,
+                'receiver_id': receiver,
+                'encrypted_content': content,
+                'iv': iv,
+                'encrypted_aes_key': aes_key,
+                'algorithm': 'AES-256-CBC',
+                'timestamp': now - timedelta(seconds=messages - i)
+            }
+
+    def log_rows():
+        for i in range(logs):
+            yield {
+                'session_id': None,
+                'user_id': rng.randint(1, users),
+                'action': 'MESSAGE_SENT',
+                'details': 'Synthetic benchmark entry',
+                'timestamp': now - timedelta(seconds=logs - i)
+            }
+
+    _bulk_insert(Message.__table__, message_rows())
+    _bulk_insert(CommunicationLog.__table__, log_rows())
+    _build_conversations()
+    group_members = min(GROUP_MEMBERS, users)
+    group_messages = messages // 10
+    _build_group(group_members, group_messages, content, iv, aes_key, now)
+
+    return {
+        'users': users,
+        'messages': messages,
+        'logs': logs,
+        'group_members': group_members,
+        'group_messages': group_messages,
+        'payload_bytes': payload_bytes,
+        'seed': seed_value
+    }
+
+
+def _build_conversations():
+    """Derive conversation summaries from the bulk-inserted messages (as migration 0004 does)"""
+    db.session.execute(db.text(
+        'INSERT INTO conversations (user_low_id, user_high_id, last_message_id, last_message_at) '
+        'SELECT MIN(sender_id, receiver_id), MAX(sender_id, receiver_id), MAX(id), MAX(timestamp) '
+        'FROM messages GROUP BY MIN(sender_id, receiver_id), MAX(sender_id, receiver_id)'
+    ))
+    for member, peer in [('user_low_id', 'user_high_id'), ('user_high_id', 'user_low_id')]:
+        db.session.execute(db.text(
+            'INSERT OR IGNORE INTO conversation_participants '
+            '(conversation_id, user_id, peer_id, last_activity_id, last_read_message_id) '
+            f'SELECT id, {member}, {peer}, last_message_id, last_message_id FROM conversations'
+        ))
+    db.session.commit()
+
+
+def _build_group(members, messages, content, iv, aes_key, now):
+    """Seed one group channel: each message stored once, one key envelope per member"""
+    db.session.execute(Group.__table__.insert(), [{
+        'name': 'bench_group', 'owner_id': 1, 'key_version': 1, 'rekey_required': False, 'created_at': now
+    }])
+    _bulk_insert(GroupMember.__table__, ({
+        'group_id': 1, 'user_id': i + 1, 'joined_at': now
+    } for i in range(members)))
+    _bulk_insert(GroupKeyEnvelope.__table__, ({
+        'group_id': 1, 'key_version': 1, 'user_id': i + 1, 'encrypted_key': aes_key, 'created_at': now
+    } for i in range(members)))
+    _bulk_insert(GroupMessage.__table__, ({
+        'group_id': 1,
+        'sender_id': i % members + 1,
+        'key_version': 1,
+        'encrypted_content': content,
+        'iv': iv,
+        'algorithm': 'AES-256-CBC',
+        'timestamp': now - timedelta(seconds=messages - i)
+    } for i in range(messages)))
+
+
+def _bulk_insert(table, rows):
+    """Insert an iterable of row dictionaries in fixed-size batches"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            db.session.execute(table.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
+    db.session.commit()
@@ -0,0 +1,148 @@
+import json
+import math
+import platform
+import sys
+import time
+from datetime import datetime
+
+
+class BenchmarkResult:
+    """Timing summary for a single benchmark"""
+
+    def __init__(self, name, group, samples_ns, params=None):
+        self.name = name
+        self.group = group
+        self.params = params or {}
+        self.iterations = len(samples_ns)
+
+        total_ns = sum(samples_ns)
+        ordered = sorted(samples_ns)
+        self.ops_per_sec = self.iterations / (total_ns / 1e9) if total_ns else 0.0
+        self.p50_ms = percentile(ordered, 50) / 1e6
+        self.p99_ms = percentile(ordered, 99) / 1e6
+
+    def to_dict(self):
+        """Convert result to dictionary"""
+        return {
+            'name': self.name,
+            'group': self.group,
+            'params': self.params,
+            'iterations': self.iterations,
+            'ops_per_sec': round(self.ops_per_sec, 3),
+            'p50_ms': round(self.p50_ms, 6),
+            'p99_ms': round(self.p99_ms, 6)
+        }
+
+
+def percentile(ordered, pct):
+    """
+    Nearest-rank percentile of an already sorted sequence
+
+    Args:
+        ordered (list): Sorted samples
+        pct (float): Percentile in the range 0-100
+
+    Returns:
+        float: Sample at the requested percentile (0 when empty)
+    """
+    if not ordered:
+        return 0
+    rank = min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def run_benchmark(name, group, func, params=None, min_time=1.0, max_iterations=100000,
+                  min_iterations=5, warmup=1, setup=None):
+    """
+    Time repeated calls of func and summarize them
+
+    Each call is timed individually so that latency percentiles can be
+    reported alongside throughput.
+
+    Args:
+        name (str): Benchmark name, unique within a run
+        group (str): Benchmark group (crypto, routes, models)
+        func (callable): Operation to time; receives the value returned by setup
+        params (dict): Parameters recorded with the result (optional)
+        min_time (float): Keep iterating until this many seconds were measured
+        max_iterations (int): Upper bound on timed calls
+        min_iterations (int): Lower bound on timed calls
+        warmup (int): Untimed calls made before measuring
+        setup (callable): Called before every iteration, outside the timer (optional)
+
+    Returns:
+        BenchmarkResult: Summary of the timed calls
+    """
+    for _ in range(warmup):
+        func(setup() if setup else None)
+
+    samples = []
+    budget_ns = int(min_time * 1e9)
+    spent_ns = 0
+    clock = time.perf_counter_ns
+
+    while len(samples) < max_iterations and (spent_ns < budget_ns or len(samples) < min_iterations):
+        arg = setup() if setup else None
+        start = clock()
+        func(arg)
+        elapsed = clock() - start
+        samples.append(elapsed)
+        spent_ns += elapsed
+
+    return BenchmarkResult(name, group, samples, params)
+
+
+def build_report(results, dataset=None):
+    """Build the JSON-serializable report for a run"""
+    return {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'dataset': dataset or {}
+        },
+        'results': [result.to_dict() for result in results]
+    }
+
+
+def save_report(report, path):
+    """Write a report to disk as JSON"""
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def load_report(path):
+    """Load a report previously written by save_report"""
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def find_regressions(report, baseline, threshold=0.2):
+    """
+    Compare a report against a stored baseline
+
+    A benchmark regresses when its throughput drops by more than the
+    threshold fraction relative to the baseline. Benchmarks missing from
+    either side are ignored.
+
+    Args:
+        report (dict): Current report
+        baseline (dict): Baseline report
+        threshold (float): Allowed relative slowdown, e.g. 0.2 for 20%
+
+    Returns:
+        list: (name, baseline_ops, current_ops, change) for each regression
+    """
+    previous = {result['name']: result for result in baseline.get('results', [])}
+    regressions = []
+
+    for result in report.get('results', []):
+        base = previous.get(result['name'])
+        if not base or not base['ops_per_sec']:
+            continue
+
+        change = (result['ops_per_sec'] - base['ops_per_sec']) / base['ops_per_sec']
+        if change < -threshold:
+            regressions.append((result['name'], base['ops_per_sec'], result['ops_per_sec'], change))
+
+    return regressions
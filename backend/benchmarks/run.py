@@ -0,0 +1,101 @@
+"""
+SecureLink benchmark runner
+
+Usage (from the backend directory):
+    python -m benchmarks.run --groups crypto routes models --messages 100000
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --threshold 0.15
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from benchmarks import harness
+
+GROUPS = ['crypto', 'routes', 'models']
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run SecureLink microbenchmarks')
+    parser.add_argument('--groups', nargs='+', choices=GROUPS, default=GROUPS,
+                        help='Benchmark groups to run')
+    parser.add_argument('--users', type=int, default=1000, help='Synthetic users to create')
+    parser.add_argument('--messages', type=int, default=10000,
+                        help='Synthetic messages to create (e.g. 10000 to 1000000)')
+    parser.add_argument('--logs', type=int, default=None,
+                        help='Synthetic communication logs (defaults to --messages)')
+    parser.add_argument('--payload-bytes', type=int, default=256,
+                        help='Size of each synthetic encrypted_content value')
+    parser.add_argument('--sizes', type=int, nargs='+', default=None,
+                        help='Payload sizes in bytes for the crypto group')
+    parser.add_argument('--min-time', type=float, default=1.0,
+                        help='Seconds to spend on each benchmark')
+    parser.add_argument('--output', default='benchmark_results.json', help='Where to write results')
+    parser.add_argument('--baseline', default=None, help='Baseline to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Allowed relative throughput drop before failing')
+    parser.add_argument('--save-baseline', default=None,
+                        help='Also write the results to this path as the new baseline')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = []
+    dataset = None
+
+    if 'crypto' in args.groups:
+        from benchmarks import bench_crypto
+        print('Running crypto benchmarks...')
+        results.extend(bench_crypto.run(args.min_time, args.sizes))
+
+    if 'routes' in args.groups or 'models' in args.groups:
+        from app import create_app
+        from benchmarks import bench_models, bench_routes
+        from benchmarks.dataset import make_config, seed
+
+        workdir = tempfile.mkdtemp(prefix='securelink-bench-')
+        try:
+            app = create_app(make_config(os.path.join(workdir, 'bench.db')))
+            print(f'Seeding {args.users} users and {args.messages} messages...')
+            with app.app_context():
+                dataset = seed(args.users, args.messages, args.logs, args.payload_bytes)
+
+            # Models first: the routes group mutates the dataset
+            if 'models' in args.groups:
+                print('Running model benchmarks...')
+                results.extend(bench_models.run(app, dataset, args.min_time))
+            if 'routes' in args.groups:
+                print('Running route benchmarks...')
+                results.extend(bench_routes.run(app, dataset, args.min_time))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = harness.build_report(results, dataset)
+
+    print(f"\n{'benchmark':<40} {'ops/sec':>12} {'p50 ms':>10} {'p99 ms':>10}")
+    for result in results:
+        print(f'{result.name:<40} {result.ops_per_sec:>12.1f} {result.p50_ms:>10.3f} {result.p99_ms:>10.3f}')
+
+    harness.save_report(report, args.output)
+    print(f'\nResults written to {args.output}')
+
+    if args.save_baseline:
+        harness.save_report(report, args.save_baseline)
+        print(f'Baseline written to {args.save_baseline}')
+
+    if args.baseline:
+        regressions = harness.find_regressions(report, harness.load_report(args.baseline), args.threshold)
+        if regressions:
+            print(f'\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}:')
+            for name, before, after, change in regressions:
+                print(f'  {name}: {before:.1f} -> {after:.1f} ops/sec ({change:+.1%})')
+            return 1
+        print(f'\nNo regressions beyond {args.threshold:.0%} against {args.baseline}')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
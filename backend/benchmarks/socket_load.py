@@ -0,0 +1,542 @@
+"""
+Load generator for the SecureLink socket server
+
+Each simulated client performs the RSA handshake expected by
+SocketServer._handle_client, authenticates as its own user with a token
+signed by JWT_SECRET_KEY, then sends AES-encrypted frames at a fixed rate
+and measures the round trip of the server's echo.
+
+Usage (from the backend directory):
+    python -m benchmarks.socket_load --spawn-server --clients 500 --duration 30
+    python -m benchmarks.socket_load --port 5001 --clients 2000 --ramp-up 20 --rate 2
+    python -m benchmarks.socket_load --spawn-server --clients 200 --storm-every 10 --storm-fraction 0.5
+    python -m benchmarks.socket_load --spawn-server --clients 500 --restart-every 15 --restart-mode handover
+
+A rolling restart replaces the spawned server the way a deploy would; the
+summary's peak_handshakes_per_sec then covers only the time since the first
+restart, so it measures the reconnect load the restart caused.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import select
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+import jwt
+from config import Config
+from services.crypto_service import CryptoService
+from benchmarks.harness import percentile, save_report
+
+
+class LoadStats:
+    """Counters and latency samples shared by all simulated clients"""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.handshakes = 0
+        self.handshake_latencies = []
+        self.round_trips = []
+        self.messages_sent = 0
+        self.messages_received = 0
+        self.reconnects = 0
+        self.reconnect_hints = 0
+        self.handshake_times = []
+        self.restarts = []
+        self.active = 0
+        self.peak_active = 0
+        self.errors = Counter()
+
+    def connected(self):
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+
+    def disconnected(self):
+        self.active -= 1
+
+    def error(self, kind):
+        self.errors[kind] += 1
+
+    def peak_handshake_rate(self, since):
+        """Most handshakes completed in any one-second bucket from since on"""
+        buckets = Counter(int(at - since) for at in self.handshake_times if at >= since)
+        return max(buckets.values(), default=0)
+
+    def summary(self):
+        """Summarize the run as a dictionary"""
+        elapsed = time.monotonic() - self.started_at
+        handshakes = sorted(self.handshake_latencies)
+        rtts = sorted(self.round_trips)
+
+        def ms(samples, pct):
+            return round(percentile(samples, pct) * 1000, 3)
+
+        return {
+            'duration_sec': round(elapsed, 3),
+            'handshakes': self.handshakes,
+            'handshakes_per_sec': round(self.handshakes / elapsed, 3) if elapsed else 0.0,
+            'handshake_ms': {'p50': ms(handshakes, 50), 'p99': ms(handshakes, 99)},
+            'peak_handshakes_per_sec': self.peak_handshake_rate(
+                self.restarts[0] if self.restarts else self.started_at
+            ),
+            'messages_sent': self.messages_sent,
+            'messages_received': self.messages_received,
+            'messages_per_sec': round(self.messages_received / elapsed, 3) if elapsed else 0.0,
+            'round_trip_ms': {
+                'p50': ms(rtts, 50),
+                'p90': ms(rtts, 90),
+                'p99': ms(rtts, 99),
+                'max': round(rtts[-1] * 1000, 3) if rtts else 0.0
+            },
+            'reconnects': self.reconnects,
+            'reconnect_hints': self.reconnect_hints,
+            'restarts': len(self.restarts),
+            'peak_connections': self.peak_active,
+            'errors': dict(self.errors)
+        }
+
+
+class ReconnectHint(Exception):
+    """The server is draining and asked the client to come back after a delay"""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Reconnect after {retry_after}s')
+        self.retry_after = retry_after
+
+
+class SimulatedClient:
+    """One socket client speaking the SecureLink handshake and echo protocol"""
+
+    decoder = json.JSONDecoder()
+
+    def __init__(self, client_id, host, port, stats, rate, payload_bytes, timeout, token=None):
+        self.client_id = client_id
+        self.token = token
+        self.host = host
+        self.port = port
+        self.stats = stats
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.payload = 'x' * payload_bytes
+        self.timeout = timeout
+        self.writer = None
+        self.dropping = False
+        self.buffer = ''
+
+    def drop(self):
+        """Sever the current connection; the client reconnects immediately"""
+        if self.writer is not None:
+            self.dropping = True
+            self.writer.close()
+
+    async def run(self, stop):
+        """Connect, handshake and exchange frames until stop is set"""
+        first = True
+        while not stop.is_set():
+            if not first:
+                self.stats.reconnects += 1
+            first = False
+
+            retry_after = None
+            try:
+                await self._session(stop)
+            except ReconnectHint as hint:
+                self.stats.reconnect_hints += 1
+                retry_after = hint.retry_after
+            except asyncio.TimeoutError:
+                self.stats.error('timeout')
+            except (ConnectionError, OSError, asyncio.IncompleteReadError) as e:
+                if not self.dropping:
+                    self.stats.error(type(e).__name__)
+            except (ValueError, KeyError) as e:
+                self.stats.error(f'protocol:{type(e).__name__}')
+            finally:
+                if self.writer is not None:
+                    self.writer.close()
+                    self.writer = None
+                    self.stats.disconnected()
+
+            if retry_after is not None:
+                try:
+                    await asyncio.wait_for(stop.wait(), retry_after)
+                except asyncio.TimeoutError:
+                    pass
+            elif not self.dropping and not stop.is_set():
+                # Back off briefly after a failure so errors do not spin
+                await asyncio.sleep(random.uniform(0.1, 0.5))
+            self.dropping = False
+
+    async def _session(self, stop):
+        self.buffer = ''
+        started = time.perf_counter()
+        reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        self.stats.connected()
+
+        # Step 1: server public key
+        handshake = await asyncio.wait_for(self._read_json(reader), self.timeout)
+        if handshake.get('type') != 'handshake':
+            raise ValueError('Unexpected handshake frame')
+
+        # Step 2: send our AES session key wrapped with the server key
+        aes_key = CryptoService.generate_aes_key()
+        wrapped = CryptoService.encrypt_rsa(aes_key, handshake['public_key'])
+        hello = CryptoService.encode_base64(wrapped).encode('utf-8')
+
+        # Step 3: authenticate on the encrypted channel, in the same write so
+        # Nagle's algorithm does not hold the token back for a delayed ACK
+        if self.token:
+            hello += self._encrypt(json.dumps({'type': 'auth', 'token': self.token}), aes_key)
+        self.writer.write(hello)
+        await self.writer.drain()
+
+        if self.token:
+            reply = await asyncio.wait_for(self._read_reply(reader), self.timeout)
+            if reply.get('type') != 'auth_ok':
+                raise ValueError('Unexpected authentication reply')
+
+        self.stats.handshakes += 1
+        self.stats.handshake_latencies.append(time.perf_counter() - started)
+        self.stats.handshake_times.append(time.monotonic())
+
+        # Step 4: encrypted echo traffic
+        next_send = time.monotonic() + random.uniform(0, self.interval)
+        while not stop.is_set():
+            delay = next_send - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            next_send += self.interval
+
+            frame = self._encrypt(self.payload, aes_key)
+
+            sent_at = time.perf_counter()
+            self.writer.write(frame)
+            await self.writer.drain()
+            self.stats.messages_sent += 1
+
+            response = await asyncio.wait_for(self._read_reply(reader), self.timeout)
+            CryptoService.decrypt_aes(
+                CryptoService.decode_base64(response['ciphertext']),
+                aes_key,
+                CryptoService.decode_base64(response['iv'])
+            )
+            self.stats.round_trips.append(time.perf_counter() - sent_at)
+            self.stats.messages_received += 1
+
+    @staticmethod
+    def _encrypt(plaintext, aes_key):
+        iv = CryptoService.generate_iv()
+        ciphertext = CryptoService.encrypt_aes(plaintext, aes_key, iv)
+        return json.dumps({
+            'ciphertext': CryptoService.encode_base64(ciphertext),
+            'iv': CryptoService.encode_base64(iv)
+        }).encode('utf-8')
+
+    async def _read_reply(self, reader):
+        """Read the next data frame, answering server heartbeats on the way"""
+        while True:
+            frame = await self._read_json(reader)
+            frame_type = frame.get('type')
+            if frame_type == 'ping':
+                self.writer.write(json.dumps({'type': 'pong'}).encode('utf-8'))
+            elif frame_type == 'reconnect':
+                raise ReconnectHint(float(frame.get('retry_after', 0.0)))
+            elif frame_type == 'error':
+                raise ValueError(frame.get('error', 'Server error'))
+            elif frame_type != 'pong':
+                return frame
+
+    async def _read_json(self, reader):
+        """Read one JSON document; the protocol has no explicit framing"""
+        while True:
+            text = self.buffer.lstrip()
+            if text:
+                try:
+                    obj, end = self.decoder.raw_decode(text)
+                    self.buffer = text[end:]
+                    return obj
+                except ValueError:
+                    pass
+
+            data = await reader.read(65536)
+            if not data:
+                raise ConnectionResetError('Connection closed by server')
+            self.buffer += data.decode('utf-8')
+
+
+def ramp_delays(clients, ramp_up, shape='linear', steps=5):
+    """
+    Start offsets in seconds for each client
+
+    Args:
+        clients (int): Number of clients
+        ramp_up (float): Seconds over which clients are started
+        shape (str): 'linear' spreads starts evenly, 'step' starts them in batches
+        steps (int): Number of batches for the step shape
+
+    Returns:
+        list: Start delay for every client
+    """
+    if ramp_up <= 0 or clients <= 1:
+        return [0.0] * clients
+    if shape == 'step':
+        per_step = max(1, -(-clients // steps))
+        return [(i // per_step) * ramp_up / max(1, steps - 1) for i in range(clients)]
+    return [i * ramp_up / (clients - 1) for i in range(clients)]
+
+
+async def storm(clients, stop, every, fraction):
+    """Periodically drop a fraction of the clients at the same instant"""
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), every)
+            return
+        except asyncio.TimeoutError:
+            pass
+        victims = random.sample(clients, max(1, int(len(clients) * fraction)))
+        for client in victims:
+            client.drop()
+
+
+async def report_progress(stats, stop, interval):
+    """Print a one-line status every interval seconds"""
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+            return
+        except asyncio.TimeoutError:
+            pass
+        print(f'[{time.monotonic() - stats.started_at:6.1f}s] active={stats.active} '
+              f'handshakes={stats.handshakes} received={stats.messages_received} '
+              f'errors={sum(stats.errors.values())}')
+
+
+def make_token(user_id, secret, lifetime):
+    """Sign an access token shaped like the ones /api/auth/login issues"""
+    now = datetime.utcnow()
+    return jwt.encode({'sub': user_id, 'type': 'access', 'iat': now, 'exp': now + lifetime}, secret, algorithm='HS256')
+
+
+async def rolling_restart(server, stats, stop, every):
+    """Restart the spawned server every interval while the clients keep running"""
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), every)
+            return
+        except asyncio.TimeoutError:
+            pass
+        stats.restarts.append(time.monotonic())
+        await asyncio.to_thread(server.restart)
+
+
+async def run_load(args, server=None):
+    stats = LoadStats()
+    stop = asyncio.Event()
+    lifetime = timedelta(seconds=args.duration + 3600)
+    clients = [
+        SimulatedClient(i, args.host, args.port, stats, args.rate, args.size, args.timeout,
+                        token=None if args.anonymous else make_token(i + 1, args.jwt_secret, lifetime))
+        for i in range(args.clients)
+    ]
+
+    async def start_later(client, delay):
+        await asyncio.sleep(delay)
+        await client.run(stop)
+
+    delays = ramp_delays(args.clients, args.ramp_up, args.ramp_shape, args.ramp_steps)
+    tasks = [asyncio.create_task(start_later(c, d)) for c, d in zip(clients, delays)]
+    tasks.append(asyncio.create_task(report_progress(stats, stop, args.progress)))
+    if args.storm_every > 0:
+        tasks.append(asyncio.create_task(storm(clients, stop, args.storm_every, args.storm_fraction)))
+    if server is not None and args.restart_every > 0:
+        tasks.append(asyncio.create_task(rolling_restart(server, stats, stop, args.restart_every)))
+
+    await asyncio.sleep(args.duration)
+    stop.set()
+    for client in clients:
+        client.drop()
+    await asyncio.wait(tasks, timeout=args.timeout + 1)
+    for task in tasks:
+        task.cancel()
+
+    return stats.summary()
+
+
+def raise_fd_limit():
+    """Raise the soft open-file limit so thousands of sockets can be opened"""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def spawn_server(host, port, restart_mode='kill', timeout=30.0):
+    """
+    Start a SocketServer in a child process and wait until it accepts
+
+    The child prints a line once it is listening; when it takes over from
+    a running server, the port is already open, so a connect probe would
+    not tell the two apart.
+    """
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.socket_load', '--serve', '--host', host, '--port', str(port),
+         '--restart-mode', restart_mode],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    )
+
+    ready, _, _ = select.select([process.stdout], [], [], timeout)
+    if ready and process.stdout.readline().strip() == b'ready':
+        return process
+
+    process.kill()
+    raise RuntimeError(f'Socket server did not start on {host}:{port}')
+
+
+class SpawnedServer:
+    """
+    The local server process under test, replaced the way a deploy would
+
+    kill: SIGKILL the server, then start a new one; every client is cut
+        off at once and redoes the handshake
+    drain: start a new server on the same port (SO_REUSEPORT), then SIGTERM
+        the old one, which sends reconnect hints spread over
+        SOCKET_RECONNECT_WINDOW
+    handover: start a new server that takes the listener and established
+        connections over; the old one exits once they have moved
+    """
+
+    def __init__(self, host, port, restart_mode='kill'):
+        self.host = host
+        self.port = port
+        self.restart_mode = restart_mode
+        self.process = spawn_server(host, port, restart_mode)
+        self.retired = []
+
+    def restart(self):
+        """Replace the server; returns once the new one accepts"""
+        old = self.process
+        if self.restart_mode == 'kill':
+            old.kill()
+            old.wait()
+            self.process = spawn_server(self.host, self.port, self.restart_mode)
+            return
+
+        self.process = spawn_server(self.host, self.port, self.restart_mode)
+        if self.restart_mode == 'drain':
+            old.terminate()
+        self.retired.append(old)
+
+    def stop(self):
+        processes = [self.process] + self.retired
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=Config.SOCKET_DRAIN_TIMEOUT + 5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def handover_path(port):
+    """Handover socket for benchmark servers, apart from any real server's"""
+    return os.path.join(tempfile.gettempdir(), f'securelink-socket-load-{port}.sock')
+
+
+def serve(host, port, restart_mode='kill'):
+    """Run a standalone SocketServer until interrupted, drained or replaced"""
+    from services.socket_service import SocketServer
+
+    server = SocketServer(
+        host=host,
+        port=port,
+        jwt_secret=Config.JWT_SECRET_KEY,
+        # Every simulated client connects from the same address
+        max_connections_per_ip=Config.SOCKET_MAX_CONNECTIONS,
+        reuse_port=restart_mode == 'drain',
+        drain_timeout=Config.SOCKET_DRAIN_TIMEOUT,
+        reconnect_window=Config.SOCKET_RECONNECT_WINDOW,
+        handover_path=handover_path(port) if restart_mode == 'handover' else None
+    )
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.drain())
+    server.start(takeover=restart_mode == 'handover')
+    server.ready.wait()
+    print('ready', flush=True)
+    try:
+        while not server.stopped.wait(1):
+            pass
+    except KeyboardInterrupt:
+        server.stop()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Socket server load generator')
+    parser.add_argument('--host', default='127.0.0.1', help='Socket server host')
+    parser.add_argument('--port', type=int, default=5001, help='Socket server port')
+    parser.add_argument('--clients', type=int, default=100, help='Concurrent simulated clients')
+    parser.add_argument('--rate', type=float, default=1.0, help='Frames per second per client')
+    parser.add_argument('--size', type=int, default=256, help='Plaintext bytes per frame')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds to run')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Per-operation timeout in seconds')
+    parser.add_argument('--ramp-up', type=float, default=0.0, help='Seconds over which clients connect')
+    parser.add_argument('--ramp-shape', choices=['linear', 'step'], default='linear',
+                        help='How client starts are spread over the ramp-up')
+    parser.add_argument('--ramp-steps', type=int, default=5, help='Batches for the step ramp shape')
+    parser.add_argument('--storm-every', type=float, default=0.0,
+                        help='Seconds between reconnect storms (0 disables)')
+    parser.add_argument('--storm-fraction', type=float, default=0.5,
+                        help='Fraction of clients dropped in each storm')
+    parser.add_argument('--restart-every', type=float, default=0.0,
+                        help='Seconds between rolling restarts of the spawned server (0 disables)')
+    parser.add_argument('--restart-mode', choices=['kill', 'drain', 'handover'], default='handover',
+                        help='How a restart replaces the server (see SpawnedServer)')
+    parser.add_argument('--progress', type=float, default=5.0, help='Seconds between status lines')
+    parser.add_argument('--output', default=None, help='Write the summary to this JSON file')
+    parser.add_argument('--jwt-secret', default=Config.JWT_SECRET_KEY,
+                        help='Secret used to sign client tokens (default: JWT_SECRET_KEY)')
+    parser.add_argument('--anonymous', action='store_true',
+                        help='Skip authentication (server started with SOCKET_REQUIRE_AUTH=false)')
+    parser.add_argument('--spawn-server', action='store_true',
+                        help='Start a local socket server in a child process')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.restart_every > 0 and not args.spawn_server:
+        parser.error('--restart-every requires --spawn-server')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.serve:
+        serve(args.host, args.port, args.restart_mode)
+        return 0
+
+    raise_fd_limit()
+    server = SpawnedServer(args.host, args.port, args.restart_mode) if args.spawn_server else None
+
+    try:
+        summary = asyncio.run(run_load(args, server))
+    finally:
+        if server is not None:
+            server.stop()
+
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        save_report(summary, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Startup-time report for the Flask application
+
+Runs a fresh interpreter with -X importtime, builds the app against a
+scratch database and issues a first request, then prints the slowest
+imports and the per-phase startup timings. Each scenario runs twice: on a
+new database (migrations applied) and on a current one (no-op).
+
+Usage (from the backend directory):
+    python -m benchmarks.startup [--top 15] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from benchmarks.harness import save_report
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+from benchmarks.dataset import make_config
+app = create_app(make_config(sys.argv[1]))
+client = app.test_client()
+client.get('/api/health')
+report = client.get('/api/startup').get_json()['startup']
+report['process_ms'] = round((time.perf_counter() - started) * 1000, 3)
+print(json.dumps(report))
+'''
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def probe(db_path):
+    """Start a fresh interpreter, build the app and return (report, imports)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE, db_path],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            imports.append({
+                'module': match.group(4),
+                'self_ms': int(match.group(1)) / 1000,
+                'cumulative_ms': int(match.group(2)) / 1000,
+                'depth': len(match.group(3)) // 2
+            })
+
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    return report, imports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report import and startup time')
+    parser.add_argument('--top', type=int, default=15, help='Number of slowest imports to list')
+    parser.add_argument('--output', default=None, help='Write the report to this JSON file')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='securelink-startup-')
+    try:
+        db_path = os.path.join(workdir, 'startup.db')
+        cold, imports = probe(db_path)
+        warm, _ = probe(db_path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    # Attribute self time to top-level packages (flask, sqlalchemy, cryptography, ...)
+    packages = {}
+    for item in imports:
+        package = item['module'].split('.')[0]
+        packages[package] = packages.get(package, 0.0) + item['self_ms']
+    slowest = sorted(packages.items(), key=lambda p: p[1], reverse=True)[:args.top]
+
+    print(f"{'package':<40} {'import ms':>10}")
+    for package, ms in slowest:
+        print(f"{package:<40} {ms:>10.1f}")
+
+    for label, report in [('new database', cold), ('current database', warm)]:
+        print(f"\nStartup on {label}:")
+        for phase, ms in report['phases_ms']:
+            print(f"  {phase:<20} {ms:>10.1f} ms")
+        print(f"  {'time to first request':<20} {report['first_request_ms']:>10.1f} ms")
+
+    if args.output:
+        save_report({
+            'imports_ms': dict(slowest),
+            'new_database': cold,
+            'current_database': warm
+        }, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
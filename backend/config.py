@@ -11,10 +11,97 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key-change-in-production'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    # Seconds a just-rotated refresh token may still get an access token
+    JWT_REFRESH_REUSE_GRACE = int(os.environ.get('JWT_REFRESH_REUSE_GRACE') or 30)
+    
+    # API Server Configuration (used by gunicorn.conf.py)
+    API_HOST = os.environ.get('API_HOST') or '0.0.0.0'
+    API_PORT = int(os.environ.get('API_PORT') or 5000)
+    API_WORKERS = int(os.environ.get('API_WORKERS') or (os.cpu_count() or 1) * 2 + 1)
+    API_THREADS = int(os.environ.get('API_THREADS') or 4)
+    API_TIMEOUT = int(os.environ.get('API_TIMEOUT') or 30)
     
     # Socket Server Configuration
     SOCKET_HOST = '0.0.0.0'
     SOCKET_PORT = int(os.environ.get('SOCKET_PORT') or 5001)
+    SOCKET_WORKERS = int(os.environ.get('SOCKET_WORKERS') or os.cpu_count() or 1)
+    SOCKET_HEALTH_PORT = int(os.environ.get('SOCKET_HEALTH_PORT') or 5002)
+    # /presence lists online users and is unauthenticated: keep it off public interfaces
+    SOCKET_HEALTH_HOST = os.environ.get('SOCKET_HEALTH_HOST') or '127.0.0.1'
+    SOCKET_KEY_PATH = os.environ.get('SOCKET_KEY_PATH') or 'socket_server_key.pem'
+    SOCKET_QUEUE_MAX_BYTES = int(os.environ.get('SOCKET_QUEUE_MAX_BYTES') or 1024 * 1024)
+    SOCKET_QUEUE_MAX_AGE = float(os.environ.get('SOCKET_QUEUE_MAX_AGE') or 10.0)
+    SOCKET_HEARTBEAT_INTERVAL = float(os.environ.get('SOCKET_HEARTBEAT_INTERVAL') or 30.0)
+    SOCKET_IDLE_TIMEOUT = float(os.environ.get('SOCKET_IDLE_TIMEOUT') or 90.0)
+    SOCKET_HANDSHAKE_TIMEOUT = float(os.environ.get('SOCKET_HANDSHAKE_TIMEOUT') or 10.0)
+    # Per worker; each connection uses a reader and a writer thread
+    SOCKET_MAX_CONNECTIONS = int(os.environ.get('SOCKET_MAX_CONNECTIONS') or 10000)
+    SOCKET_MAX_CONNECTIONS_PER_IP = int(os.environ.get('SOCKET_MAX_CONNECTIONS_PER_IP') or 50)
+    # Clients authenticate with the access token from /api/auth/login
+    SOCKET_REQUIRE_AUTH = (os.environ.get('SOCKET_REQUIRE_AUTH') or 'true').lower() == 'true'
+    SOCKET_PRESENCE_URL = os.environ.get('SOCKET_PRESENCE_URL') or f'http://127.0.0.1:{SOCKET_HEALTH_PORT}/presence'
+    # The API hands frames to a standalone socket cluster here (empty disables)
+    SOCKET_PUSH_URL = os.environ.get('SOCKET_PUSH_URL', f'http://127.0.0.1:{SOCKET_HEALTH_PORT}/send')
+    SOCKET_PUSH_QUEUE_MAX = int(os.environ.get('SOCKET_PUSH_QUEUE_MAX') or 10000)
+    # Store-and-forward for users with no connection (empty path disables)
+    SOCKET_DELIVERY_PATH = os.environ.get('SOCKET_DELIVERY_PATH', 'pending_deliveries.db')
+    SOCKET_DELIVERY_MAX_PER_USER = int(os.environ.get('SOCKET_DELIVERY_MAX_PER_USER') or 1000)
+    SOCKET_DELIVERY_MAX_AGE = int(os.environ.get('SOCKET_DELIVERY_MAX_AGE') or 7 * 24 * 3600)  # seconds
+    SOCKET_DELIVERY_BATCH = int(os.environ.get('SOCKET_DELIVERY_BATCH') or 100)
+    # Graceful shutdown: clients are told to reconnect after a random delay within
+    # the window, and connections still open after the timeout are closed
+    SOCKET_DRAIN_TIMEOUT = float(os.environ.get('SOCKET_DRAIN_TIMEOUT') or 30.0)
+    SOCKET_RECONNECT_WINDOW = float(os.environ.get('SOCKET_RECONNECT_WINDOW') or 10.0)
+    # Unix socket a server started with --takeover connects to (empty disables)
+    SOCKET_HANDOVER_PATH = os.environ.get('SOCKET_HANDOVER_PATH', 'socket_handover.sock')
+    
+    # Ephemeral Messages
+    MESSAGE_MAX_TTL = int(os.environ.get('MESSAGE_MAX_TTL') or 30 * 24 * 3600)  # seconds
+    MESSAGE_SWEEPER_ENABLED = (os.environ.get('MESSAGE_SWEEPER_ENABLED') or 'true').lower() == 'true'
+    MESSAGE_SWEEP_INTERVAL = float(os.environ.get('MESSAGE_SWEEP_INTERVAL') or 30.0)
+    MESSAGE_SWEEP_BATCH = int(os.environ.get('MESSAGE_SWEEP_BATCH') or 500)
+    
+    # Cold Storage (messages older than the retention window move to segment files)
+    MESSAGE_ARCHIVE_DIR = os.environ.get('MESSAGE_ARCHIVE_DIR') or 'archive'
+    MESSAGE_RETENTION_DAYS = int(os.environ.get('MESSAGE_RETENTION_DAYS') or 90)
+    MESSAGE_ARCHIVER_ENABLED = (os.environ.get('MESSAGE_ARCHIVER_ENABLED') or 'true').lower() == 'true'
+    MESSAGE_ARCHIVE_INTERVAL = float(os.environ.get('MESSAGE_ARCHIVE_INTERVAL') or 3600.0)
+    MESSAGE_ARCHIVE_SEGMENT_SIZE = int(os.environ.get('MESSAGE_ARCHIVE_SEGMENT_SIZE') or 50000)
+    MESSAGE_HISTORY_PAGE_SIZE = int(os.environ.get('MESSAGE_HISTORY_PAGE_SIZE') or 50)
+    
+    # Attachments (ciphertext uploaded in resumable chunks, stored by content hash)
+    ATTACHMENT_DIR = os.environ.get('ATTACHMENT_DIR') or 'attachments'
+    ATTACHMENT_MAX_SIZE = int(os.environ.get('ATTACHMENT_MAX_SIZE') or 100 * 1024 * 1024)
+    ATTACHMENT_CHUNK_SIZE = int(os.environ.get('ATTACHMENT_CHUNK_SIZE') or 4 * 1024 * 1024)  # per request
+    
+    # Group Channels (one ciphertext per message, one key envelope per member and key version)
+    GROUP_MAX_MEMBERS = int(os.environ.get('GROUP_MAX_MEMBERS') or 256)
+    
+    # Admission Control (token buckets: rate in tokens/sec, burst = bucket size)
+    RATE_LIMIT_ENABLED = (os.environ.get('RATE_LIMIT_ENABLED') or 'true').lower() == 'true'
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND') or 'memory'
+    RATE_LIMIT_IP_RATE = float(os.environ.get('RATE_LIMIT_IP_RATE') or 10.0)
+    RATE_LIMIT_IP_BURST = float(os.environ.get('RATE_LIMIT_IP_BURST') or 60.0)
+    RATE_LIMIT_USER_RATE = float(os.environ.get('RATE_LIMIT_USER_RATE') or 5.0)
+    RATE_LIMIT_USER_BURST = float(os.environ.get('RATE_LIMIT_USER_BURST') or 30.0)
+    RATE_LIMIT_COSTS = {
+        'keypair': 20,   # RSA-2048 key generation
+        'login': 10,     # bcrypt verification
+        'register': 10,  # bcrypt hashing
+        'decrypt': 2     # AES decryption
+    }
+    
+    # Request Profiling (opt-in; nothing is hooked in when disabled)
+    REQUEST_PROFILING_ENABLED = (os.environ.get('REQUEST_PROFILING_ENABLED') or 'false').lower() == 'true'
+    REQUEST_PROFILE_SLOW_MS = float(os.environ.get('REQUEST_PROFILE_SLOW_MS') or 500.0)
+    REQUEST_PROFILE_MAX_QUERIES = int(os.environ.get('REQUEST_PROFILE_MAX_QUERIES') or 20)
+    REQUEST_PROFILE_SAMPLE_RATE = float(os.environ.get('REQUEST_PROFILE_SAMPLE_RATE') or 0.0)
+    # Requests carrying this header with the token are profiled (empty token disables)
+    REQUEST_PROFILE_HEADER = os.environ.get('REQUEST_PROFILE_HEADER') or 'X-Profile'
+    REQUEST_PROFILE_TOKEN = os.environ.get('REQUEST_PROFILE_TOKEN') or ''
+    REQUEST_PROFILE_LOG = os.environ.get('REQUEST_PROFILE_LOG') or 'slow_requests.log'
+    REQUEST_PROFILE_LOG_MAX_BYTES = int(os.environ.get('REQUEST_PROFILE_LOG_MAX_BYTES') or 10 * 1024 * 1024)
+    REQUEST_PROFILE_LOG_BACKUPS = int(os.environ.get('REQUEST_PROFILE_LOG_BACKUPS') or 5)
     
     # CORS Configuration
     CORS_ORIGINS = ['http://localhost:3000', 'http://127.0.0.1:3000']
@@ -1,7 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-import sqlite3
-import os
+from database.migrate import migrate
 
 db = SQLAlchemy()
 
@@ -10,24 +9,12 @@ def init_db(app):
     db.init_app(app)
     
     with app.app_context():
-        # Create all tables
-        db.create_all()
-        
-        # Execute schema.sql for additional setup
-        schema_path = os.path.join(os.path.dirname(__file__), 'schema.sql')
-        if os.path.exists(schema_path):
-            with open(schema_path, 'r') as f:
-                schema_sql = f.read()
-                
-            # Get the database path
-            db_path = app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '')
-            
-            # Execute schema
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.executescript(schema_sql)
-            conn.commit()
-            conn.close()
+        database = db.engine.url.database
+        if db.engine.dialect.name == 'sqlite' and database and database != ':memory:':
+            # Versioned migrations; a current database costs one query
+            migrate(database)
+        else:
+            db.create_all()
             
     return db
 
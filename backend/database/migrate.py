@@ -0,0 +1,124 @@
+"""
+Versioned schema migrations for the SQLite database
+
+Migrations are the numbered SQL files in database/migrations, named
+NNNN_description.sql. Applied versions are recorded in the
+schema_migrations table, so a database that is already current costs a
+single query at startup.
+
+Usage (from the backend directory):
+    python -m database.migrate [path/to/securelink.db]
+"""
+import os
+import re
+import sys
+import sqlite3
+import logging
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), 'migrations')
+MIGRATION_PATTERN = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+
+def discover_migrations():
+    """
+    List the migration files shipped with the application
+
+    Returns:
+        list: (version, name, path) tuples ordered by version
+    """
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = MIGRATION_PATTERN.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    return sorted(migrations)
+
+
+def get_schema_version(conn):
+    """Return the highest applied migration version (0 for a new database)"""
+    try:
+        row = conn.execute('SELECT MAX(version) FROM schema_migrations').fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] or 0
+
+
+def _split_statements(script):
+    """Split a SQL script into complete statements"""
+    statements = []
+    buffer = ''
+    for line in script.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statements.append(buffer.strip())
+            buffer = ''
+    if buffer.strip() and not all(l.strip().startswith('--') for l in buffer.strip().splitlines()):
+        raise ValueError('Migration ends with an incomplete statement')
+    return statements
+
+
+def migrate(db_path):
+    """
+    Bring the database up to the latest schema version
+
+    Pending migrations run in one transaction holding the write lock, and
+    the version is re-read under that lock, so workers booting at the same
+    time apply each migration exactly once.
+
+    Args:
+        db_path (str): Path of the SQLite database file
+
+    Returns:
+        list: Names of the migrations that were applied
+    """
+    migrations = discover_migrations()
+    latest = migrations[-1][0] if migrations else 0
+
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+    try:
+        if get_schema_version(conn) >= latest:
+            return []
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name VARCHAR(100) NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            current = get_schema_version(conn)
+
+            applied = []
+            for version, name, path in migrations:
+                if version <= current:
+                    continue
+                with open(path, 'r') as f:
+                    for statement in _split_statements(f.read()):
+                        conn.execute(statement)
+                conn.execute('INSERT INTO schema_migrations (version, name) VALUES (?, ?)', (version, name))
+                applied.append(f'{version:04d}_{name}')
+
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+    finally:
+        conn.close()
+
+    for name in applied:
+        logger.info(f"Applied migration {name}")
+    return applied
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    path = sys.argv[1] if len(sys.argv) > 1 else 'securelink.db'
+    applied = migrate(path)
+    conn = sqlite3.connect(path)
+    version = get_schema_version(conn)
+    conn.close()
+    print(f"{path}: schema version {version} ({len(applied)} migration(s) applied)")
@@ -0,0 +1,18 @@
+-- Ephemeral messages: optional expiry per message
+ALTER TABLE messages ADD COLUMN expires_at TIMESTAMP;
+
+-- Only expiring rows are indexed; used by read filters and the sweeper
+CREATE INDEX IF NOT EXISTS idx_messages_expires ON messages(expires_at) WHERE expires_at IS NOT NULL;
+
+-- Default time-to-live for messages exchanged between two users
+CREATE TABLE IF NOT EXISTS conversation_ttls (
+    user_low_id INTEGER NOT NULL,
+    user_high_id INTEGER NOT NULL,
+    ttl_seconds INTEGER NOT NULL,
+    updated_by INTEGER,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_low_id, user_high_id),
+    FOREIGN KEY (user_low_id) REFERENCES users(id),
+    FOREIGN KEY (user_high_id) REFERENCES users(id),
+    FOREIGN KEY (updated_by) REFERENCES users(id)
+);
@@ -0,0 +1,8 @@
+-- Archived messages live in append-only segment files; deleting one
+-- records a tombstone that archive reads filter out
+CREATE TABLE IF NOT EXISTS archived_message_deletions (
+    message_id INTEGER PRIMARY KEY,
+    deleted_by INTEGER NOT NULL,
+    deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (deleted_by) REFERENCES users(id)
+);
@@ -0,0 +1,44 @@
+-- One row per pair of users, maintained when messages are sent or deleted
+CREATE TABLE IF NOT EXISTS conversations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_low_id INTEGER NOT NULL,
+    user_high_id INTEGER NOT NULL,
+    last_message_id INTEGER,
+    last_message_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_low_id, user_high_id),
+    FOREIGN KEY (user_low_id) REFERENCES users(id),
+    FOREIGN KEY (user_high_id) REFERENCES users(id)
+);
+
+-- Per-participant inbox state; last_activity_id is the id of the newest
+-- message ever sent in the conversation and orders the inbox
+CREATE TABLE IF NOT EXISTS conversation_participants (
+    conversation_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    peer_id INTEGER NOT NULL,
+    last_activity_id INTEGER NOT NULL,
+    last_read_message_id INTEGER NOT NULL DEFAULT 0,
+    unread_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (conversation_id, user_id),
+    FOREIGN KEY (conversation_id) REFERENCES conversations(id),
+    FOREIGN KEY (user_id) REFERENCES users(id),
+    FOREIGN KEY (peer_id) REFERENCES users(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_participants_inbox ON conversation_participants(user_id, last_activity_id);
+
+-- Latest message and unread counts of a pair without scanning either user's history
+CREATE INDEX IF NOT EXISTS idx_messages_pair ON messages(sender_id, receiver_id);
+
+-- Backfill from existing messages; earlier history counts as read
+INSERT OR IGNORE INTO conversations (user_low_id, user_high_id, last_message_id, last_message_at)
+SELECT MIN(sender_id, receiver_id), MAX(sender_id, receiver_id), MAX(id), MAX(timestamp)
+FROM messages
+GROUP BY MIN(sender_id, receiver_id), MAX(sender_id, receiver_id);
+
+INSERT OR IGNORE INTO conversation_participants (conversation_id, user_id, peer_id, last_activity_id, last_read_message_id)
+SELECT id, user_low_id, user_high_id, last_message_id, last_message_id FROM conversations;
+
+INSERT OR IGNORE INTO conversation_participants (conversation_id, user_id, peer_id, last_activity_id, last_read_message_id)
+SELECT id, user_high_id, user_low_id, last_message_id, last_message_id FROM conversations;
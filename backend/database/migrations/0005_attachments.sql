@@ -0,0 +1,35 @@
+-- Content-addressed ciphertext: identical uploads share one blob file,
+-- removed when the last attachment referencing it is deleted
+CREATE TABLE IF NOT EXISTS attachment_blobs (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- One row per upload; sha256 is set once every chunk has been received
+CREATE TABLE IF NOT EXISTS attachments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner_id INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP,
+    FOREIGN KEY (owner_id) REFERENCES users(id),
+    FOREIGN KEY (sha256) REFERENCES attachment_blobs(sha256)
+);
+
+CREATE INDEX IF NOT EXISTS idx_attachments_owner ON attachments(owner_id);
+
+-- Users other than the owner who received the attachment in a message;
+-- kept apart from messages so access survives archival
+CREATE TABLE IF NOT EXISTS attachment_grants (
+    attachment_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (attachment_id, user_id),
+    FOREIGN KEY (attachment_id) REFERENCES attachments(id),
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+ALTER TABLE messages ADD COLUMN attachment_id INTEGER REFERENCES attachments(id);
@@ -0,0 +1,51 @@
+-- Group channels: each message's ciphertext is stored once, encrypted
+-- with the group's current symmetric key
+CREATE TABLE IF NOT EXISTS group_channels (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(100) NOT NULL,
+    owner_id INTEGER NOT NULL,
+    key_version INTEGER NOT NULL DEFAULT 1,
+    rekey_required BOOLEAN NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (owner_id) REFERENCES users(id)
+);
+
+CREATE TABLE IF NOT EXISTS group_members (
+    group_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (group_id, user_id),
+    FOREIGN KEY (group_id) REFERENCES group_channels(id),
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_group_members_user ON group_members(user_id);
+
+-- The group key wrapped with each member's RSA public key, once per key
+-- version rather than once per message
+CREATE TABLE IF NOT EXISTS group_key_envelopes (
+    group_id INTEGER NOT NULL,
+    key_version INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    encrypted_key TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (group_id, key_version, user_id),
+    FOREIGN KEY (group_id) REFERENCES group_channels(id),
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+CREATE TABLE IF NOT EXISTS group_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    group_id INTEGER NOT NULL,
+    sender_id INTEGER NOT NULL,
+    key_version INTEGER NOT NULL,
+    encrypted_content TEXT NOT NULL,
+    iv TEXT NOT NULL,
+    algorithm VARCHAR(20) DEFAULT 'AES-256-CBC',
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (group_id) REFERENCES group_channels(id),
+    FOREIGN KEY (sender_id) REFERENCES users(id)
+);
+
+-- Group history pages are range scans of one group
+CREATE INDEX IF NOT EXISTS idx_group_messages_group ON group_messages(group_id, id);
@@ -0,0 +1,7 @@
+-- Row timestamp for conditional GETs of profiles and the user directory;
+-- existing rows start at their creation time
+ALTER TABLE users ADD COLUMN updated_at TIMESTAMP;
+
+UPDATE users SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP);
+
+CREATE INDEX IF NOT EXISTS idx_users_updated ON users(updated_at);
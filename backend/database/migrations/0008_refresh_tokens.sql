@@ -0,0 +1,7 @@
+-- Refresh token rotation: a session accepts only its latest refresh token
+-- (and, briefly, the one it replaced). Sessions now last as long as their
+-- refresh token; sessions from before this migration have no refresh_jti
+-- and must log in again.
+ALTER TABLE sessions ADD COLUMN refresh_jti VARCHAR(64);
+ALTER TABLE sessions ADD COLUMN previous_refresh_jti VARCHAR(64);
+ALTER TABLE sessions ADD COLUMN refreshed_at TIMESTAMP;
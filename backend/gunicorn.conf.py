@@ -0,0 +1,35 @@
+"""
+Gunicorn configuration for the SecureLink API
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Worker and thread counts come from Config (API_WORKERS, API_THREADS).
+The app is preloaded in the master, so imports and migrations run once
+before forking instead of once per worker.
+"""
+from config import Config
+
+bind = f'{Config.API_HOST}:{Config.API_PORT}'
+workers = Config.API_WORKERS
+threads = Config.API_THREADS
+worker_class = 'gthread'
+timeout = Config.API_TIMEOUT
+graceful_timeout = Config.API_TIMEOUT
+keepalive = 5
+preload_app = True
+
+# Recycle workers periodically to bound memory growth
+max_requests = 10000
+max_requests_jitter = 1000
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """Drop database connections inherited from the preloaded master"""
+    from database.db import db
+
+    app = server.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
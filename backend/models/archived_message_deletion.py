@@ -0,0 +1,32 @@
+from database.db import db
+from datetime import datetime
+
+class ArchivedMessageDeletion(db.Model):
+    __tablename__ = 'archived_message_deletions'
+    
+    # Segment files are append-only, so deleted archived messages are tombstoned
+    message_id = db.Column(db.Integer, primary_key=True)
+    deleted_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @staticmethod
+    def deleted_ids(message_ids):
+        """Return the subset of message_ids that have been deleted"""
+        if not message_ids:
+            return set()
+        rows = db.session.query(ArchivedMessageDeletion.message_id)\
+            .filter(ArchivedMessageDeletion.message_id.in_(message_ids)).all()
+        return {row.message_id for row in rows}
+    
+    @staticmethod
+    def count():
+        """Number of tombstones; grows with every archived message deleted"""
+        return db.session.query(db.func.count(ArchivedMessageDeletion.message_id)).scalar()
+    
+    def to_dict(self):
+        """Convert tombstone to dictionary"""
+        return {
+            'message_id': self.message_id,
+            'deleted_by': self.deleted_by,
+            'deleted_at': self.deleted_at.isoformat() if self.deleted_at else None
+        }
@@ -0,0 +1,87 @@
+from database.db import db
+from datetime import datetime
+
+class AttachmentBlob(db.Model):
+    __tablename__ = 'attachment_blobs'
+    
+    # Ciphertext is stored once per distinct content, named by its SHA-256
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @staticmethod
+    def add_reference(sha256, size):
+        """Count one more attachment using a blob, creating its row on first use"""
+        db.session.execute(
+            db.text(
+                'INSERT INTO attachment_blobs (sha256, size, ref_count, created_at) VALUES (:sha256, :size, 1, :now) '
+                'ON CONFLICT (sha256) DO UPDATE SET ref_count = ref_count + 1'
+            ),
+            {'sha256': sha256, 'size': size, 'now': datetime.utcnow()}
+        )
+    
+    @staticmethod
+    def remove_reference(sha256):
+        """
+        Drop one reference to a blob, deleting its row with the last one
+        
+        Returns:
+            bool: True if no attachment uses the blob any more
+        """
+        db.session.execute(
+            db.update(AttachmentBlob)
+            .where(AttachmentBlob.sha256 == sha256)
+            .values(ref_count=AttachmentBlob.ref_count - 1)
+        )
+        result = db.session.execute(
+            db.delete(AttachmentBlob)
+            .where(AttachmentBlob.sha256 == sha256)
+            .where(AttachmentBlob.ref_count <= 0)
+        )
+        return result.rowcount > 0
+
+class Attachment(db.Model):
+    __tablename__ = 'attachments'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    size = db.Column(db.Integer, nullable=False)
+    # Set when the last chunk has arrived
+    sha256 = db.Column(db.String(64), db.ForeignKey('attachment_blobs.sha256'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    
+    @property
+    def is_complete(self):
+        return self.sha256 is not None
+    
+    def can_read(self, user_id):
+        """Check if a user owns the attachment or received it in a message"""
+        if self.owner_id == user_id:
+            return True
+        return AttachmentGrant.query.get((self.id, user_id)) is not None
+    
+    def grant(self, user_id):
+        """Let a message recipient download the attachment"""
+        if user_id != self.owner_id and not AttachmentGrant.query.get((self.id, user_id)):
+            db.session.add(AttachmentGrant(attachment_id=self.id, user_id=user_id))
+    
+    def to_dict(self):
+        """Convert attachment to dictionary"""
+        return {
+            'id': self.id,
+            'owner_id': self.owner_id,
+            'size': self.size,
+            'sha256': self.sha256,
+            'status': 'complete' if self.is_complete else 'uploading',
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
+
+class AttachmentGrant(db.Model):
+    __tablename__ = 'attachment_grants'
+    
+    attachment_id = db.Column(db.Integer, db.ForeignKey('attachments.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,202 @@
+from database.db import db
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+
+class Conversation(db.Model):
+    __tablename__ = 'conversations'
+    __table_args__ = (db.UniqueConstraint('user_low_id', 'user_high_id'),)
+    
+    # The pair is stored ordered so each conversation has exactly one row
+    id = db.Column(db.Integer, primary_key=True)
+    user_low_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_high_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    last_message_id = db.Column(db.Integer, nullable=True)
+    last_message_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    participants = db.relationship('ConversationParticipant', backref='conversation', lazy='select')
+    
+    @staticmethod
+    def get_for(user_id, peer_id):
+        """Get the conversation between two users, if any"""
+        low, high = sorted((user_id, peer_id))
+        return Conversation.query.filter_by(user_low_id=low, user_high_id=high).first()
+    
+    @staticmethod
+    def get_or_create(user_id, peer_id):
+        """Get the conversation between two users, creating it on first contact"""
+        conversation = Conversation.get_for(user_id, peer_id)
+        if conversation:
+            return conversation
+        
+        low, high = sorted((user_id, peer_id))
+        try:
+            # A concurrent first message may create the same pair; only this savepoint is lost
+            with db.session.begin_nested():
+                conversation = Conversation(user_low_id=low, user_high_id=high)
+                db.session.add(conversation)
+                db.session.flush()
+                for member, peer in {(low, high), (high, low)}:
+                    db.session.add(ConversationParticipant(
+                        conversation_id=conversation.id,
+                        user_id=member,
+                        peer_id=peer,
+                        last_activity_id=0
+                    ))
+        except IntegrityError:
+            conversation = Conversation.get_for(user_id, peer_id)
+        return conversation
+    
+    @staticmethod
+    def record_message(message):
+        """
+        Update the summary for a newly sent message
+        
+        Runs in the caller's transaction; the message must be flushed so
+        that it has an id. Counters are updated in SQL so concurrent sends
+        cannot lose increments.
+        
+        Returns:
+            Conversation: The conversation the message belongs to
+        """
+        conversation = Conversation.get_or_create(message.sender_id, message.receiver_id)
+        
+        db.session.execute(
+            db.update(Conversation)
+            .where(Conversation.id == conversation.id)
+            .where(db.or_(Conversation.last_message_id.is_(None), Conversation.last_message_id < message.id))
+            .values(last_message_id=message.id, last_message_at=message.timestamp)
+        )
+        db.session.execute(
+            db.update(ConversationParticipant)
+            .where(ConversationParticipant.conversation_id == conversation.id)
+            .where(ConversationParticipant.last_activity_id < message.id)
+            .values(last_activity_id=message.id)
+        )
+        if message.receiver_id != message.sender_id:
+            db.session.execute(
+                db.update(ConversationParticipant)
+                .where(ConversationParticipant.conversation_id == conversation.id)
+                .where(ConversationParticipant.user_id == message.receiver_id)
+                .values(unread_count=ConversationParticipant.unread_count + 1)
+            )
+        else:
+            # Own notes never count as unread
+            db.session.execute(
+                db.update(ConversationParticipant)
+                .where(ConversationParticipant.conversation_id == conversation.id)
+                .values(last_read_message_id=message.id)
+            )
+        return conversation
+    
+    @staticmethod
+    def forget_messages(messages):
+        """
+        Update summaries after messages have been deleted
+        
+        Runs in the caller's transaction, after the rows are gone. Unread
+        counts drop for deleted messages the receiver had not read yet, and
+        a deleted last message is replaced by the newest remaining one.
+        
+        Args:
+            messages (list): (id, sender_id, receiver_id) tuples
+        """
+        from models.message import Message
+        
+        by_pair = {}
+        for message_id, sender_id, receiver_id in messages:
+            by_pair.setdefault(tuple(sorted((sender_id, receiver_id))), []).append((message_id, receiver_id, sender_id))
+        
+        for (low, high), deleted in by_pair.items():
+            conversation = Conversation.query.filter_by(user_low_id=low, user_high_id=high).first()
+            if not conversation:
+                continue
+            
+            for participant in conversation.participants:
+                unread = sum(
+                    1 for message_id, receiver_id, sender_id in deleted
+                    if receiver_id == participant.user_id and sender_id != receiver_id
+                    and message_id > participant.last_read_message_id
+                )
+                if unread:
+                    db.session.execute(
+                        db.update(ConversationParticipant)
+                        .where(ConversationParticipant.conversation_id == conversation.id)
+                        .where(ConversationParticipant.user_id == participant.user_id)
+                        .values(unread_count=db.case(
+                            (ConversationParticipant.unread_count > unread, ConversationParticipant.unread_count - unread),
+                            else_=0
+                        ))
+                    )
+            
+            if conversation.last_message_id in {message_id for message_id, _, _ in deleted}:
+                latest = Message.query\
+                    .filter(db.or_(
+                        db.and_(Message.sender_id == low, Message.receiver_id == high),
+                        db.and_(Message.sender_id == high, Message.receiver_id == low)
+                    ))\
+                    .order_by(Message.id.desc())\
+                    .first()
+                conversation.last_message_id = latest.id if latest else None
+                conversation.last_message_at = latest.timestamp if latest else conversation.last_message_at
+    
+    def to_dict(self):
+        """Convert conversation to dictionary"""
+        return {
+            'id': self.id,
+            'user_ids': [self.user_low_id, self.user_high_id],
+            'last_message_id': self.last_message_id,
+            'last_message_at': self.last_message_at.isoformat() if self.last_message_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class ConversationParticipant(db.Model):
+    __tablename__ = 'conversation_participants'
+    __table_args__ = (db.Index('idx_participants_inbox', 'user_id', 'last_activity_id'),)
+    
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    peer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Newest message id ever sent in the conversation; orders the inbox
+    last_activity_id = db.Column(db.Integer, nullable=False, default=0)
+    last_read_message_id = db.Column(db.Integer, nullable=False, default=0)
+    unread_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def mark_read(self, up_to=None):
+        """
+        Mark messages up to a message id (default: all) as read
+        
+        Args:
+            up_to (int): Last message id the user has seen (optional)
+        """
+        from models.message import Message
+        
+        db.session.refresh(self)
+        up_to = self.last_activity_id if up_to is None else min(up_to, self.last_activity_id)
+        if up_to <= self.last_read_message_id:
+            return
+        
+        # Recounted in SQL so a message arriving concurrently is not lost
+        unread = db.select(db.func.count(Message.id))\
+            .where(Message.sender_id == self.peer_id)\
+            .where(Message.receiver_id == self.user_id)\
+            .where(Message.id > up_to)\
+            .scalar_subquery()
+        db.session.execute(
+            db.update(ConversationParticipant)
+            .where(ConversationParticipant.conversation_id == self.conversation_id)
+            .where(ConversationParticipant.user_id == self.user_id)
+            .values(last_read_message_id=up_to, unread_count=unread)
+        )
+        db.session.refresh(self)
+    
+    def to_dict(self):
+        """Convert inbox entry to dictionary"""
+        return {
+            'conversation_id': self.conversation_id,
+            'user_id': self.user_id,
+            'peer_id': self.peer_id,
+            'last_activity_id': self.last_activity_id,
+            'last_read_message_id': self.last_read_message_id,
+            'unread_count': self.unread_count
+        }
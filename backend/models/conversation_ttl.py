@@ -0,0 +1,45 @@
+from database.db import db
+from datetime import datetime
+
+class ConversationTTL(db.Model):
+    __tablename__ = 'conversation_ttls'
+    
+    # The pair is stored ordered so each conversation has exactly one row
+    user_low_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    user_high_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    ttl_seconds = db.Column(db.Integer, nullable=False)
+    updated_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @staticmethod
+    def get_for(user_id, peer_id):
+        """Get the TTL setting shared by two users, if any"""
+        low, high = sorted((user_id, peer_id))
+        return ConversationTTL.query.get((low, high))
+    
+    @staticmethod
+    def set_for(user_id, peer_id, ttl_seconds):
+        """Set or clear (ttl_seconds=None) the TTL shared by two users"""
+        low, high = sorted((user_id, peer_id))
+        setting = ConversationTTL.query.get((low, high))
+        
+        if ttl_seconds is None:
+            if setting:
+                db.session.delete(setting)
+            return None
+        
+        if not setting:
+            setting = ConversationTTL(user_low_id=low, user_high_id=high)
+            db.session.add(setting)
+        setting.ttl_seconds = ttl_seconds
+        setting.updated_by = user_id
+        return setting
+    
+    def to_dict(self):
+        """Convert setting to dictionary"""
+        return {
+            'user_ids': [self.user_low_id, self.user_high_id],
+            'ttl_seconds': self.ttl_seconds,
+            'updated_by': self.updated_by,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -0,0 +1,92 @@
+from database.db import db
+from datetime import datetime
+
+class Group(db.Model):
+    __tablename__ = 'group_channels'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    owner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Version of the group key new messages must be encrypted with
+    key_version = db.Column(db.Integer, nullable=False, default=1)
+    # Set when a member leaves; sending is refused until the key is rotated
+    rekey_required = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def member_ids(self):
+        """Ids of the current members"""
+        rows = db.session.query(GroupMember.user_id).filter(GroupMember.group_id == self.id).all()
+        return {row.user_id for row in rows}
+    
+    def is_member(self, user_id):
+        return GroupMember.query.get((self.id, user_id)) is not None
+    
+    def add_envelopes(self, key_version, envelopes):
+        """
+        Store the group key wrapped for each member
+        
+        Args:
+            key_version (int): Key version the envelopes belong to
+            envelopes (dict): user_id -> encrypted_key
+        """
+        db.session.execute(GroupKeyEnvelope.__table__.insert(), [{
+            'group_id': self.id,
+            'key_version': key_version,
+            'user_id': user_id,
+            'encrypted_key': encrypted_key,
+            'created_at': datetime.utcnow()
+        } for user_id, encrypted_key in envelopes.items()])
+    
+    def to_dict(self):
+        """Convert group to dictionary"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'owner_id': self.owner_id,
+            'key_version': self.key_version,
+            'rekey_required': self.rekey_required,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class GroupMember(db.Model):
+    __tablename__ = 'group_members'
+    
+    group_id = db.Column(db.Integer, db.ForeignKey('group_channels.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True, index=True)
+    joined_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class GroupKeyEnvelope(db.Model):
+    __tablename__ = 'group_key_envelopes'
+    
+    group_id = db.Column(db.Integer, db.ForeignKey('group_channels.id'), primary_key=True)
+    key_version = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    encrypted_key = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class GroupMessage(db.Model):
+    __tablename__ = 'group_messages'
+    __table_args__ = (db.Index('idx_group_messages_group', 'group_id', 'id'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    group_id = db.Column(db.Integer, db.ForeignKey('group_channels.id'), nullable=False)
+    sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Decrypt with the reader's envelope for this version
+    key_version = db.Column(db.Integer, nullable=False)
+    encrypted_content = db.Column(db.Text, nullable=False)
+    iv = db.Column(db.Text, nullable=False)
+    algorithm = db.Column(db.String(20), default='AES-256-CBC')
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convert group message to dictionary"""
+        return {
+            'id': self.id,
+            'group_id': self.group_id,
+            'sender_id': self.sender_id,
+            'key_version': self.key_version,
+            'encrypted_content': self.encrypted_content,
+            'iv': self.iv,
+            'algorithm': self.algorithm,
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None
+        }
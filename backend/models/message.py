@@ -12,6 +12,38 @@ class Message(db.Model):
     encrypted_aes_key = db.Column(db.Text, nullable=False)
     algorithm = db.Column(db.String(20), default='AES-256-CBC')
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=True)
+    # Encrypted file sent with the message; its key travels in encrypted_content
+    attachment_id = db.Column(db.Integer, db.ForeignKey('attachments.id'), nullable=True)
+    
+    @staticmethod
+    def not_expired(now=None):
+        """SQL filter that excludes expired messages"""
+        now = now or datetime.utcnow()
+        return db.or_(Message.expires_at.is_(None), Message.expires_at > now)
+    
+    @staticmethod
+    def history_version(user_id, before=None):
+        """
+        Validator for a user's visible messages below an optional cursor
+        
+        Sending raises the max id, deleting or expiring lowers the count and
+        deleting an attachment lowers the attachment count.
+        
+        Returns:
+            tuple: (count, highest id, messages with an attachment)
+        """
+        query = db.session.query(
+            db.func.count(Message.id), db.func.max(Message.id), db.func.count(Message.attachment_id)
+        ).filter(db.or_(Message.sender_id == user_id, Message.receiver_id == user_id))\
+            .filter(Message.not_expired())
+        if before is not None:
+            query = query.filter(Message.id < before)
+        return tuple(query.one())
+    
+    def is_expired(self, now=None):
+        """Check if the message has passed its expiry time"""
+        return self.expires_at is not None and self.expires_at <= (now or datetime.utcnow())
     
     def to_dict(self):
         """Convert message to dictionary"""
@@ -25,5 +57,7 @@ class Message(db.Model):
             'iv': self.iv,
             'encrypted_aes_key': self.encrypted_aes_key,
             'algorithm': self.algorithm,
-            'timestamp': self.timestamp.isoformat() if self.timestamp else None
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'attachment_id': self.attachment_id
         }
@@ -12,6 +12,10 @@ class Session(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     expires_at = db.Column(db.DateTime, nullable=True)
     is_active = db.Column(db.Boolean, default=True)
+    # Refresh token rotation: only the latest jti may refresh
+    refresh_jti = db.Column(db.String(64), nullable=True)
+    previous_refresh_jti = db.Column(db.String(64), nullable=True)
+    refreshed_at = db.Column(db.DateTime, nullable=True)
     
     # Relationships
     logs = db.relationship('CommunicationLog', backref='session', lazy='dynamic')
@@ -25,5 +29,6 @@ class Session(db.Model):
             'user_agent': self.user_agent,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'refreshed_at': self.refreshed_at.isoformat() if self.refreshed_at else None,
             'is_active': self.is_active
         }
@@ -12,6 +12,8 @@ class User(db.Model):
     public_key = db.Column(db.Text, nullable=True)
     private_key_encrypted = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Validator for conditional GETs of profiles and the directory
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationships
     sent_messages = db.relationship('Message', foreign_keys='Message.sender_id', backref='sender', lazy='dynamic')
@@ -27,6 +29,29 @@ class User(db.Model):
         """Check if the provided password matches the hash"""
         return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
     
+    @staticmethod
+    def version_of(user_id):
+        """
+        Validator for one user's profile, without loading the row
+        
+        Returns:
+            tuple: (updated_at,), or None if there is no such user
+        """
+        row = db.session.query(User.updated_at).filter(User.id == user_id).first()
+        return tuple(row) if row else None
+    
+    @staticmethod
+    def directory_version():
+        """
+        Validator for user listings: changes when any user is added or updated
+        
+        Returns:
+            tuple: (count, highest id, latest updated_at)
+        """
+        return tuple(db.session.query(
+            db.func.count(User.id), db.func.max(User.id), db.func.max(User.updated_at)
+        ).one())
+    
     def to_dict(self):
         """Convert user to dictionary"""
         return {
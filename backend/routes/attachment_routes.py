@@ -0,0 +1,219 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from werkzeug.wsgi import wrap_file
+from datetime import datetime
+from models.attachment import Attachment, AttachmentBlob, AttachmentGrant
+from models.message import Message
+from database.db import db, log_communication
+
+attachment_bp = Blueprint('attachments', __name__, url_prefix='/api/attachments')
+
+def describe(attachment):
+    """Attachment dictionary with upload progress"""
+    data = attachment.to_dict()
+    if attachment.is_complete:
+        data['received'] = attachment.size
+    else:
+        data['received'] = current_app.extensions['attachment_store'].received(attachment.id)
+    return data
+
+def finalize_upload(attachment):
+    """
+    Move a fully received upload into content-addressed blob storage
+    
+    The row is claimed first with a compare-and-set, which takes the
+    database write lock: an overlapping request for the same upload (a
+    client retry of the last chunk) waits, then finds it finalized and
+    skips. The lock is held until the commit after the move, so a
+    concurrent delete of the same blob cannot remove it in between.
+    
+    Returns:
+        bool: False if another request already finalized the upload
+    """
+    completed_at = datetime.utcnow()
+    result = db.session.execute(
+        db.update(Attachment)
+        .where(Attachment.id == attachment.id)
+        .where(Attachment.sha256.is_(None))
+        .values(completed_at=completed_at)
+    )
+    if result.rowcount == 0:
+        db.session.rollback()
+        return False
+    
+    store = current_app.extensions['attachment_store']
+    sha256 = store.digest(attachment.id)
+    
+    AttachmentBlob.add_reference(sha256, attachment.size)
+    store.commit_blob(attachment.id, sha256)
+    attachment.sha256 = sha256
+    attachment.completed_at = completed_at
+    db.session.commit()
+    
+    log_communication(attachment.owner_id, 'ATTACHMENT_UPLOADED', f'Attachment {attachment.id} uploaded')
+    return True
+
+@attachment_bp.route('', methods=['POST'])
+@jwt_required()
+def create_upload():
+    """
+    Start a resumable upload of an encrypted attachment
+    
+    The client sends the ciphertext size up front, then the bytes with
+    PUT /<id>/content?offset=N in chunks of at most chunk_size.
+    """
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    size = data.get('size')
+    
+    if isinstance(size, bool) or not isinstance(size, int) or size <= 0:
+        return jsonify({'error': 'size must be a positive integer'}), 400
+    if size > current_app.config['ATTACHMENT_MAX_SIZE']:
+        return jsonify({'error': f"size cannot exceed {current_app.config['ATTACHMENT_MAX_SIZE']} bytes"}), 413
+    
+    attachment = Attachment(owner_id=user_id, size=size)
+    db.session.add(attachment)
+    db.session.commit()
+    
+    return jsonify({
+        'attachment': describe(attachment),
+        'chunk_size': current_app.config['ATTACHMENT_CHUNK_SIZE']
+    }), 201
+
+@attachment_bp.route('/<int:attachment_id>', methods=['GET'])
+@jwt_required()
+def get_attachment(attachment_id):
+    """Get an attachment's status; received tells an interrupted upload where to resume"""
+    user_id = get_jwt_identity()
+    attachment = Attachment.query.get(attachment_id)
+    
+    if not attachment:
+        return jsonify({'error': 'Attachment not found'}), 404
+    if not attachment.can_read(user_id):
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    return jsonify({
+        'attachment': describe(attachment),
+        'chunk_size': current_app.config['ATTACHMENT_CHUNK_SIZE']
+    }), 200
+
+@attachment_bp.route('/<int:attachment_id>/content', methods=['PUT'])
+@jwt_required()
+def upload_chunk(attachment_id):
+    """
+    Upload the next chunk of ciphertext as a raw request body
+    
+    The body is streamed to disk. A chunk that does not start at the
+    current end of the upload is rejected with 409 and the offset to
+    continue from; the last chunk completes the upload.
+    """
+    user_id = get_jwt_identity()
+    attachment = Attachment.query.get(attachment_id)
+    
+    if not attachment:
+        return jsonify({'error': 'Attachment not found'}), 404
+    if attachment.owner_id != user_id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    if attachment.is_complete:
+        return jsonify({'error': 'Upload already complete', 'attachment': describe(attachment)}), 409
+    
+    store = current_app.extensions['attachment_store']
+    received = store.received(attachment.id)
+    
+    # A retry after the last chunk was stored only needs to finish the upload
+    if received < attachment.size:
+        offset = request.args.get('offset', type=int)
+        length = request.content_length
+        if offset is None:
+            return jsonify({'error': 'offset query parameter is required'}), 400
+        if not length:
+            return jsonify({'error': 'Content-Length is required and must be positive'}), 411
+        if length > current_app.config['ATTACHMENT_CHUNK_SIZE']:
+            return jsonify({'error': f"Chunks cannot exceed {current_app.config['ATTACHMENT_CHUNK_SIZE']} bytes"}), 413
+        if offset + length > attachment.size:
+            return jsonify({'error': 'Chunk extends past the declared size'}), 400
+        
+        received, error = store.write_chunk(attachment.id, offset, request.stream, length)
+        if error:
+            return jsonify({'error': error, 'received': received}), 409
+    
+    if received == attachment.size:
+        finalize_upload(attachment)
+    
+    return jsonify({'attachment': describe(attachment)}), 200
+
+@attachment_bp.route('/<int:attachment_id>/content', methods=['GET'])
+@jwt_required()
+def download(attachment_id):
+    """
+    Download an attachment's ciphertext, honouring a single-range Range header
+    
+    The file is handed to the server's wsgi.file_wrapper, so gunicorn sends
+    it with sendfile() without copying it through Python.
+    """
+    user_id = get_jwt_identity()
+    attachment = Attachment.query.get(attachment_id)
+    
+    if not attachment or not attachment.is_complete:
+        return jsonify({'error': 'Attachment not found'}), 404
+    if not attachment.can_read(user_id):
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    size = attachment.size
+    start, length, status = 0, size, 200
+    # Multiple ranges are answered with the whole file
+    if request.range and len(request.range.ranges) == 1:
+        byte_range = request.range.range_for_length(size)
+        if byte_range is None:
+            response = jsonify({'error': 'Requested range not satisfiable'})
+            response.headers['Content-Range'] = f'bytes */{size}'
+            return response, 416
+        start, length, status = byte_range[0], byte_range[1] - byte_range[0], 206
+    
+    body = current_app.extensions['attachment_store'].open_range(attachment.sha256, start, length)
+    if body is None:
+        return jsonify({'error': 'Attachment not found'}), 404
+    
+    response = current_app.response_class(
+        wrap_file(request.environ, body),
+        status=status,
+        mimetype='application/octet-stream',
+        direct_passthrough=True
+    )
+    response.content_length = length
+    response.accept_ranges = 'bytes'
+    if status == 206:
+        response.headers['Content-Range'] = f'bytes {start}-{start + length - 1}/{size}'
+    return response
+
+@attachment_bp.route('/<int:attachment_id>', methods=['DELETE'])
+@jwt_required()
+def delete_attachment(attachment_id):
+    """Delete an attachment or abandon its upload; the blob goes with its last reference"""
+    user_id = get_jwt_identity()
+    attachment = Attachment.query.get(attachment_id)
+    
+    if not attachment:
+        return jsonify({'error': 'Attachment not found'}), 404
+    if attachment.owner_id != user_id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    store = current_app.extensions['attachment_store']
+    sha256 = attachment.sha256
+    orphaned = AttachmentBlob.remove_reference(sha256) if sha256 else False
+    db.session.execute(db.delete(AttachmentGrant).where(AttachmentGrant.attachment_id == attachment.id))
+    db.session.execute(
+        db.update(Message).where(Message.attachment_id == attachment.id).values(attachment_id=None)
+    )
+    db.session.delete(attachment)
+    
+    # Removed before the commit releases the write lock; see finalize_upload
+    if orphaned:
+        store.remove_blob(sha256)
+    elif not sha256:
+        store.discard_part(attachment.id)
+    db.session.commit()
+    
+    log_communication(user_id, 'ATTACHMENT_DELETED', f'Attachment {attachment_id} deleted')
+    
+    return jsonify({'message': 'Attachment deleted successfully'}), 200
@@ -1,11 +1,15 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from services.auth_service import AuthService
 from services.crypto_service import CryptoService
+from services.rate_limiter import rate_limit
+from models.user import User
+from utils.conditional import conditional
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
 @auth_bp.route('/register', methods=['POST'])
+@rate_limit('register')
 def register():
     """Register a new user"""
     data = request.get_json()
@@ -32,6 +36,7 @@ def register():
     }), 201
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit('login')
 def login():
     """Login user and return JWT tokens"""
     data = request.get_json()
@@ -63,14 +68,40 @@ def login():
 def logout():
     """Logout user"""
     user_id = get_jwt_identity()
-    session_id = request.get_json().get('session_id')
+    data = request.get_json(silent=True) or {}
+    session_id = get_jwt().get('sid') or data.get('session_id')
     
     AuthService.logout_user(user_id, session_id)
     
     return jsonify({'message': 'Logged out successfully'}), 200
 
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    """
+    Exchange a refresh token for a new access token and refresh token
+    
+    The old refresh token stops working. A request that lost a race with
+    a concurrent refresh gets an access token only and keeps the refresh
+    token its sibling received.
+    """
+    claims = get_jwt()
+    
+    access_token, refresh_token, error = AuthService.refresh_tokens(
+        get_jwt_identity(), claims.get('sid'), claims['jti']
+    )
+    
+    if error:
+        return jsonify({'error': error}), 401
+    
+    tokens = {'access_token': access_token}
+    if refresh_token:
+        tokens['refresh_token'] = refresh_token
+    return jsonify(tokens), 200
+
 @auth_bp.route('/verify', methods=['GET'])
 @jwt_required()
+@conditional(lambda: User.version_of(get_jwt_identity()))
 def verify():
     """Verify JWT token and return user info"""
     user_id = get_jwt_identity()
@@ -82,6 +113,7 @@ def verify():
     return jsonify({'user': user.to_dict()}), 200
 
 @auth_bp.route('/keypair', methods=['GET'])
+@rate_limit('keypair')
 def generate_keypair():
     """Generate RSA keypair for client"""
     private_key, public_key = CryptoService.generate_rsa_keypair()
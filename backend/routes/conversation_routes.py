@@ -0,0 +1,90 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models.conversation import Conversation, ConversationParticipant
+from models.message import Message
+from models.user import User
+from models.archived_message_deletion import ArchivedMessageDeletion
+from database.db import db
+
+conversation_bp = Blueprint('conversations', __name__, url_prefix='/api/conversations')
+
+@conversation_bp.route('', methods=['GET'])
+@jwt_required()
+def get_inbox():
+    """
+    List the current user's conversations, most recent first
+    
+    Pass ?before=<next_cursor>&limit=N to page. Each page is one range scan
+    over the participant index plus one lookup each for peers and last
+    messages, regardless of how many messages the conversations hold.
+    """
+    user_id = get_jwt_identity()
+    before = request.args.get('before', type=int)
+    limit = request.args.get('limit', type=int) or current_app.config['MESSAGE_HISTORY_PAGE_SIZE']
+    limit = max(1, min(limit, 200))
+    
+    query = db.session.query(ConversationParticipant, Conversation)\
+        .join(Conversation, Conversation.id == ConversationParticipant.conversation_id)\
+        .filter(ConversationParticipant.user_id == user_id)
+    if before is not None:
+        query = query.filter(ConversationParticipant.last_activity_id < before)
+    rows = query.order_by(ConversationParticipant.last_activity_id.desc()).limit(limit).all()
+    
+    peer_ids = {participant.peer_id for participant, _ in rows}
+    peers = {user.id: user for user in User.query.filter(User.id.in_(peer_ids)).all()} if peer_ids else {}
+    message_ids = {conversation.last_message_id for _, conversation in rows if conversation.last_message_id}
+    last_messages = {
+        message.id: message.to_dict() if not message.is_expired() else None
+        for message in Message.query.filter(Message.id.in_(message_ids)).all()
+    } if message_ids else {}
+    
+    # Messages past the retention window live in cold storage; skip tombstoned ones
+    archived_ids = message_ids - set(last_messages)
+    archive = current_app.extensions.get('message_archive')
+    if archived_ids and archive:
+        archived_ids -= ArchivedMessageDeletion.deleted_ids(list(archived_ids))
+        for message_id in archived_ids:
+            last_messages[message_id] = archive.get(user_id, message_id)
+    
+    conversations = []
+    for participant, conversation in rows:
+        peer = peers.get(participant.peer_id)
+        conversations.append({
+            'id': conversation.id,
+            'peer': {'id': participant.peer_id, 'username': peer.username if peer else None},
+            'last_message_id': conversation.last_message_id,
+            'last_message_at': conversation.last_message_at.isoformat() if conversation.last_message_at else None,
+            'last_message': last_messages.get(conversation.last_message_id),
+            'unread_count': participant.unread_count,
+            'last_read_message_id': participant.last_read_message_id,
+            'cursor': participant.last_activity_id
+        })
+    
+    return jsonify({
+        'conversations': conversations,
+        'next_cursor': conversations[-1]['cursor'] if len(conversations) == limit else None
+    }), 200
+
+@conversation_bp.route('/<username>/read', methods=['POST'])
+@jwt_required()
+def mark_read(username):
+    """Mark the conversation with a user as read, optionally up to a message id"""
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    up_to = data.get('last_read_message_id')
+    if up_to is not None and (isinstance(up_to, bool) or not isinstance(up_to, int)):
+        return jsonify({'error': 'last_read_message_id must be an integer'}), 400
+    
+    peer = User.query.filter_by(username=username).first()
+    if not peer:
+        return jsonify({'error': 'User not found'}), 404
+    
+    conversation = Conversation.get_for(user_id, peer.id)
+    participant = ConversationParticipant.query.get((conversation.id, user_id)) if conversation else None
+    if not participant:
+        return jsonify({'error': 'Conversation not found'}), 404
+    
+    participant.mark_read(up_to)
+    db.session.commit()
+    
+    return jsonify({'conversation': participant.to_dict()}), 200
@@ -0,0 +1,361 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+import json
+from models.group import Group, GroupMember, GroupKeyEnvelope, GroupMessage
+from models.user import User
+from database.db import db, log_communication
+from services.socket_cluster import push_to_users
+
+group_bp = Blueprint('groups', __name__, url_prefix='/api/groups')
+
+def resolve_envelopes(envelopes):
+    """
+    Map a {username: encrypted_key} request field to user ids
+    
+    Returns:
+        tuple: ({user_id: encrypted_key} or None, error_message)
+    """
+    if not isinstance(envelopes, dict) or not envelopes:
+        return None, 'envelopes must map usernames to encrypted keys'
+    if not all(isinstance(key, str) and key for key in envelopes.values()):
+        return None, 'envelopes must map usernames to encrypted keys'
+    if len(envelopes) > current_app.config['GROUP_MAX_MEMBERS']:
+        return None, f"Groups cannot exceed {current_app.config['GROUP_MAX_MEMBERS']} members"
+    
+    users = User.query.filter(User.username.in_(list(envelopes))).all()
+    if len(users) != len(envelopes):
+        missing = set(envelopes) - {user.username for user in users}
+        return None, f"Unknown users: {', '.join(sorted(missing))}"
+    return {user.id: envelopes[user.username] for user in users}, None
+
+def get_group_for(group_id, user_id):
+    """
+    Load a group the user belongs to
+    
+    Returns:
+        tuple: (group or None, error response or None)
+    """
+    group = Group.query.get(group_id)
+    if not group:
+        return None, (jsonify({'error': 'Group not found'}), 404)
+    if not group.is_member(user_id):
+        return None, (jsonify({'error': 'Unauthorized'}), 403)
+    return group, None
+
+def notify_members(group, sender_id, message_data):
+    """Push a new group message to every other member's devices, or queue it while they are offline"""
+    frame = json.dumps({'type': 'group_message', 'message': message_data})
+    push_to_users(current_app, group.member_ids() - {sender_id}, frame)
+
+@group_bp.route('', methods=['POST'])
+@jwt_required()
+def create_group():
+    """
+    Create a group
+    
+    The creator generates the first group key and sends it wrapped with
+    every member's public key, their own included, as envelopes.
+    """
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    name = data.get('name')
+    
+    if not isinstance(name, str) or not name.strip() or len(name) > 100:
+        return jsonify({'error': 'name must be 1-100 characters'}), 400
+    
+    envelopes, error = resolve_envelopes(data.get('envelopes'))
+    if error:
+        return jsonify({'error': error}), 400
+    if user_id not in envelopes:
+        return jsonify({'error': "envelopes must include the creator's own key"}), 400
+    
+    group = Group(name=name.strip(), owner_id=user_id, key_version=1)
+    db.session.add(group)
+    db.session.flush()
+    db.session.add_all([GroupMember(group_id=group.id, user_id=member_id) for member_id in envelopes])
+    group.add_envelopes(1, envelopes)
+    db.session.commit()
+    
+    log_communication(user_id, 'GROUP_CREATED', f'Group {group.id} created with {len(envelopes)} members')
+    
+    return jsonify({'group': group.to_dict()}), 201
+
+@group_bp.route('', methods=['GET'])
+@jwt_required()
+def list_groups():
+    """List the groups the current user belongs to"""
+    user_id = get_jwt_identity()
+    groups = Group.query\
+        .join(GroupMember, GroupMember.group_id == Group.id)\
+        .filter(GroupMember.user_id == user_id)\
+        .order_by(Group.id)\
+        .all()
+    
+    return jsonify({'groups': [group.to_dict() for group in groups]}), 200
+
+@group_bp.route('/<int:group_id>', methods=['GET'])
+@jwt_required()
+def get_group(group_id):
+    """Get a group, its members and the current user's key envelopes by version"""
+    user_id = get_jwt_identity()
+    group, error = get_group_for(group_id, user_id)
+    if error:
+        return error
+    
+    members = db.session.query(User.id, User.username)\
+        .join(GroupMember, GroupMember.user_id == User.id)\
+        .filter(GroupMember.group_id == group.id)\
+        .order_by(User.id)\
+        .all()
+    envelopes = GroupKeyEnvelope.query.filter_by(group_id=group.id, user_id=user_id).all()
+    
+    return jsonify({
+        'group': group.to_dict(),
+        'members': [{'id': member.id, 'username': member.username} for member in members],
+        'keys': {str(envelope.key_version): envelope.encrypted_key for envelope in envelopes}
+    }), 200
+
+@group_bp.route('/<int:group_id>/members', methods=['POST'])
+@jwt_required()
+def add_member(group_id):
+    """
+    Add a member (owner only)
+    
+    The request carries the current group key wrapped for the new member,
+    who can read messages from that key version on.
+    """
+    user_id = get_jwt_identity()
+    group, error = get_group_for(group_id, user_id)
+    if error:
+        return error
+    if group.owner_id != user_id:
+        return jsonify({'error': 'Only the owner can add members'}), 403
+    if group.rekey_required:
+        return jsonify({'error': 'Group key must be rotated first'}), 409
+    
+    data = request.get_json(silent=True) or {}
+    username = data.get('username')
+    encrypted_key = data.get('encrypted_key')
+    if not isinstance(username, str) or not isinstance(encrypted_key, str) or not username or not encrypted_key:
+        return jsonify({'error': 'Missing required fields'}), 400
+    
+    member = User.query.filter_by(username=username).first()
+    if not member:
+        return jsonify({'error': 'User not found'}), 404
+    member_id = member.id
+    
+    if group.is_member(member_id):
+        return jsonify({'error': 'User is already a member'}), 409
+    if len(group.member_ids()) >= current_app.config['GROUP_MAX_MEMBERS']:
+        return jsonify({'error': f"Groups cannot exceed {current_app.config['GROUP_MAX_MEMBERS']} members"}), 400
+    
+    # The envelope wraps the key the owner read; refuse if a rotation or removal landed since
+    result = db.session.execute(
+        db.update(Group)
+        .where(Group.id == group.id)
+        .where(Group.key_version == group.key_version)
+        .where(Group.rekey_required.is_(False))
+        .values(key_version=Group.key_version)
+    )
+    if result.rowcount == 0:
+        db.session.rollback()
+        return jsonify({'error': 'Group key changed; wrap the current key', 'key_version': Group.query.get(group_id).key_version}), 409
+    db.session.add(GroupMember(group_id=group.id, user_id=member_id))
+    db.session.merge(GroupKeyEnvelope(
+        group_id=group.id,
+        key_version=group.key_version,
+        user_id=member_id,
+        encrypted_key=encrypted_key
+    ))
+    db.session.commit()
+    
+    log_communication(user_id, 'GROUP_MEMBER_ADDED', f'{username} added to group {group.id}')
+    
+    return jsonify({'group': group.to_dict()}), 201
+
+@group_bp.route('/<int:group_id>/members/<username>', methods=['DELETE'])
+@jwt_required()
+def remove_member(group_id, username):
+    """
+    Remove a member (owner), or leave the group (any member but the owner)
+    
+    The departed member still holds the current key, so new messages are
+    refused until a member rotates it.
+    """
+    user_id = get_jwt_identity()
+    group, error = get_group_for(group_id, user_id)
+    if error:
+        return error
+    
+    member = User.query.filter_by(username=username).first()
+    if not member or not group.is_member(member.id):
+        return jsonify({'error': 'Member not found'}), 404
+    if member.id != user_id and group.owner_id != user_id:
+        return jsonify({'error': 'Only the owner can remove members'}), 403
+    if member.id == group.owner_id:
+        return jsonify({'error': 'The owner cannot leave the group'}), 400
+    
+    db.session.delete(GroupMember.query.get((group.id, member.id)))
+    group.rekey_required = True
+    db.session.commit()
+    
+    log_communication(user_id, 'GROUP_MEMBER_REMOVED', f'{username} removed from group {group.id}')
+    
+    return jsonify({'group': group.to_dict()}), 200
+
+@group_bp.route('/<int:group_id>/keys', methods=['POST'])
+@jwt_required()
+def rotate_key(group_id):
+    """
+    Rotate the group key
+    
+    Any member may rotate. The request carries key_version (current + 1)
+    and the new key wrapped for exactly the current members.
+    """
+    user_id = get_jwt_identity()
+    group, error = get_group_for(group_id, user_id)
+    if error:
+        return error
+    
+    data = request.get_json(silent=True) or {}
+    key_version = data.get('key_version')
+    if isinstance(key_version, bool) or not isinstance(key_version, int):
+        return jsonify({'error': 'key_version must be an integer'}), 400
+    if key_version != group.key_version + 1:
+        return jsonify({'error': 'Stale key version', 'key_version': group.key_version}), 409
+    
+    envelopes, error = resolve_envelopes(data.get('envelopes'))
+    if error:
+        return jsonify({'error': error}), 400
+    if set(envelopes) != group.member_ids():
+        return jsonify({'error': 'envelopes must cover exactly the current members'}), 400
+    
+    # Compare-and-set, so two concurrent rotations cannot both succeed
+    result = db.session.execute(
+        db.update(Group)
+        .where(Group.id == group.id)
+        .where(Group.key_version == key_version - 1)
+        .values(key_version=key_version, rekey_required=False)
+    )
+    if result.rowcount == 0:
+        db.session.rollback()
+        return jsonify({'error': 'Stale key version', 'key_version': Group.query.get(group_id).key_version}), 409
+    # The update holds the write lock, so this sees any add or removal that raced the check above
+    if group.member_ids() != set(envelopes):
+        db.session.rollback()
+        return jsonify({'error': 'Membership changed; rotate again for the current members'}), 409
+    group.add_envelopes(key_version, envelopes)
+    db.session.commit()
+    
+    log_communication(user_id, 'GROUP_KEY_ROTATED', f'Group {group.id} key rotated to version {key_version}')
+    
+    return jsonify({'group': Group.query.get(group_id).to_dict()}), 200
+
+@group_bp.route('/<int:group_id>/messages', methods=['POST'])
+@jwt_required()
+def send_group_message(group_id):
+    """Send a message encrypted once with the current group key"""
+    user_id = get_jwt_identity()
+    group, error = get_group_for(group_id, user_id)
+    if error:
+        return error
+    
+    data = request.get_json(silent=True) or {}
+    encrypted_content = data.get('encrypted_content')
+    iv = data.get('iv')
+    key_version = data.get('key_version')
+    algorithm = data.get('algorithm', 'AES-256-CBC')
+    
+    if not all([encrypted_content, iv, key_version]):
+        return jsonify({'error': 'Missing required fields'}), 400
+    if group.rekey_required:
+        return jsonify({'error': 'Group key must be rotated first', 'key_version': group.key_version}), 409
+    if key_version != group.key_version:
+        return jsonify({'error': 'Stale key version', 'key_version': group.key_version}), 409
+    
+    # Recheck under the write lock, so a removal or rotation that landed since cannot be bypassed
+    result = db.session.execute(
+        db.update(Group)
+        .where(Group.id == group.id)
+        .where(Group.key_version == key_version)
+        .where(Group.rekey_required.is_(False))
+        .values(key_version=Group.key_version)
+    )
+    if result.rowcount == 0:
+        db.session.rollback()
+        group = Group.query.get(group_id)
+        error = 'Group key must be rotated first' if group.rekey_required else 'Stale key version'
+        return jsonify({'error': error, 'key_version': group.key_version}), 409
+    
+    message = GroupMessage(
+        group_id=group.id,
+        sender_id=user_id,
+        key_version=key_version,
+        encrypted_content=encrypted_content,
+        iv=iv,
+        algorithm=algorithm
+    )
+    db.session.add(message)
+    db.session.commit()
+    
+    message_data = message.to_dict()
+    notify_members(group, user_id, message_data)
+    
+    return jsonify({
+        'message': 'Message sent successfully',
+        'data': message_data
+    }), 201
+
+@group_bp.route('/<int:group_id>/messages', methods=['GET'])
+@jwt_required()
+def get_group_history(group_id):
+    """
+    Get a page of group history, newest first
+    
+    Messages are joined with the reader's membership and key envelopes,
+    so only messages the reader holds a key for are returned, and each
+    key version's envelope is sent once per page rather than per message.
+    Pass ?before=<next_cursor>&limit=N to page.
+    """
+    user_id = get_jwt_identity()
+    group, error = get_group_for(group_id, user_id)
+    if error:
+        return error
+    
+    before = request.args.get('before', type=int)
+    limit = request.args.get('limit', type=int) or current_app.config['MESSAGE_HISTORY_PAGE_SIZE']
+    limit = max(1, min(limit, 200))
+    
+    query = db.session.query(GroupMessage, GroupKeyEnvelope.encrypted_key)\
+        .join(GroupMember, db.and_(
+            GroupMember.group_id == GroupMessage.group_id,
+            GroupMember.user_id == user_id
+        ))\
+        .join(GroupKeyEnvelope, db.and_(
+            GroupKeyEnvelope.group_id == GroupMessage.group_id,
+            GroupKeyEnvelope.key_version == GroupMessage.key_version,
+            GroupKeyEnvelope.user_id == user_id
+        ))\
+        .filter(GroupMessage.group_id == group.id)
+    if before is not None:
+        query = query.filter(GroupMessage.id < before)
+    rows = query.order_by(GroupMessage.id.desc()).limit(limit).all()
+    
+    sender_ids = {message.sender_id for message, _ in rows}
+    usernames = dict(
+        db.session.query(User.id, User.username).filter(User.id.in_(sender_ids)).all()
+    ) if sender_ids else {}
+    
+    messages = []
+    keys = {}
+    for message, encrypted_key in rows:
+        data = message.to_dict()
+        data['sender_username'] = usernames.get(message.sender_id)
+        messages.append(data)
+        keys[str(message.key_version)] = encrypted_key
+    
+    return jsonify({
+        'messages': messages,
+        'keys': keys,
+        'next_cursor': messages[-1]['id'] if len(messages) == limit else None
+    }), 200
@@ -1,12 +1,40 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime, timedelta
+import json
 from models.message import Message
 from models.user import User
+from models.conversation_ttl import ConversationTTL
+from models.archived_message_deletion import ArchivedMessageDeletion
+from models.conversation import Conversation
+from models.attachment import Attachment
 from database.db import db, log_communication
 from services.crypto_service import CryptoService
+from services.rate_limiter import rate_limit
+from services.socket_cluster import push_to_users
+from utils.conditional import conditional
 
 message_bp = Blueprint('messages', __name__, url_prefix='/api/messages')
 
+def parse_ttl(value):
+    """
+    Validate a ttl_seconds value from a request body
+    
+    Returns:
+        tuple: (ttl_seconds or None, error_message)
+    """
+    if value is None:
+        return None, None
+    if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+        return None, "ttl_seconds must be a positive integer"
+    if value > current_app.config['MESSAGE_MAX_TTL']:
+        return None, f"ttl_seconds cannot exceed {current_app.config['MESSAGE_MAX_TTL']}"
+    return value, None
+
+def notify_recipient(user_id, message_data):
+    """Push a new message to the recipient's devices, or queue it while they are offline"""
+    push_to_users(current_app, [user_id], json.dumps({'type': 'message', 'message': message_data}))
+
 @message_bp.route('/send', methods=['POST'])
 @jwt_required()
 def send_message():
@@ -19,15 +47,32 @@ def send_message():
     iv = data.get('iv')
     encrypted_aes_key = data.get('encrypted_aes_key')
     algorithm = data.get('algorithm', 'AES-256-CBC')
+    ttl_seconds, error = parse_ttl(data.get('ttl_seconds'))
+    attachment_id = data.get('attachment_id')
     
     if not all([receiver_username, encrypted_content, iv, encrypted_aes_key]):
         return jsonify({'error': 'Missing required fields'}), 400
+    if error:
+        return jsonify({'error': error}), 400
+    
+    # Only the sender's own, fully uploaded attachments can be sent
+    attachment = None
+    if attachment_id is not None:
+        valid_id = isinstance(attachment_id, int) and not isinstance(attachment_id, bool)
+        attachment = Attachment.query.get(attachment_id) if valid_id else None
+        if not attachment or attachment.owner_id != sender_id or not attachment.is_complete:
+            return jsonify({'error': 'Attachment not found'}), 400
     
     # Find receiver
     receiver = User.query.filter_by(username=receiver_username).first()
     if not receiver:
         return jsonify({'error': 'Receiver not found'}), 404
     
+    # Fall back to the conversation's default TTL
+    if ttl_seconds is None:
+        setting = ConversationTTL.get_for(sender_id, receiver.id)
+        ttl_seconds = setting.ttl_seconds if setting else None
+    
     # Create message
     message = Message(
         sender_id=sender_id,
@@ -35,10 +80,18 @@ def send_message():
         encrypted_content=encrypted_content,
         iv=iv,
         encrypted_aes_key=encrypted_aes_key,
-        algorithm=algorithm
+        algorithm=algorithm,
+        expires_at=datetime.utcnow() + timedelta(seconds=ttl_seconds) if ttl_seconds else None,
+        attachment_id=attachment.id if attachment else None
     )
     
+    # The message, its conversation summary and the receiver's access to
+    # the attachment are committed together
     db.session.add(message)
+    if attachment:
+        attachment.grant(receiver.id)
+    db.session.flush()
+    Conversation.record_message(message)
     db.session.commit()
     
     # Log communication
@@ -48,36 +101,119 @@ def send_message():
         f'Message sent to {receiver_username}'
     )
     
+    message_data = message.to_dict()
+    notify_recipient(receiver.id, message_data)
+    
     return jsonify({
         'message': 'Message sent successfully',
-        'data': message.to_dict()
+        'data': message_data
     }), 201
 
+def read_archive(user_id, before, limit):
+    """
+    Archived messages of a user older than the cursor, minus deleted ones
+    
+    Returns:
+        list: Message dictionaries, newest first
+    """
+    archive = current_app.extensions.get('message_archive')
+    if not archive:
+        return []
+    
+    messages = archive.history(user_id, before=before, limit=limit)
+    deleted = ArchivedMessageDeletion.deleted_ids([msg['id'] for msg in messages])
+    return [msg for msg in messages if msg['id'] not in deleted]
+
+def history_version():
+    """Validator for /history: the visible hot messages plus the archive's state"""
+    archive = current_app.extensions.get('message_archive')
+    if archive:
+        archive.refresh()
+    return Message.history_version(get_jwt_identity(), request.args.get('before', type=int)) + (
+        archive.watermark if archive else 0,
+        ArchivedMessageDeletion.count()
+    )
+
 @message_bp.route('/history', methods=['GET'])
 @jwt_required()
+@conditional(history_version)
 def get_history():
-    """Get message history for current user"""
+    """
+    Get message history for current user, newest first
+    
+    Without query parameters every message still in the hot table is
+    returned. Pass ?before=<next_cursor>&limit=N to page further back;
+    pages that move past the hot window are read from the archive.
+    """
     user_id = get_jwt_identity()
+    before = request.args.get('before', type=int)
+    limit = request.args.get('limit', type=int)
+    paged = before is not None or limit is not None
+    if paged:
+        limit = max(1, min(limit or current_app.config['MESSAGE_HISTORY_PAGE_SIZE'], 200))
     
-    # Get messages where user is sender or receiver
-    sent_messages = Message.query.filter_by(sender_id=user_id).all()
-    received_messages = Message.query.filter_by(receiver_id=user_id).all()
+    # Get messages where user is sender or receiver, skipping expired ones
+    query = Message.query\
+        .filter(db.or_(Message.sender_id == user_id, Message.receiver_id == user_id))\
+        .filter(Message.not_expired())
+    if before is not None:
+        query = query.filter(Message.id < before)
+    query = query.order_by(Message.id.desc())
+    if paged:
+        query = query.limit(limit)
+    messages = [msg.to_dict() for msg in query.all()]
     
-    all_messages = sent_messages + received_messages
-    all_messages.sort(key=lambda x: x.timestamp, reverse=True)
+    # The archive holds ids up to its watermark; it only matters once the
+    # page runs short or reaches below that point
+    archive = current_app.extensions.get('message_archive')
+    if archive:
+        archive.refresh()
+    watermark = archive.watermark if archive else 0
+    
+    if paged:
+        if watermark and (len(messages) < limit or messages[-1]['id'] <= watermark):
+            seen = {msg['id'] for msg in messages}
+            archived = [msg for msg in read_archive(user_id, before, limit) if msg['id'] not in seen]
+            messages = sorted(messages + archived, key=lambda msg: msg['id'], reverse=True)[:limit]
+        next_cursor = messages[-1]['id'] if len(messages) == limit else None
+    else:
+        # Everything older than the hot table is in the archive
+        next_cursor = watermark + 1 if watermark else None
     
     return jsonify({
-        'messages': [msg.to_dict() for msg in all_messages]
+        'messages': messages,
+        'next_cursor': next_cursor
     }), 200
 
+def message_version(message_id):
+    """Validator for a hot message the user may read; anything else is left to the view"""
+    user_id = get_jwt_identity()
+    row = db.session.query(Message.sender_id, Message.receiver_id, Message.expires_at, Message.attachment_id)\
+        .filter(Message.id == message_id)\
+        .first()
+    if not row or user_id not in (row.sender_id, row.receiver_id):
+        return None
+    if row.expires_at is not None and row.expires_at <= datetime.utcnow():
+        return None
+    return (row.attachment_id, row.expires_at)
+
 @message_bp.route('/<int:message_id>', methods=['GET'])
 @jwt_required()
+@conditional(message_version)
 def get_message(message_id):
     """Get a specific message"""
     user_id = get_jwt_identity()
     message = Message.query.get(message_id)
     
     if not message:
+        # Fall back to cold storage for messages past the retention window
+        archive = current_app.extensions.get('message_archive')
+        archived = archive.get(user_id, message_id) if archive else None
+        if archived and not ArchivedMessageDeletion.deleted_ids([message_id]):
+            return jsonify({'message': archived}), 200
+        return jsonify({'error': 'Message not found'}), 404
+    
+    if message.is_expired():
         return jsonify({'error': 'Message not found'}), 404
     
     # Check if user is sender or receiver
@@ -94,21 +230,84 @@ def delete_message(message_id):
     message = Message.query.get(message_id)
     
     if not message:
-        return jsonify({'error': 'Message not found'}), 404
+        return delete_archived_message(user_id, message_id)
     
     # Only sender can delete
     if message.sender_id != user_id:
         return jsonify({'error': 'Unauthorized'}), 403
     
     db.session.delete(message)
+    db.session.flush()
+    Conversation.forget_messages([(message.id, message.sender_id, message.receiver_id)])
     db.session.commit()
     
     log_communication(user_id, 'MESSAGE_DELETED', f'Message {message_id} deleted')
     
     return jsonify({'message': 'Message deleted successfully'}), 200
 
+def delete_archived_message(user_id, message_id):
+    """Tombstone an archived message; segment files are never rewritten"""
+    archive = current_app.extensions.get('message_archive')
+    archived = archive.get(user_id, message_id) if archive else None
+    if not archived or ArchivedMessageDeletion.deleted_ids([message_id]):
+        return jsonify({'error': 'Message not found'}), 404
+    
+    # Only sender can delete
+    if archived['sender_id'] != user_id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    db.session.add(ArchivedMessageDeletion(message_id=message_id, deleted_by=user_id))
+    Conversation.forget_messages([(message_id, archived['sender_id'], archived['receiver_id'])])
+    db.session.commit()
+    
+    log_communication(user_id, 'MESSAGE_DELETED', f'Archived message {message_id} deleted')
+    
+    return jsonify({'message': 'Message deleted successfully'}), 200
+
+@message_bp.route('/ttl/<username>', methods=['GET'])
+@jwt_required()
+def get_conversation_ttl(username):
+    """Get the default message TTL for the conversation with a user"""
+    user_id = get_jwt_identity()
+    peer = User.query.filter_by(username=username).first()
+    if not peer:
+        return jsonify({'error': 'User not found'}), 404
+    
+    setting = ConversationTTL.get_for(user_id, peer.id)
+    return jsonify({'ttl_seconds': setting.ttl_seconds if setting else None}), 200
+
+@message_bp.route('/ttl', methods=['PUT'])
+@jwt_required()
+def set_conversation_ttl():
+    """Set or clear (ttl_seconds: null) the default message TTL for a conversation"""
+    user_id = get_jwt_identity()
+    data = request.get_json()
+    
+    username = data.get('username')
+    if not username or 'ttl_seconds' not in data:
+        return jsonify({'error': 'Missing required fields'}), 400
+    
+    ttl_seconds, error = parse_ttl(data.get('ttl_seconds'))
+    if error:
+        return jsonify({'error': error}), 400
+    
+    peer = User.query.filter_by(username=username).first()
+    if not peer:
+        return jsonify({'error': 'User not found'}), 404
+    
+    ConversationTTL.set_for(user_id, peer.id, ttl_seconds)
+    db.session.commit()
+    
+    log_communication(user_id, 'TTL_UPDATED', f'Message TTL with {username} set to {ttl_seconds}')
+    
+    return jsonify({
+        'message': 'Conversation TTL updated',
+        'ttl_seconds': ttl_seconds
+    }), 200
+
 @message_bp.route('/decrypt', methods=['POST'])
 @jwt_required()
+@rate_limit('decrypt')
 def decrypt_message():
     """Decrypt a message (for demonstration purposes)"""
     data = request.get_json()
@@ -1,14 +1,16 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.user import User
 from models.communication_log import CommunicationLog
 from services.auth_service import AuthService
-from database.db import db
+from database.db import db, log_communication
+from utils.conditional import conditional
 
 user_bp = Blueprint('users', __name__, url_prefix='/api/users')
 
 @user_bp.route('/profile', methods=['GET'])
 @jwt_required()
+@conditional(lambda: User.version_of(get_jwt_identity()))
 def get_profile():
     """Get current user profile"""
     user_id = get_jwt_identity()
@@ -63,6 +65,19 @@ def get_sessions():
         'sessions': [session.to_dict() for session in sessions]
     }), 200
 
+@user_bp.route('/sessions/<int:session_id>', methods=['DELETE'])
+@jwt_required()
+def revoke_session(session_id):
+    """Sign out a session; its refresh token stops working and its access token expires within the hour"""
+    user_id = get_jwt_identity()
+    
+    if not AuthService.revoke_session(user_id, session_id):
+        return jsonify({'error': 'Session not found'}), 404
+    
+    log_communication(user_id, 'SESSION_REVOKED', f'Session {session_id} revoked', session_id)
+    
+    return jsonify({'message': 'Session revoked successfully'}), 200
+
 @user_bp.route('/logs', methods=['GET'])
 @jwt_required()
 def get_logs():
@@ -90,6 +105,7 @@ def get_logs():
 
 @user_bp.route('/search', methods=['GET'])
 @jwt_required()
+@conditional(User.directory_version)
 def search_users():
     """Search for users by username"""
     query = request.args.get('q', '')
@@ -103,8 +119,38 @@ def search_users():
         'users': [user.to_dict() for user in users]
     }), 200
 
+@user_bp.route('/presence', methods=['GET'])
+@jwt_required()
+def get_presence():
+    """Report which users have an authenticated socket connection"""
+    usernames = [name for name in request.args.get('usernames', '').split(',') if name][:100]
+    if not usernames:
+        return jsonify({'error': 'usernames is required'}), 400
+    
+    users = User.query.filter(User.username.in_(usernames)).all()
+    user_ids = [user.id for user in users]
+    
+    # The socket server runs in this process in development, standalone otherwise
+    socket_server = current_app.extensions.get('socket_server')
+    try:
+        if socket_server and socket_server.running:
+            presence = socket_server.presence(user_ids)
+        else:
+            from services.socket_cluster import query_presence
+            presence = query_presence(current_app.config['SOCKET_PRESENCE_URL'], user_ids)
+    except Exception as e:
+        return jsonify({'error': f'Presence unavailable: {e}'}), 503
+    
+    return jsonify({
+        'presence': {
+            user.username: {'online': user.id in presence, 'devices': presence.get(user.id, 0)}
+            for user in users
+        }
+    }), 200
+
 @user_bp.route('/all', methods=['GET'])
 @jwt_required()
+@conditional(User.directory_version)
 def get_all_users():
     """Get all users (for demo purposes)"""
     users = User.query.all()
@@ -0,0 +1,164 @@
+import os
+import hashlib
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Copy buffer for request bodies and hashing; never a whole file
+COPY_BUFFER = 64 * 1024
+
+
+class FileRange:
+    """
+    Read-only view of a byte range of an open file
+
+    Passed to wsgi.file_wrapper: gunicorn sends it with sendfile() from
+    the current offset for Content-Length bytes, other servers fall back
+    to read(), which stops at the end of the range.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+class AttachmentStore:
+    """
+    Filesystem storage for encrypted attachments
+
+    Uploads are appended to a part file per attachment, so an interrupted
+    upload resumes from the part file's size. Completed uploads are moved
+    to blobs/<sha[:2]>/<sha>, named by the SHA-256 of the ciphertext, so
+    identical uploads share one file. The server never sees plaintext.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.parts_dir = os.path.join(directory, 'parts')
+        self.blobs_dir = os.path.join(directory, 'blobs')
+        os.makedirs(self.parts_dir, exist_ok=True)
+        os.makedirs(self.blobs_dir, exist_ok=True)
+
+    def part_path(self, attachment_id):
+        return os.path.join(self.parts_dir, f'{attachment_id}.part')
+
+    def blob_path(self, sha256):
+        return os.path.join(self.blobs_dir, sha256[:2], sha256)
+
+    def received(self, attachment_id):
+        """Number of bytes of an upload stored so far"""
+        try:
+            return os.path.getsize(self.part_path(attachment_id))
+        except FileNotFoundError:
+            return 0
+
+    def write_chunk(self, attachment_id, offset, stream, length):
+        """
+        Append a chunk to an upload, copying the stream in small buffers
+
+        The chunk must start where the stored data ends; a lock on the part
+        file rejects concurrent writers. If the client disconnects midway
+        the bytes that did arrive are kept and the upload resumes from there.
+
+        Args:
+            attachment_id (int): Upload to append to
+            offset (int): Position of the chunk in the file
+            stream: File-like request body
+            length (int): Number of bytes to copy
+
+        Returns:
+            tuple: (bytes received so far, error_message)
+        """
+        with open(self.part_path(attachment_id), 'ab') as part:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return self.received(attachment_id), 'Another chunk of this upload is in progress'
+
+            received = os.fstat(part.fileno()).st_size
+            if offset != received:
+                return received, f'Upload continues at offset {received}'
+
+            remaining = length
+            while remaining > 0:
+                data = stream.read(min(COPY_BUFFER, remaining))
+                if not data:
+                    break
+                part.write(data)
+                remaining -= len(data)
+
+            part.flush()
+            os.fsync(part.fileno())
+            received = os.fstat(part.fileno()).st_size
+
+        if remaining > 0:
+            return received, 'Chunk ended early'
+        return received, None
+
+    def digest(self, attachment_id):
+        """SHA-256 of a complete upload, read back in small buffers"""
+        sha256 = hashlib.sha256()
+        with open(self.part_path(attachment_id), 'rb') as part:
+            for data in iter(lambda: part.read(COPY_BUFFER), b''):
+                sha256.update(data)
+        return sha256.hexdigest()
+
+    def commit_blob(self, attachment_id, sha256):
+        """
+        Move a complete upload into blob storage
+
+        If the blob already exists the upload is a duplicate and its part
+        file, if still there, is dropped instead.
+        """
+        path = self.blob_path(sha256)
+        if os.path.exists(path):
+            self.discard_part(attachment_id)
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(self.part_path(attachment_id), path)
+
+    def discard_part(self, attachment_id):
+        try:
+            os.remove(self.part_path(attachment_id))
+        except FileNotFoundError:
+            pass
+
+    def remove_blob(self, sha256):
+        try:
+            os.remove(self.blob_path(sha256))
+        except FileNotFoundError:
+            logger.warning(f"Attachment blob {sha256} was already missing")
+
+    def open_range(self, sha256, start, length):
+        """
+        Open a byte range of a blob for sending
+
+        Returns:
+            FileRange: Readable range, or None if the blob is missing
+        """
+        try:
+            file = open(self.blob_path(sha256), 'rb')
+        except FileNotFoundError:
+            return None
+        return FileRange(file, start, length)
@@ -1,3 +1,4 @@
+from flask import current_app
 from flask_jwt_extended import create_access_token, create_refresh_token
 from models.user import User
 from models.session import Session
@@ -19,7 +20,7 @@ class AuthService:
             password (str): Plain password
             public_key (str): RSA public key (optional)
             private_key_encrypted (str): Encrypted RSA private key (optional)
-            
+        
         Returns:
             tuple: (user, error_message)
         """
@@ -57,7 +58,7 @@ class AuthService:
             password (str): Password
             ip_address (str): Client IP address
             user_agent (str): Client user agent
-            
+        
         Returns:
             tuple: (access_token, refresh_token, user, error_message)
         """
@@ -66,20 +67,23 @@ class AuthService:
         if not user or not user.check_password(password):
             return None, None, None, "Invalid credentials"
         
-        # Create JWT tokens
-        access_token = create_access_token(identity=user.id)
-        refresh_token = create_refresh_token(identity=user.id)
-        
-        # Create session
+        # Create session; it lives as long as its refresh token
+        now = datetime.utcnow()
         session_key = secrets.token_urlsafe(32)
         session = Session(
             user_id=user.id,
             session_key=session_key,
             ip_address=ip_address,
             user_agent=user_agent,
-            expires_at=datetime.utcnow() + timedelta(hours=1)
+            expires_at=now + current_app.config['JWT_REFRESH_TOKEN_EXPIRES']
         )
         db.session.add(session)
+        db.session.flush()
+        
+        # Create JWT tokens bound to the session
+        access_token, refresh_token, jti = AuthService.issue_tokens(user.id, session)
+        session.refresh_jti = jti
+        session.refreshed_at = now
         db.session.commit()
         
         # Log login
@@ -87,6 +91,99 @@ class AuthService:
         
         return access_token, refresh_token, user, None
     
+    @staticmethod
+    def issue_tokens(user_id, session):
+        """
+        Create an access token and a refresh token carrying the session id
+        
+        The refresh token's jti is chosen here so the session can record it,
+        and it expires with the session.
+        
+        Args:
+            user_id (int): User ID
+            session (Session): Session the tokens belong to
+        
+        Returns:
+            tuple: (access_token, refresh_token, refresh_jti)
+        """
+        jti = secrets.token_urlsafe(16)
+        access_token = create_access_token(identity=user_id, additional_claims={'sid': session.id})
+        refresh_token = create_refresh_token(
+            identity=user_id,
+            additional_claims={'sid': session.id, 'jti': jti},
+            expires_delta=session.expires_at - datetime.utcnow()
+        )
+        return access_token, refresh_token, jti
+    
+    @staticmethod
+    def refresh_tokens(user_id, session_id, jti):
+        """
+        Exchange a refresh token for new tokens without checking the password
+        
+        Refresh tokens are single use: each refresh rotates the session's
+        refresh jti. Presenting a replaced token means it was copied, so the
+        session is revoked, except within JWT_REFRESH_REUSE_GRACE seconds of
+        the rotation, when it gets an access token only; two tabs refreshing
+        at once would otherwise log each other out.
+        
+        Args:
+            user_id (int): User ID from the refresh token
+            session_id (int): Session ID from the refresh token
+            jti (str): Refresh token ID
+        
+        Returns:
+            tuple: (access_token, refresh_token or None, error_message)
+        """
+        now = datetime.utcnow()
+        session = Session.query.get(session_id) if session_id else None
+        
+        if not session or session.user_id != user_id or not session.is_active or not session.expires_at or session.expires_at <= now:
+            return None, None, "Session expired or revoked"
+        
+        if jti == session.refresh_jti:
+            access_token, refresh_token, new_jti = AuthService.issue_tokens(user_id, session)
+            # Compare-and-set, so only one of two concurrent uses of a token rotates it
+            result = db.session.execute(
+                db.update(Session)
+                .where(Session.id == session.id)
+                .where(Session.refresh_jti == jti)
+                .values(refresh_jti=new_jti, previous_refresh_jti=jti, refreshed_at=now)
+            )
+            db.session.commit()
+            if result.rowcount == 1:
+                return access_token, refresh_token, None
+            db.session.refresh(session)
+        
+        grace = timedelta(seconds=current_app.config['JWT_REFRESH_REUSE_GRACE'])
+        if jti == session.previous_refresh_jti and session.refreshed_at and now - session.refreshed_at <= grace:
+            return create_access_token(identity=user_id, additional_claims={'sid': session.id}), None, None
+        
+        session.is_active = False
+        db.session.commit()
+        log_communication(user_id, 'SESSION_REVOKED', 'Refresh token reused; session revoked', session.id)
+        
+        return None, None, "Session expired or revoked"
+    
+    @staticmethod
+    def revoke_session(user_id, session_id):
+        """
+        Deactivate one of a user's sessions so its refresh token stops working
+        
+        Access tokens already issued stay valid until they expire.
+        
+        Args:
+            user_id (int): User ID
+            session_id (int): Session ID
+        
+        Returns:
+            bool: True if an active session was revoked
+        """
+        revoked = Session.query\
+            .filter_by(id=session_id, user_id=user_id, is_active=True)\
+            .update({'is_active': False})
+        db.session.commit()
+        return revoked == 1
+    
     @staticmethod
     def logout_user(user_id, session_id=None):
         """
@@ -97,10 +194,7 @@ class AuthService:
             session_id (int): Session ID (optional)
         """
         if session_id:
-            session = Session.query.get(session_id)
-            if session:
-                session.is_active = False
-                db.session.commit()
+            AuthService.revoke_session(user_id, session_id)
         
         # Log logout
         log_communication(user_id, 'USER_LOGOUT', 'User logged out', session_id)
@@ -113,4 +207,7 @@ class AuthService:
     @staticmethod
     def get_active_sessions(user_id):
         """Get all active sessions for a user"""
-        return Session.query.filter_by(user_id=user_id, is_active=True).all()
+        return Session.query\
+            .filter_by(user_id=user_id, is_active=True)\
+            .filter(Session.expires_at > datetime.utcnow())\
+            .all()
@@ -0,0 +1,148 @@
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS pending_deliveries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    message TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pending_user ON pending_deliveries(user_id, id);
+CREATE INDEX IF NOT EXISTS idx_pending_created ON pending_deliveries(created_at);
+'''
+
+
+class PendingDeliveryStore:
+    """
+    Durable per-user queue of socket frames for users who are offline
+
+    Frames are kept in their own SQLite file (WAL mode), so socket workers
+    and the cluster supervisor can share it without touching the main
+    database's write lock. Each user's queue is capped at max_per_user
+    frames (oldest dropped first) and frames older than max_age seconds
+    are purged.
+    """
+
+    def __init__(self, path, max_per_user=1000, max_age=7 * 24 * 3600):
+        self.path = path
+        self.max_per_user = max_per_user
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.appended = 0
+        self.acked = 0
+        self.dropped = 0
+        self.expired = 0
+
+    def append(self, user_id, message):
+        """
+        Queue a frame for a user, trimming the user's oldest frames past the cap
+
+        Args:
+            user_id (int): Recipient
+            message (str): Plaintext message, encrypted when delivered
+
+        Returns:
+            int: Delivery id
+        """
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                delivery_id = self.conn.execute(
+                    'INSERT INTO pending_deliveries (user_id, message, created_at) VALUES (?, ?, ?)',
+                    (user_id, message, time.time())
+                ).lastrowid
+                dropped = self.conn.execute(
+                    'DELETE FROM pending_deliveries WHERE user_id = ? AND id <= '
+                    '(SELECT id FROM pending_deliveries WHERE user_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)',
+                    (user_id, user_id, self.max_per_user)
+                ).rowcount
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+            self.appended += 1
+            self.dropped += dropped
+
+        if dropped:
+            logger.warning(f"Pending queue for user {user_id} full; dropped {dropped} oldest frames")
+        return delivery_id
+
+    def fetch(self, user_id, after_id=0, limit=100):
+        """
+        Read the next batch of a user's queued frames, oldest first
+
+        Returns:
+            list: (delivery_id, message) tuples
+        """
+        cutoff = time.time() - self.max_age
+        with self.lock:
+            return self.conn.execute(
+                'SELECT id, message FROM pending_deliveries '
+                'WHERE user_id = ? AND id > ? AND created_at >= ? ORDER BY id LIMIT ?',
+                (user_id, after_id, cutoff, limit)
+            ).fetchall()
+
+    def ack(self, user_id, up_to):
+        """
+        Remove every frame of a user up to and including a delivery id
+
+        Returns:
+            int: Number of frames removed
+        """
+        with self.lock:
+            removed = self.conn.execute(
+                'DELETE FROM pending_deliveries WHERE user_id = ? AND id <= ?',
+                (user_id, up_to)
+            ).rowcount
+            self.acked += removed
+        return removed
+
+    def purge(self):
+        """
+        Delete frames older than max_age
+
+        Returns:
+            int: Number of frames removed
+        """
+        with self.lock:
+            removed = self.conn.execute(
+                'DELETE FROM pending_deliveries WHERE created_at < ?',
+                (time.time() - self.max_age,)
+            ).rowcount
+            self.expired += removed
+        return removed
+
+    def metrics(self):
+        """
+        Queue size and lifetime counters for this process
+
+        Returns:
+            dict: Pending frames and users plus append/ack/drop counters
+        """
+        with self.lock:
+            pending, users = self.conn.execute(
+                'SELECT COUNT(*), COUNT(DISTINCT user_id) FROM pending_deliveries'
+            ).fetchone()
+        return {
+            'pending': pending,
+            'users': users,
+            'appended': self.appended,
+            'acked': self.acked,
+            'dropped': self.dropped,
+            'expired': self.expired,
+            'max_per_user': self.max_per_user,
+            'max_age': self.max_age
+        }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,87 @@
+import random
+import threading
+import time
+import logging
+from datetime import datetime
+from database.db import db
+from models.message import Message
+from models.conversation import Conversation
+
+logger = logging.getLogger(__name__)
+
+
+class ExpirySweeper:
+    """
+    Background deletion of expired messages
+
+    Rows are deleted in small batches, each in its own short transaction,
+    with a pause in between so the SQLite write lock is never held long
+    enough to stall request handlers.
+    """
+
+    def __init__(self, app, interval=30.0, batch_size=500, pause=0.05):
+        self.app = app
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self.lock = threading.Lock()
+        self.thread = None
+        self.deleted = 0
+        self.last_run = None
+
+    def start(self):
+        """Start the sweeper thread once per process"""
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self._run, name='expiry-sweeper')
+            self.thread.daemon = True
+            self.thread.start()
+
+    def sweep(self, now=None):
+        """
+        Delete every message that has expired, one bounded batch at a time
+
+        Must be called inside an app context.
+
+        Returns:
+            int: Number of messages deleted
+        """
+        now = now or datetime.utcnow()
+        total = 0
+
+        while True:
+            expired = db.session.query(Message.id, Message.sender_id, Message.receiver_id)\
+                .filter(Message.expires_at <= now)\
+                .limit(self.batch_size)\
+                .all()
+            if not expired:
+                break
+
+            # Conversation summaries are fixed up in the same transaction
+            db.session.execute(
+                db.delete(Message).where(Message.id.in_([row.id for row in expired]))
+            )
+            Conversation.forget_messages([tuple(row) for row in expired])
+            db.session.commit()
+
+            total += len(expired)
+            if len(expired) < self.batch_size:
+                break
+            time.sleep(self.pause)
+
+        self.deleted += total
+        self.last_run = now
+        return total
+
+    def _run(self):
+        while True:
+            # Jitter keeps several worker processes from sweeping in lockstep
+            time.sleep(self.interval * random.uniform(0.8, 1.2))
+            try:
+                with self.app.app_context():
+                    deleted = self.sweep()
+                if deleted:
+                    logger.info(f"Expiry sweeper deleted {deleted} messages")
+            except Exception as e:
+                logger.error(f"Expiry sweep failed: {e}")
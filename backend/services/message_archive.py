@@ -0,0 +1,252 @@
+import os
+import json
+import mmap
+import zlib
+import struct
+import threading
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Index entry: user_id, message_id, record offset, record length
+INDEX_ENTRY = struct.Struct('<QQQI')
+
+# Positional record layout, cheaper to store than repeating dictionary keys
+RECORD_FIELDS = (
+    'id', 'sender_id', 'receiver_id', 'sender_username', 'receiver_username',
+    'encrypted_content', 'iv', 'encrypted_aes_key', 'algorithm', 'timestamp', 'expires_at',
+    'attachment_id'
+)
+
+
+class Segment:
+    """One immutable archive segment and its per-user offset index, read via mmap"""
+
+    def __init__(self, directory, name, min_id, max_id, count):
+        self.name = name
+        self.min_id = min_id
+        self.max_id = max_id
+        self.count = count
+        self.data_path = os.path.join(directory, f'{name}.seg')
+        self.index_path = os.path.join(directory, f'{name}.idx')
+        self._data = None
+        self._index = None
+        self._entries = 0
+
+    def open(self):
+        if self._data is None:
+            with open(self.data_path, 'rb') as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            with open(self.index_path, 'rb') as f:
+                self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._entries = len(self._index) // INDEX_ENTRY.size
+
+    def close(self):
+        if self._data is not None:
+            self._data.close()
+            self._index.close()
+            self._data = self._index = None
+
+    def _entry(self, position):
+        return INDEX_ENTRY.unpack_from(self._index, position * INDEX_ENTRY.size)
+
+    def _lower_bound(self, user_id, message_id):
+        """First index position whose (user_id, message_id) is >= the key"""
+        low, high = 0, self._entries
+        while low < high:
+            middle = (low + high) // 2
+            entry = self._entry(middle)
+            if (entry[0], entry[1]) < (user_id, message_id):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def read(self, offset, length):
+        """Decode the record stored at offset"""
+        values = json.loads(zlib.decompress(self._data[offset:offset + length]))
+        record = dict(zip(RECORD_FIELDS, values))
+        # Segments written before a field was added have shorter records
+        for field in RECORD_FIELDS[len(values):]:
+            record[field] = None
+        return record
+
+    def get(self, user_id, message_id):
+        """Return the record for a message the user took part in, or None"""
+        self.open()
+        position = self._lower_bound(user_id, message_id)
+        if position < self._entries:
+            entry = self._entry(position)
+            if entry[0] == user_id and entry[1] == message_id:
+                return self.read(entry[2], entry[3])
+        return None
+
+    def history(self, user_id, before, limit):
+        """Yield the user's records with id < before, newest first, at most limit"""
+        self.open()
+        start = self._lower_bound(user_id, 0)
+        position = self._lower_bound(user_id, before) - 1
+        while position >= start and limit > 0:
+            entry = self._entry(position)
+            yield self.read(entry[2], entry[3])
+            position -= 1
+            limit -= 1
+
+
+class MessageArchive:
+    """
+    Append-only cold storage for old messages
+
+    Each archiver run writes new compressed segment files plus a sorted
+    per-user offset index; segments are never modified afterwards. The
+    manifest records the segments and the watermark, the highest message
+    id that has been archived.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self.lock = threading.Lock()
+        self.segments = []
+        self.watermark = 0
+        self._manifest_mtime = None
+
+    def refresh(self):
+        """Reload the manifest if another process has added segments"""
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._manifest_mtime:
+            return
+
+        with self.lock:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+            known = {segment.name: segment for segment in self.segments}
+            self.segments = [
+                known.get(item['name']) or Segment(self.directory, **item)
+                for item in manifest['segments']
+            ]
+            self.watermark = manifest['watermark']
+            self._manifest_mtime = mtime
+
+    def get(self, user_id, message_id):
+        """
+        Look up an archived message the user sent or received
+
+        Returns:
+            dict: Message dictionary, or None if not archived
+        """
+        self.refresh()
+        if message_id > self.watermark:
+            return None
+        for segment in self.segments:
+            if segment.min_id <= message_id <= segment.max_id:
+                record = segment.get(user_id, message_id)
+                if record:
+                    return self._present(record)
+        return None
+
+    def history(self, user_id, before=None, limit=50):
+        """
+        Archived messages of a user older than the cursor, newest first
+
+        Args:
+            user_id (int): User whose messages to read
+            before (int): Only messages with a smaller id (optional)
+            limit (int): Maximum number of messages
+
+        Returns:
+            list: Message dictionaries
+        """
+        self.refresh()
+        before = before if before is not None else self.watermark + 1
+        now = datetime.utcnow().isoformat()
+        results = []
+
+        for segment in reversed(self.segments):
+            if len(results) >= limit:
+                break
+            if segment.min_id >= before:
+                continue
+            for record in segment.history(user_id, before, limit - len(results)):
+                if record['expires_at'] and record['expires_at'] <= now:
+                    continue
+                results.append(self._present(record))
+
+        return results
+
+    def write_segment(self, records):
+        """
+        Append a new segment built from message dictionaries ordered by id
+
+        The data and index files are fully written and synced before the
+        manifest is atomically replaced, so readers never see a partial
+        segment.
+
+        Args:
+            records (list): Dictionaries with the RECORD_FIELDS keys
+
+        Returns:
+            str: Name of the new segment
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self.refresh()
+
+        name = f'segment-{len(self.segments) + 1:06d}'
+        data_path = os.path.join(self.directory, f'{name}.seg')
+        index_path = os.path.join(self.directory, f'{name}.idx')
+
+        entries = []
+        offset = 0
+        with open(data_path, 'wb') as f:
+            for record in records:
+                payload = zlib.compress(
+                    json.dumps([record[field] for field in RECORD_FIELDS], separators=(',', ':')).encode('utf-8')
+                )
+                f.write(payload)
+                for user_id in {record['sender_id'], record['receiver_id']}:
+                    entries.append((user_id, record['id'], offset, len(payload)))
+                offset += len(payload)
+            f.flush()
+            os.fsync(f.fileno())
+
+        entries.sort()
+        with open(index_path, 'wb') as f:
+            for entry in entries:
+                f.write(INDEX_ENTRY.pack(*entry))
+            f.flush()
+            os.fsync(f.fileno())
+
+        segment = {
+            'name': name,
+            'min_id': records[0]['id'],
+            'max_id': records[-1]['id'],
+            'count': len(records)
+        }
+        self._write_manifest(
+            [self._describe(s) for s in self.segments] + [segment],
+            max(self.watermark, segment['max_id'])
+        )
+        self.refresh()
+        logger.info(f"Archived {len(records)} messages into {name}")
+        return name
+
+    def _write_manifest(self, segments, watermark):
+        tmp_path = f'{self.manifest_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'segments': segments, 'watermark': watermark}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+    @staticmethod
+    def _describe(segment):
+        return {'name': segment.name, 'min_id': segment.min_id, 'max_id': segment.max_id, 'count': segment.count}
+
+    @staticmethod
+    def _present(record):
+        record['archived'] = True
+        return record
@@ -0,0 +1,193 @@
+"""
+Moves messages past the retention window from the messages table into
+the cold-storage archive
+
+Usage (from the backend directory):
+    python -m services.message_archiver [--days 90]
+"""
+import os
+import sys
+import random
+import argparse
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from database.db import db
+from models.message import Message
+from models.user import User
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class MessageArchiver:
+    """
+    Periodic archival of old messages
+
+    Messages older than the retention window are written to a new archive
+    segment first and only then deleted from the hot table, in small
+    batches. Ephemeral messages are never archived; the expiry sweeper
+    removes them. A file lock keeps several worker processes from
+    archiving at the same time.
+    """
+
+    def __init__(self, app, archive, retention_days=90, interval=3600.0,
+                 segment_size=50000, batch_size=500, pause=0.05):
+        self.app = app
+        self.archive = archive
+        self.retention_days = retention_days
+        self.interval = interval
+        self.segment_size = segment_size
+        self.batch_size = batch_size
+        self.pause = pause
+        self.lock = threading.Lock()
+        self.thread = None
+        self.archived = 0
+        self.last_run = None
+
+    def start(self):
+        """Start the archiver thread once per process"""
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self._run, name='message-archiver')
+            self.thread.daemon = True
+            self.thread.start()
+
+    def run_once(self, now=None):
+        """
+        Archive every eligible message and trim the hot table
+
+        Must be called inside an app context.
+
+        Returns:
+            int: Number of messages archived
+        """
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(days=self.retention_days)
+
+        with self._exclusive() as acquired:
+            if not acquired:
+                return 0
+
+            self.archive.refresh()
+            through_id = db.session.query(db.func.max(Message.id))\
+                .filter(Message.timestamp < cutoff)\
+                .scalar()
+
+            total = 0
+            last_id = self.archive.watermark
+            while through_id and last_id < through_id:
+                rows = Message.query\
+                    .filter(Message.id > last_id, Message.id <= through_id, Message.expires_at.is_(None))\
+                    .order_by(Message.id)\
+                    .limit(self.segment_size)\
+                    .all()
+                if not rows:
+                    break
+                self.archive.write_segment(self._records(rows))
+                last_id = rows[-1].id
+                total += len(rows)
+                db.session.expunge_all()
+
+            self._trim(self.archive.watermark)
+
+        self.archived += total
+        self.last_run = now
+        return total
+
+    def _trim(self, watermark):
+        """Delete archived rows from the hot table, one bounded batch at a time"""
+        while True:
+            archived_ids = db.session.query(Message.id)\
+                .filter(Message.id <= watermark, Message.expires_at.is_(None))\
+                .limit(self.batch_size)\
+                .subquery()
+            result = db.session.execute(
+                db.delete(Message).where(Message.id.in_(db.select(archived_ids.c.id)))
+            )
+            db.session.commit()
+
+            if result.rowcount < self.batch_size:
+                break
+            time.sleep(self.pause)
+
+    @staticmethod
+    def _records(rows):
+        """Message rows as archive records, with usernames resolved in one query"""
+        user_ids = {row.sender_id for row in rows} | {row.receiver_id for row in rows}
+        usernames = dict(
+            db.session.query(User.id, User.username).filter(User.id.in_(user_ids)).all()
+        )
+        return [{
+            'id': row.id,
+            'sender_id': row.sender_id,
+            'receiver_id': row.receiver_id,
+            'sender_username': usernames.get(row.sender_id),
+            'receiver_username': usernames.get(row.receiver_id),
+            'encrypted_content': row.encrypted_content,
+            'iv': row.iv,
+            'encrypted_aes_key': row.encrypted_aes_key,
+            'algorithm': row.algorithm,
+            'timestamp': row.timestamp.isoformat() if row.timestamp else None,
+            'expires_at': None,
+            'attachment_id': row.attachment_id
+        } for row in rows]
+
+    @contextmanager
+    def _exclusive(self):
+        os.makedirs(self.archive.directory, exist_ok=True)
+        if fcntl is None:
+            yield True
+            return
+
+        with open(os.path.join(self.archive.directory, 'archive.lock'), 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval * random.uniform(0.8, 1.2))
+            try:
+                with self.app.app_context():
+                    archived = self.run_once()
+                if archived:
+                    logger.info(f"Message archiver moved {archived} messages to cold storage")
+            except Exception as e:
+                logger.error(f"Message archival failed: {e}")
+
+
+def main(argv=None):
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description='Archive messages older than the retention window')
+    parser.add_argument('--days', type=int, default=None, help='Retention window (default: MESSAGE_RETENTION_DAYS)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    app = create_app()
+    archiver = app.extensions['message_archiver']
+    if args.days is not None:
+        archiver.retention_days = args.days
+
+    with app.app_context():
+        archived = archiver.run_once()
+    print(f"Archived {archived} messages (watermark {archiver.archive.watermark})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
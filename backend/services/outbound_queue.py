@@ -0,0 +1,183 @@
+import socket
+import threading
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class OutboundStats:
+    """Write counters shared by every outbound queue of a server"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def record_write(self, frames, nbytes):
+        with self.lock:
+            self.frames_sent += frames
+            self.bytes_sent += nbytes
+            self.writes += 1
+
+    def record_eviction(self):
+        with self.lock:
+            self.evictions += 1
+
+    def to_dict(self):
+        """Convert counters to dictionary"""
+        with self.lock:
+            return {
+                'frames_sent': self.frames_sent,
+                'bytes_sent': self.bytes_sent,
+                'writes': self.writes,
+                'evictions': self.evictions
+            }
+
+
+class OutboundQueue:
+    """
+    Bounded per-connection send queue drained by a dedicated writer thread
+
+    Producers never touch the socket: they append frames and return. The
+    writer joins every queued frame into a single sendall call, so bursts
+    cost one syscall instead of one per frame. A client whose backlog
+    exceeds max_bytes, or whose oldest queued frame is older than max_age
+    seconds, is disconnected so it cannot hold memory or stall senders.
+    The batch being written counts as backlog until sendall returns.
+    """
+
+    def __init__(self, sock, address, max_bytes=1024 * 1024, max_age=10.0, stats=None):
+        self.sock = sock
+        self.address = address
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.stats = stats or OutboundStats()
+        self.frames = deque()  # (data, enqueued_at)
+        self.queued_bytes = 0
+        # The batch handed to sendall: (frames, bytes, oldest enqueued_at)
+        self.inflight = (0, 0, None)
+        self.cond = threading.Condition()
+        self.closed = False
+        self.evicted = False
+        self.thread = None
+
+    def start(self):
+        """Start the writer thread"""
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def put(self, data):
+        """
+        Queue a frame for sending
+
+        Args:
+            data (bytes): Encoded frame
+
+        Returns:
+            bool: False if the queue is closed or the client was evicted
+        """
+        with self.cond:
+            if self.closed:
+                return False
+
+            now = time.monotonic()
+            self.frames.append((data, now))
+            self.queued_bytes += len(data)
+
+            backlog = self.queued_bytes + self.inflight[1]
+            if backlog > self.max_bytes:
+                self._evict_locked(f'{backlog} bytes queued')
+                return False
+            if now - self._oldest_locked() > self.max_age:
+                self._evict_locked(f'oldest frame queued for {now - self._oldest_locked():.1f}s')
+                return False
+
+            self.cond.notify()
+        return True
+
+    def check_age(self):
+        """Evict the client if its oldest queued frame has expired"""
+        with self.cond:
+            oldest = self._oldest_locked()
+            if not self.closed and oldest is not None:
+                age = time.monotonic() - oldest
+                if age > self.max_age:
+                    self._evict_locked(f'oldest frame queued for {age:.1f}s')
+
+    def close(self, flush=False):
+        """
+        Stop accepting frames and let the writer exit
+
+        Args:
+            flush (bool): Write frames that are already queued before exiting
+        """
+        with self.cond:
+            self.closed = True
+            if not flush:
+                self.frames.clear()
+                self.queued_bytes = 0
+            self.cond.notify()
+
+    def depth(self):
+        """Return (frames, bytes, oldest frame age in seconds)"""
+        with self.cond:
+            oldest = self._oldest_locked()
+            age = time.monotonic() - oldest if oldest is not None else 0.0
+            return len(self.frames) + self.inflight[0], self.queued_bytes + self.inflight[1], age
+
+    def _oldest_locked(self):
+        """Enqueue time of the oldest unsent frame, in flight or queued, or None"""
+        if self.inflight[2] is not None:
+            return self.inflight[2]
+        return self.frames[0][1] if self.frames else None
+
+    def _evict_locked(self, reason):
+        logger.warning(f"Evicting slow consumer {self.address}: {reason}")
+        self.closed = True
+        self.evicted = True
+        self.frames.clear()
+        self.queued_bytes = 0
+        self.inflight = (0, 0, None)
+        self.stats.record_eviction()
+        self.cond.notify()
+
+        # Unblocks both the writer's sendall and the reader's recv
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.frames and not self.closed:
+                    self.cond.wait()
+                if not self.frames:
+                    return
+
+                count = len(self.frames)
+                batch = b''.join(data for data, _ in self.frames)
+                self.inflight = (count, len(batch), self.frames[0][1])
+                self.frames.clear()
+                self.queued_bytes = 0
+
+            try:
+                self.sock.sendall(batch)
+            except OSError as e:
+                with self.cond:
+                    self.inflight = (0, 0, None)
+                    if not self.closed:
+                        logger.error(f"Write to {self.address} failed: {e}")
+                        self.closed = True
+                        self.frames.clear()
+                        self.queued_bytes = 0
+                return
+
+            with self.cond:
+                self.inflight = (0, 0, None)
+            self.stats.record_write(count, len(batch))
@@ -0,0 +1,202 @@
+import threading
+import time
+import math
+from collections import Counter
+from functools import wraps
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+
+
+class MemoryTokenBucketStore:
+    """
+    In-process token bucket store
+
+    Buckets are spread over independently locked shards, so concurrent
+    requests for different keys rarely contend. Buckets that have refilled
+    completely carry no state and are pruned once a shard grows large; if
+    none has, the least recently used bucket is evicted to keep the cap.
+    """
+
+    def __init__(self, shards=64, max_keys_per_shard=10000):
+        self.shards = [({}, threading.Lock()) for _ in range(shards)]
+        self.max_keys_per_shard = max_keys_per_shard
+
+    def consume(self, key, cost, rate, burst):
+        """
+        Take cost tokens from the bucket for key
+
+        Args:
+            key (str): Bucket key, e.g. 'ip:10.0.0.1'
+            cost (float): Tokens this request needs
+            rate (float): Refill rate in tokens per second
+            burst (float): Bucket capacity
+
+        Returns:
+            tuple: (allowed, seconds until enough tokens are available)
+        """
+        buckets, lock = self.shards[hash(key) % len(self.shards)]
+        now = time.monotonic()
+
+        with lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                if len(buckets) >= self.max_keys_per_shard:
+                    self._prune(buckets, now)
+                # [tokens, last update, seconds to refill from empty]
+                bucket = buckets[key] = [burst, now, burst / rate if rate > 0 else math.inf]
+
+            tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if tokens >= cost:
+                bucket[0] = tokens - cost
+                return True, 0.0
+
+            bucket[0] = tokens
+            return False, (cost - tokens) / rate if rate > 0 else math.inf
+
+    def refund(self, key, cost, burst):
+        """
+        Return tokens taken by consume, e.g. when a later check rejects the request
+
+        Args:
+            key (str): Bucket key
+            cost (float): Tokens to return
+            burst (float): Bucket capacity
+        """
+        buckets, lock = self.shards[hash(key) % len(self.shards)]
+        with lock:
+            bucket = buckets.get(key)
+            if bucket is not None:
+                bucket[0] = min(burst, bucket[0] + cost)
+
+    def size(self):
+        """Return the number of tracked buckets"""
+        return sum(len(buckets) for buckets, _ in self.shards)
+
+    @staticmethod
+    def _prune(buckets, now):
+        stale = [key for key, (_, updated, refill_time) in buckets.items() if now - updated >= refill_time]
+        if not stale:
+            stale = [min(buckets, key=lambda key: buckets[key][1])]
+        for key in stale:
+            del buckets[key]
+
+
+# Storage backends by name; a shared store (e.g. Redis) can be registered here.
+# Stores implement consume, refund and size like MemoryTokenBucketStore.
+BACKENDS = {
+    'memory': MemoryTokenBucketStore
+}
+
+
+def register_backend(name, store_class):
+    """Make a token bucket store available to the RATE_LIMIT_BACKEND setting"""
+    BACKENDS[name] = store_class
+
+
+class RateLimiter:
+    """Per-IP and per-user admission control with per-endpoint costs"""
+
+    def __init__(self, store, costs, ip_rate, ip_burst, user_rate, user_burst):
+        self.store = store
+        self.costs = costs
+        self.ip_rate = ip_rate
+        self.ip_burst = ip_burst
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.stats_lock = threading.Lock()
+        self.stats = Counter()
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a limiter from the RATE_LIMIT_* settings"""
+        return cls(
+            store=BACKENDS[config['RATE_LIMIT_BACKEND']](),
+            costs=config['RATE_LIMIT_COSTS'],
+            ip_rate=config['RATE_LIMIT_IP_RATE'],
+            ip_burst=config['RATE_LIMIT_IP_BURST'],
+            user_rate=config['RATE_LIMIT_USER_RATE'],
+            user_burst=config['RATE_LIMIT_USER_BURST']
+        )
+
+    def check(self, endpoint, ip_address, user_id=None):
+        """
+        Decide whether a request may proceed
+
+        Args:
+            endpoint (str): Cost table key
+            ip_address (str): Client IP address
+            user_id (int): Authenticated user (optional)
+
+        Returns:
+            tuple: (allowed, retry_after_seconds)
+        """
+        cost = self.costs.get(endpoint, 1)
+
+        allowed, retry_after = self.store.consume(f'ip:{ip_address}', cost, self.ip_rate, self.ip_burst)
+        if allowed and user_id is not None:
+            allowed, retry_after = self.store.consume(f'user:{user_id}', cost, self.user_rate, self.user_burst)
+            if not allowed:
+                # A throttled user must not spend the allowance of others behind the same IP
+                self.store.refund(f'ip:{ip_address}', cost, self.ip_burst)
+
+        with self.stats_lock:
+            self.stats[(endpoint, 'allowed' if allowed else 'rejected')] += 1
+        return allowed, retry_after
+
+    def metrics(self):
+        """
+        Admission counters and limiter state
+
+        Returns:
+            dict: Allowed and rejected counts per endpoint plus bucket settings
+        """
+        with self.stats_lock:
+            stats = dict(self.stats)
+
+        endpoints = {}
+        for (endpoint, outcome), count in stats.items():
+            endpoints.setdefault(endpoint, {'allowed': 0, 'rejected': 0})[outcome] = count
+
+        return {
+            'endpoints': endpoints,
+            'buckets': self.store.size(),
+            'costs': self.costs,
+            'ip': {'rate': self.ip_rate, 'burst': self.ip_burst},
+            'user': {'rate': self.user_rate, 'burst': self.user_burst}
+        }
+
+
+def _current_user_id():
+    """Identity from an already verified JWT, without decoding one"""
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        return None
+
+
+def rate_limit(endpoint):
+    """
+    Reject requests over the token bucket limits with 429
+
+    Apply below @jwt_required() so that authenticated routes are also
+    limited per user. The check runs before the view, so rejected requests
+    never reach bcrypt or RSA work.
+
+    Args:
+        endpoint (str): Key into RATE_LIMIT_COSTS
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            limiter = current_app.extensions.get('rate_limiter')
+            if limiter:
+                allowed, retry_after = limiter.check(endpoint, request.remote_addr, _current_user_id())
+                if not allowed:
+                    response = jsonify({'error': 'Too many requests', 'retry_after': round(retry_after, 1)})
+                    response.status_code = 429
+                    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+                    return response
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,204 @@
+import io
+import os
+import json
+import time
+import random
+import pstats
+import cProfile
+import threading
+import logging
+import logging.handlers
+from datetime import datetime
+from flask import request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+
+class RequestStats:
+    """SQL statements executed and time spent by one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        # statement -> [executions, total seconds]
+        self.statements = {}
+        self.profile = None
+
+    def record(self, statement, seconds):
+        self.queries += 1
+        self.sql_seconds += seconds
+        entry = self.statements.setdefault(statement, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def top_statements(self, limit):
+        """Statements by total time; a high count on one statement is an N+1"""
+        ranked = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [
+            {'statement': statement, 'count': count, 'total_ms': round(seconds * 1000, 3)}
+            for statement, (count, seconds) in ranked
+        ]
+
+
+class RequestProfiler:
+    """
+    Opt-in per-request instrumentation
+
+    Counts and times SQL statements through SQLAlchemy cursor events and
+    flags requests over a latency or query-count threshold. Requests can
+    also be run under cProfile, picked at a sampling rate or by a header
+    carrying the configured token. Flagged and profiled requests are
+    written as JSON lines to a rotating log. Nothing is installed unless
+    profiling is enabled, so disabled profiling costs nothing.
+    """
+
+    def __init__(self, log_path, slow_ms=500.0, max_queries=20, sample_rate=0.0,
+                 header='X-Profile', token=None, top_statements=10, profile_lines=30,
+                 log_max_bytes=10 * 1024 * 1024, log_backups=5):
+        self.slow_seconds = slow_ms / 1000.0
+        self.max_queries = max_queries
+        self.sample_rate = sample_rate
+        self.header = header
+        self.token = token
+        self.top = top_statements
+        self.profile_lines = profile_lines
+        self.local = threading.local()
+        # cProfile cannot run in two threads of one process at once
+        self.profile_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'slow': 0, 'query_heavy': 0, 'profiled': 0}
+
+        # One logger per file: apps sharing a path share its handler, others get their own
+        self.log = logging.getLogger(f'securelink.slow_requests.{os.path.abspath(log_path)}')
+        self.log.setLevel(logging.INFO)
+        self.log.propagate = False
+        if not self.log.handlers:
+            self.log.addHandler(logging.handlers.RotatingFileHandler(
+                log_path, maxBytes=log_max_bytes, backupCount=log_backups
+            ))
+
+    @classmethod
+    def from_config(cls, config, log_path):
+        """Build a profiler from the REQUEST_PROFILE_* settings"""
+        return cls(
+            log_path=log_path,
+            slow_ms=config['REQUEST_PROFILE_SLOW_MS'],
+            max_queries=config['REQUEST_PROFILE_MAX_QUERIES'],
+            sample_rate=config['REQUEST_PROFILE_SAMPLE_RATE'],
+            header=config['REQUEST_PROFILE_HEADER'],
+            token=config['REQUEST_PROFILE_TOKEN'] or None,
+            log_max_bytes=config['REQUEST_PROFILE_LOG_MAX_BYTES'],
+            log_backups=config['REQUEST_PROFILE_LOG_BACKUPS']
+        )
+
+    def install(self, app, engine):
+        """Hook the profiler into an app's request cycle and a SQLAlchemy engine"""
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.before_request(self._begin)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # The start time lives on the statement's context, so one that raises leaves nothing behind
+        if context is not None and getattr(self.local, 'current', None) is not None:
+            context._profile_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        current = getattr(self.local, 'current', None)
+        started = getattr(context, '_profile_started', None)
+        if current is not None and started is not None:
+            current.record(statement, time.perf_counter() - started)
+
+    def _wants_profile(self):
+        if self.token and request.headers.get(self.header) == self.token:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _begin(self):
+        current = RequestStats()
+        self.local.current = current
+        if self._wants_profile() and self.profile_lock.acquire(blocking=False):
+            current.profile = cProfile.Profile()
+            current.profile.enable()
+
+    def _finish(self, response):
+        current = getattr(self.local, 'current', None)
+        if current is None:
+            return response
+
+        profile_text = self._stop_profile(current)
+        elapsed = time.perf_counter() - current.started
+        slow = elapsed >= self.slow_seconds
+        query_heavy = current.queries >= self.max_queries
+
+        response.headers['Server-Timing'] = (
+            f'db;dur={current.sql_seconds * 1000:.1f};desc="{current.queries} queries", '
+            f'total;dur={elapsed * 1000:.1f}'
+        )
+
+        with self.stats_lock:
+            self.stats['requests'] += 1
+            self.stats['slow'] += slow
+            self.stats['query_heavy'] += query_heavy
+            self.stats['profiled'] += profile_text is not None
+
+        if slow or query_heavy or profile_text is not None:
+            self._write(current, response, elapsed, slow, query_heavy, profile_text)
+        return response
+
+    def _teardown(self, exc):
+        current = getattr(self.local, 'current', None)
+        if current is not None:
+            # The view raised before after_request ran
+            self._stop_profile(current)
+            self.local.current = None
+
+    def _stop_profile(self, current):
+        """Stop a running capture and render its top functions by cumulative time"""
+        if current.profile is None:
+            return None
+
+        current.profile.disable()
+        self.profile_lock.release()
+        buffer = io.StringIO()
+        pstats.Stats(current.profile, stream=buffer).sort_stats('cumulative').print_stats(self.profile_lines)
+        current.profile = None
+        return buffer.getvalue()
+
+    def _write(self, current, response, elapsed, slow, query_heavy, profile_text):
+        record = {
+            'time': datetime.utcnow().isoformat(),
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 3),
+            'queries': current.queries,
+            'sql_ms': round(current.sql_seconds * 1000, 3),
+            'flags': [flag for flag, on in (('slow', slow), ('query_heavy', query_heavy)) if on],
+            'top_statements': current.top_statements(self.top),
+            'profile': profile_text
+        }
+        try:
+            self.log.info(json.dumps(record))
+        except Exception as e:
+            logger.error(f"Could not write slow request record: {e}")
+
+    def metrics(self):
+        """
+        Request counters since startup
+
+        Returns:
+            dict: Requests seen, flagged and profiled plus thresholds
+        """
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats.update({
+            'slow_ms': self.slow_seconds * 1000,
+            'max_queries': self.max_queries,
+            'sample_rate': self.sample_rate
+        })
+        return stats
@@ -0,0 +1,682 @@
+import os
+import json
+import time
+import hmac
+import queue
+import errno
+import hashlib
+import signal
+import socket
+import urllib.parse
+import urllib.request
+import threading
+import logging
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.connection import wait
+from services.crypto_service import CryptoService
+from services.delivery_queue import PendingDeliveryStore
+from services.socket_service import SocketServer
+
+logger = logging.getLogger(__name__)
+
+# Seconds a successor keeps retrying the health port its predecessor still holds
+HEALTH_BIND_TIMEOUT = 60.0
+# Largest /send body the supervisor accepts from the API
+MAX_PUSH_BYTES = 16 * 1024 * 1024
+SIGNATURE_HEADER = 'X-SecureLink-Signature'
+
+
+def sign_push(secret, body):
+    """HMAC-SHA256 of a /send body, keyed with the JWT secret both processes share"""
+    return hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+
+
+def load_server_keypair(key_path):
+    """
+    Load the persisted socket server keypair, creating it on first use
+
+    Every worker must present the same public key, otherwise a client's
+    wrapped AES key could only be decrypted by the worker that sent it.
+
+    Args:
+        key_path (str): Path of the PEM file holding the private key
+
+    Returns:
+        tuple: (private_key, public_key) as PEM-encoded strings
+    """
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.backends import default_backend
+
+    if os.path.exists(key_path):
+        with open(key_path, 'r') as f:
+            private_pem = f.read()
+        private_key = serialization.load_pem_private_key(
+            private_pem.encode('utf-8'),
+            password=None,
+            backend=default_backend()
+        )
+        public_pem = private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode('utf-8')
+        return private_pem, public_pem
+
+    private_pem, public_pem = CryptoService.generate_rsa_keypair()
+
+    # Write atomically and owner-readable only
+    tmp_path = f'{key_path}.tmp'
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(private_pem)
+    os.replace(tmp_path, key_path)
+    logger.info(f"Server RSA keypair generated and saved to {key_path}")
+
+    return private_pem, public_pem
+
+
+class ClusterLink:
+    """Worker side of the IPC channel to the cluster supervisor"""
+
+    def __init__(self, conn, server):
+        self.conn = conn
+        self.server = server
+        self.lock = threading.Lock()  # Connection.send is not thread-safe
+
+    def ready(self):
+        self._send(('ready',))
+
+    def register(self, address):
+        self._send(('register', address))
+
+    def unregister(self, address):
+        self._send(('unregister', address))
+
+    def user_online(self, user_id):
+        self._send(('user_online', user_id))
+
+    def user_offline(self, user_id):
+        self._send(('user_offline', user_id))
+
+    def broadcast(self, message, sender_address=None):
+        self._send(('broadcast', message, sender_address))
+
+    def send(self, address, message):
+        self._send(('send', address, message))
+
+    def send_user(self, user_id, message):
+        self._send(('send_user', user_id, message))
+
+    def retire(self):
+        """Tell the supervisor this worker has no connections left and can exit"""
+        self._send(('retired',))
+
+    def _drain(self):
+        self.server.drain()
+        self.retire()
+
+    def _send(self, item):
+        try:
+            with self.lock:
+                self.conn.send(item)
+        except (OSError, EOFError) as e:
+            logger.error(f"Cluster link send failed: {e}")
+
+    def serve(self):
+        """Deliver frames relayed from other workers until the supervisor goes away"""
+        while True:
+            try:
+                item = self.conn.recv()
+            except (OSError, EOFError):
+                logger.error("Cluster supervisor went away")
+                return
+
+            kind = item[0]
+            if kind == 'broadcast':
+                self.server.broadcast_message(item[1], item[2], relay=False)
+            elif kind == 'send':
+                self.server.send_to_client(item[1], item[2], relay=False)
+            elif kind == 'send_user':
+                self.server.send_to_user(item[1], item[2], relay=False)
+            elif kind == 'drain':
+                # Keep delivering relays while clients leave; the supervisor sends exit after
+                thread = threading.Thread(target=self._drain)
+                thread.daemon = True
+                thread.start()
+            elif kind == 'exit':
+                return
+
+
+def _run_worker(index, host, port, private_key, public_key, conn, server_options, takeover=False):
+    """Entry point of a worker process"""
+    logging.basicConfig(level=logging.INFO)
+    # The supervisor decides how workers stop (see SocketCluster.stop)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    options = dict(server_options)
+    if options.get('handover_path'):
+        # Worker i of a successor takes over from worker i of this cluster
+        options['handover_path'] = f"{options['handover_path']}.{index}"
+    server = SocketServer(
+        host=host,
+        port=port,
+        private_key=private_key,
+        public_key=public_key,
+        reuse_port=True,
+        **options
+    )
+    server.cluster = ClusterLink(conn, server)
+    server.start(takeover=takeover)
+    server.ready.wait()
+    server.cluster.ready()
+    logger.info(f"Socket worker {index} (pid {os.getpid()}) ready")
+
+    # Client handling runs on daemon threads; exit with the supervisor
+    server.cluster.serve()
+    server.stop()
+
+
+class SocketCluster:
+    """Supervisor that runs the socket server as N processes sharing one port"""
+
+    def __init__(self, host='0.0.0.0', port=5001, workers=None, key_path='socket_server_key.pem', **server_options):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.key_path = key_path
+        self.server_options = server_options  # Passed through to every SocketServer
+        self.processes = {}    # {index: Process}
+        self.conns = {}        # {index: supervisor end of the worker pipe}
+        self.registry = {}     # {client_address: worker index}
+        self.users = {}        # {user_id: {worker index: devices}}
+        self.ready_workers = set()
+        self.retired = set()   # Workers that drained or handed their connections to a successor
+        self.running = False
+        self.drain_requested = False
+        self.draining = False
+        self.health_server = None
+        self.delivery_store = None  # Queues frames for users connected to no worker
+        # Frames posted by the API to /send; routed on the serve_forever thread
+        self.pushed = queue.Queue()
+        self.wake_r, self.wake_w = socket.socketpair()
+        self.wake_w.setblocking(False)
+
+    def start(self, takeover=False):
+        """
+        Load the shared keypair and fork the workers
+        
+        Args:
+            takeover (bool): Have each worker take the listener and connections
+                over from the matching worker of a running cluster
+        """
+        if not hasattr(socket, 'SO_REUSEPORT'):
+            raise RuntimeError("SO_REUSEPORT is not supported on this platform; run a single SocketServer instead")
+
+        self.private_key, self.public_key = load_server_keypair(self.key_path)
+        if self.server_options.get('delivery_path'):
+            self.delivery_store = PendingDeliveryStore(
+                self.server_options['delivery_path'],
+                max_per_user=self.server_options.get('delivery_max_per_user', 1000),
+                max_age=self.server_options.get('delivery_max_age', 7 * 24 * 3600)
+            )
+        self.running = True
+        for index in range(self.workers):
+            self._spawn(index, takeover)
+        logger.info(f"Socket cluster started {self.workers} workers on {self.host}:{self.port}")
+
+    def request_drain(self):
+        """
+        Ask every worker to drain its connections (see SocketServer.drain)
+        
+        Only sets a flag, so it is safe to call from a signal handler.
+        serve_forever keeps routing relays and queueing frames for offline
+        users while the workers drain, and returns once they have all exited
+        or drain_timeout has passed.
+        """
+        self.drain_requested = True
+
+    def serve_forever(self):
+        """Route registry updates and relayed frames until stopped"""
+        drain_deadline = None
+        while self.running:
+            if self.drain_requested and not self.draining:
+                # /ready reports unavailable while the workers drain
+                self.draining = True
+                drain_deadline = time.monotonic() + self.server_options.get('drain_timeout', 30.0) + 5
+                for index, conn in list(self.conns.items()):
+                    self._forward(index, conn, ('drain',))
+
+            ready = wait(list(self.conns.values()) + [self.wake_r], timeout=1.0)
+            for conn in ready:
+                if conn is self.wake_r:
+                    self.wake_r.recv(4096)
+                    continue
+                index = self._index_of(conn)
+                if index is None:
+                    continue
+                try:
+                    item = conn.recv()
+                except (OSError, EOFError):
+                    if index in self.retired or self.draining:
+                        self._forget(index)
+                    elif self.running:
+                        self._respawn(index)
+                    continue
+                self._route(index, item)
+            self._route_pushed()
+
+            for index, process in list(self.processes.items()):
+                if process.is_alive():
+                    continue
+                if index in self.retired or self.draining:
+                    self._forget(index)
+                elif self.running:
+                    self._respawn(index)
+
+            if not self.processes and (self.retired or self.draining):
+                logger.info("Every worker has drained or handed over")
+                self.running = False
+            elif self.draining and time.monotonic() >= drain_deadline:
+                logger.warning("Drain timed out; stopping the remaining workers")
+                self.running = False
+
+    def serve_health(self, host, port):
+        """
+        Serve liveness (/health) and readiness (/ready) probes over HTTP
+        
+        The same server answers /presence for the API, which has no
+        authentication, so bind it to a private interface. It also accepts
+        frames from the API on POST /send, signed with the JWT secret.
+        
+        Args:
+            host (str): Interface to bind
+            port (int): Port to bind
+        """
+        cluster = self
+
+        class HealthHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/health':
+                    status, body = 200, {'status': 'alive'}
+                elif self.path == '/ready':
+                    ready, details = cluster.health()
+                    status = 200 if ready else 503
+                    body = {'status': 'ready' if ready else 'unavailable', 'checks': details}
+                elif self.path.startswith('/presence'):
+                    query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+                    try:
+                        user_ids = [int(value) for value in query.get('user_id', [])]
+                        status, body = 200, {'presence': cluster.presence(user_ids)}
+                    except ValueError:
+                        status, body = 400, {'error': 'user_id must be an integer'}
+                else:
+                    status, body = 404, {'error': 'Not found'}
+                self._reply(status, body)
+
+            def do_POST(self):
+                if self.path != '/send':
+                    status, body = 404, {'error': 'Not found'}
+                else:
+                    status, body = self._accept_push()
+                self._reply(status, body)
+
+            def _accept_push(self):
+                secret = cluster.server_options.get('jwt_secret')
+                length = int(self.headers.get('Content-Length') or 0)
+                if not secret:
+                    return 403, {'error': 'Pushing frames needs a jwt_secret'}
+                if length > MAX_PUSH_BYTES:
+                    return 413, {'error': 'Body too large'}
+                data = self.rfile.read(length)
+                if not hmac.compare_digest(self.headers.get(SIGNATURE_HEADER, ''), sign_push(secret, data)):
+                    return 403, {'error': 'Bad signature'}
+                try:
+                    frames = [(int(frame['user_id']), str(frame['message'])) for frame in json.loads(data)['frames']]
+                except (ValueError, KeyError, TypeError):
+                    return 400, {'error': 'frames must be a list of {user_id, message}'}
+                cluster.push(frames)
+                return 202, {'queued': len(frames)}
+
+            def _reply(self, status, body):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        def serve():
+            # During a handover the predecessor holds the port until it exits
+            deadline = time.monotonic() + HEALTH_BIND_TIMEOUT
+            while True:
+                try:
+                    server = ThreadingHTTPServer((host, port), HealthHandler)
+                    break
+                except OSError as e:
+                    if e.errno != errno.EADDRINUSE or time.monotonic() >= deadline or not self.running:
+                        logger.error(f"Socket health probe cannot bind {host}:{port}: {e}")
+                        return
+                    time.sleep(0.5)
+            self.health_server = server
+            logger.info(f"Socket health probe listening on {host}:{port}")
+            server.serve_forever()
+
+        thread = threading.Thread(target=serve)
+        thread.daemon = True
+        thread.start()
+
+    def health(self):
+        """
+        Readiness of the cluster based on live workers and connection headroom
+        
+        Returns:
+            tuple: (ready, details dictionary)
+        """
+        alive = sum(1 for process in list(self.processes.values()) if process.is_alive())
+        max_connections = self.server_options.get('max_connections', 10000) * self.workers
+        connections = len(self.registry)
+        ready = self.running and not self.draining and len(self.ready_workers) == self.workers and \
+            connections < max_connections
+        return ready, {
+            'draining': self.draining,
+            'workers': self.workers,
+            'workers_alive': alive,
+            'workers_ready': len(self.ready_workers),
+            'connections': connections,
+            'max_connections': max_connections
+        }
+
+    def presence(self, user_ids):
+        """
+        Connected device counts across all workers
+
+        Returns:
+            dict: {user_id: devices} for users with at least one connection
+        """
+        # Read from the health server thread while serve_forever updates it
+        presence = {}
+        for user_id in user_ids:
+            devices = sum(list(self.users.get(user_id, {}).values()))
+            if devices:
+                presence[user_id] = devices
+        return presence
+
+    def stop(self):
+        """Kill the remaining workers; drain them first with request_drain"""
+        self.running = False
+        processes = list(self.processes.values())
+        if self.health_server:
+            self.health_server.shutdown()
+            self.health_server.server_close()
+        # Workers ignore SIGTERM
+        for process in processes:
+            if process.is_alive():
+                process.kill()
+        for process in processes:
+            process.join(timeout=5)
+        for conn in list(self.conns.values()):
+            conn.close()
+        self.wake_r.close()
+        self.wake_w.close()
+        logger.info("Socket cluster stopped")
+
+    def push(self, frames):
+        """
+        Queue frames for users on behalf of the API process
+        
+        Safe to call from any thread; serve_forever routes them like a
+        worker's send_user, so online users get them live and offline users
+        have them queued in the delivery store.
+        
+        Args:
+            frames (list): (user_id, message) pairs
+        """
+        for frame in frames:
+            self.pushed.put(frame)
+        try:
+            self.wake_w.send(b'\0')
+        except BlockingIOError:
+            pass  # A wake-up is already pending
+
+    def connected_clients(self):
+        """Return the number of clients connected across all workers"""
+        return len(self.registry)
+
+    def _route(self, index, item):
+        kind = item[0]
+        if kind == 'ready':
+            self.ready_workers.add(index)
+        elif kind == 'retired':
+            self.retired.add(index)
+            self._forward(index, self.conns[index], ('exit',))
+        elif kind == 'register':
+            self.registry[item[1]] = index
+        elif kind == 'unregister':
+            self.registry.pop(item[1], None)
+        elif kind == 'user_online':
+            workers = self.users.setdefault(item[1], {})
+            workers[index] = workers.get(index, 0) + 1
+        elif kind == 'user_offline':
+            workers = self.users.get(item[1], {})
+            remaining = workers.get(index, 0) - 1
+            if remaining > 0:
+                workers[index] = remaining
+            else:
+                workers.pop(index, None)
+            if not workers:
+                self.users.pop(item[1], None)
+        elif kind == 'broadcast':
+            for other, conn in self.conns.items():
+                if other != index:
+                    self._forward(other, conn, item)
+        elif kind == 'send':
+            owner = self.registry.get(item[1])
+            if owner is not None and owner != index:
+                self._forward(owner, self.conns[owner], item)
+        elif kind == 'send_user':
+            # Only workers holding one of the user's devices see the frame
+            owners = list(self.users.get(item[1], {}))
+            for owner in owners:
+                if owner != index:
+                    self._forward(owner, self.conns[owner], item)
+            if not owners and self.delivery_store:
+                self.delivery_store.append(item[1], item[2])
+
+    def _route_pushed(self):
+        while True:
+            try:
+                user_id, message = self.pushed.get_nowait()
+            except queue.Empty:
+                return
+            self._route(-1, ('send_user', user_id, message))
+
+    def _forward(self, index, conn, item):
+        try:
+            conn.send(item)
+        except (OSError, EOFError) as e:
+            logger.error(f"Could not relay to worker {index}: {e}")
+
+    def _index_of(self, conn):
+        for index, candidate in self.conns.items():
+            if candidate is conn:
+                return index
+        return None
+
+    def _spawn(self, index, takeover=False):
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=_run_worker,
+            args=(index, self.host, self.port, self.private_key, self.public_key, child_conn, self.server_options,
+                  takeover),
+            name=f'securelink-socket-{index}'
+        )
+        process.daemon = True
+        process.start()
+        child_conn.close()
+
+        self.processes[index] = process
+        self.conns[index] = parent_conn
+
+    def _respawn(self, index):
+        """Replace a dead worker"""
+        logger.error(f"Socket worker {index} exited; restarting")
+        self._forget(index)
+        self._spawn(index)
+
+    def _forget(self, index):
+        """Drop a worker that exited and the clients it held"""
+        self.conns.pop(index).close()
+        process = self.processes.pop(index)
+        process.kill()
+        process.join(timeout=1)
+        self.registry = {address: owner for address, owner in self.registry.items() if owner != index}
+        for user_id in list(self.users):
+            self.users[user_id].pop(index, None)
+            if not self.users[user_id]:
+                del self.users[user_id]
+        self.ready_workers.discard(index)
+
+
+def query_presence(url, user_ids, timeout=2.0):
+    """
+    Ask a socket cluster's health server which users are connected
+
+    Args:
+        url (str): The cluster's /presence URL
+        user_ids (list): Users to look up
+        timeout (float): Seconds to wait for the answer
+
+    Returns:
+        dict: {user_id: devices} for users with at least one connection
+    """
+    query = urllib.parse.urlencode([('user_id', user_id) for user_id in user_ids])
+    with urllib.request.urlopen(f'{url}?{query}', timeout=timeout) as response:
+        presence = json.loads(response.read().decode('utf-8'))['presence']
+    return {int(user_id): devices for user_id, devices in presence.items()}
+
+
+class ClusterPusher:
+    """
+    Hands frames from the API process to a standalone socket cluster
+
+    Request threads only enqueue; a background thread posts the frames in
+    batches to the supervisor's /send endpoint, which routes them through
+    the worker relay: online users get them live, offline users have them
+    queued in the delivery store. The queue is bounded, and frames are
+    dropped when it is full or the cluster is unreachable. The message
+    itself is already stored, so clients still fetch it over HTTP.
+    """
+
+    def __init__(self, url, secret, max_pending=10000, batch_size=100, timeout=2.0):
+        self.url = url
+        self.secret = secret
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.frames = queue.Queue(maxsize=max_pending)
+        self.lock = threading.Lock()
+        self.thread = None  # Started on first use, i.e. after any fork
+        self.sent = 0
+        self.dropped = 0
+        self.reachable = True
+
+    def push(self, user_ids, message):
+        """
+        Queue a frame for each user without waiting on the cluster
+
+        Args:
+            user_ids (iterable): Recipients
+            message (str): Plaintext frame
+        """
+        for user_id in user_ids:
+            try:
+                self.frames.put_nowait((user_id, message))
+            except queue.Full:
+                with self.lock:
+                    self.dropped += 1
+                logger.warning(f"Cluster push queue full; dropped frame for user {user_id}")
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='securelink-cluster-push')
+                self.thread.daemon = True
+                self.thread.start()
+
+    def metrics(self):
+        """Frames waiting, posted and dropped"""
+        with self.lock:
+            return {'pending': self.frames.qsize(), 'sent': self.sent, 'dropped': self.dropped}
+
+    def _run(self):
+        while True:
+            batch = [self.frames.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.frames.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._post(batch)
+            except Exception as e:
+                with self.lock:
+                    self.dropped += len(batch)
+                # Log once per outage rather than once per batch
+                if self.reachable:
+                    logger.warning(f"Socket cluster unreachable at {self.url}; dropping pushed frames: {e}")
+                self.reachable = False
+                continue
+            with self.lock:
+                self.sent += len(batch)
+            if not self.reachable:
+                logger.info(f"Socket cluster reachable again at {self.url}")
+            self.reachable = True
+
+    def _post(self, batch):
+        body = json.dumps({
+            'frames': [{'user_id': user_id, 'message': message} for user_id, message in batch]
+        }).encode('utf-8')
+        request = urllib.request.Request(self.url, data=body, method='POST', headers={
+            'Content-Type': 'application/json',
+            SIGNATURE_HEADER: sign_push(self.secret, body)
+        })
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+# Guards the lazily created pusher of an API process without a socket server
+_pusher_lock = threading.Lock()
+
+
+def push_to_users(app, user_ids, message):
+    """
+    Push a frame to users' devices from the API, or queue it while they are offline
+
+    In development the socket server runs inside the API process and
+    routes the frame itself. Otherwise the frame is handed to the
+    standalone cluster in the background (see ClusterPusher), so the
+    request never waits on it.
+
+    Args:
+        app (Flask): The API application
+        user_ids (iterable): Recipients
+        message (str): Plaintext frame
+    """
+    socket_server = app.extensions.get('socket_server')
+    if socket_server and socket_server.running:
+        for user_id in user_ids:
+            socket_server.send_to_user(user_id, message)
+        return
+    if not app.config['SOCKET_PUSH_URL']:
+        return
+
+    with _pusher_lock:
+        pusher = app.extensions.get('cluster_pusher')
+        if pusher is None:
+            pusher = ClusterPusher(
+                app.config['SOCKET_PUSH_URL'],
+                app.config['JWT_SECRET_KEY'],
+                max_pending=app.config['SOCKET_PUSH_QUEUE_MAX']
+            )
+            app.extensions['cluster_pusher'] = pusher
+    pusher.push(user_ids, message)
@@ -1,32 +1,131 @@
+import os
 import socket
+import select
+import random
+import hashlib
 import threading
+import time
 import json
 import logging
+import jwt
+from multiprocessing import AuthenticationError, reduction
+from multiprocessing.connection import Client, Connection, answer_challenge, deliver_challenge
 from services.crypto_service import CryptoService
+from services.outbound_queue import OutboundQueue, OutboundStats
+from services.delivery_queue import PendingDeliveryStore
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+MAX_FRAME_BUFFER = 1024 * 1024  # Unparsed inbound bytes allowed per connection
+REAP_INTERVAL = 1.0
+PURGE_INTERVAL = 60.0  # Seconds between sweeps of expired pending deliveries
+
 class SocketServer:
     """TCP/IP Socket Server for encrypted real-time communication"""
     
-    def __init__(self, host='0.0.0.0', port=5001):
+    def __init__(self, host='0.0.0.0', port=5001, private_key=None, public_key=None, reuse_port=False,
+                 queue_max_bytes=1024 * 1024, queue_max_age=10.0, heartbeat_interval=30.0,
+                 idle_timeout=90.0, handshake_timeout=10.0, max_connections=10000,
+                 max_connections_per_ip=50, jwt_secret=None, require_auth=True, delivery_path=None,
+                 delivery_max_per_user=1000, delivery_max_age=7 * 24 * 3600, delivery_batch=100,
+                 drain_timeout=30.0, reconnect_window=10.0, handover_path=None):
         self.host = host
         self.port = port
+        self.reuse_port = reuse_port
+        self.queue_max_bytes = queue_max_bytes
+        self.queue_max_age = queue_max_age
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.handshake_timeout = handshake_timeout
+        self.max_connections = max_connections
+        self.max_connections_per_ip = max_connections_per_ip
+        self.jwt_secret = jwt_secret
+        self.require_auth = require_auth
+        self.delivery_path = delivery_path
+        self.delivery_max_per_user = delivery_max_per_user
+        self.delivery_max_age = delivery_max_age
+        self.delivery_batch = delivery_batch
+        self.delivery_store = None  # Opened in start(), i.e. after any fork
+        self.drain_timeout = drain_timeout
+        self.reconnect_window = reconnect_window
+        # The handover socket is authenticated with a key derived from the JWT secret
+        if handover_path and not (jwt_secret and hasattr(socket, 'AF_UNIX') and hasattr(select, 'poll')):
+            logger.warning("Connection handover needs a JWT secret and Unix sockets; disabled")
+            handover_path = None
+        self.handover_path = handover_path
         self.server_socket = None
-        self.clients = {}  # {client_address: {'socket': socket, 'aes_key': key}}
+        self.clients = {}  # {client_address: {'socket', 'aes_key', 'queue', 'last_seen', 'last_ping', 'user_id', 'token_expires', 'delivery_cursor'}}
         self.running = False
+        self.cluster = None  # ClusterLink when running as one of several workers
+        self.outbound_stats = OutboundStats()
+        
+        # Admission state covers handshaking connections as well as established ones
+        self.connection_lock = threading.Lock()
+        self.connection_count = 0
+        self.connections_by_ip = {}
+        self.rejected = 0
+        self.reaped = 0
+        
+        # Authenticated connections by user, one entry per device
+        self.registry_lock = threading.Lock()
+        self.users = {}  # {user_id: {client_address: client_info}}
+        self.auth_failures = 0
         
-        # Generate server RSA keypair
-        self.private_key, self.public_key = CryptoService.generate_rsa_keypair()
-        logger.info("Server RSA keypair generated")
+        # Graceful drain, and handover of connections to a successor process
+        self.draining = False
+        self.handing_over = False
+        self.handover_listener = None
+        self.handover_inode = None
+        self.handover_conn = None
+        self.handover_lock = threading.Lock()  # One connection's state and fd at a time
+        self.handed_over = 0
+        self.adopted = 0
+        self.wake_r = self.wake_w = None  # Self-pipe that interrupts accept and reader threads
+        self.stopped = threading.Event()
+        
+        # Shared keypair, e.g. persisted by the cluster supervisor; otherwise
+        # generated lazily on the accept thread so construction stays cheap
+        self.private_key = private_key
+        self.public_key = public_key
+        self.ready = threading.Event()
+    
+    def _ensure_keypair(self):
+        """Generate the server RSA keypair if none was supplied"""
+        if not (self.private_key and self.public_key):
+            self.private_key, self.public_key = CryptoService.generate_rsa_keypair()
+            logger.info("Server RSA keypair generated")
     
-    def start(self):
-        """Start the socket server"""
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.server_socket.bind((self.host, self.port))
-        self.server_socket.listen(5)
+    def start(self, takeover=False):
+        """
+        Start the socket server
+        
+        Args:
+            takeover (bool): Take the listening socket and established connections
+                over from the server running at handover_path, if any, instead
+                of binding the port
+        """
+        if self.delivery_path:
+            self.delivery_store = PendingDeliveryStore(
+                self.delivery_path,
+                max_per_user=self.delivery_max_per_user,
+                max_age=self.delivery_max_age
+            )
+        
+        self.wake_r, self.wake_w = os.pipe()
+        os.set_blocking(self.wake_w, False)
+        
+        predecessor = self._take_over() if takeover and self.handover_path else None
+        if predecessor:
+            self.server_socket = predecessor[1]
+        else:
+            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if self.reuse_port:
+                # Lets several worker processes bind the same port; the kernel balances accepts
+                self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            self.server_socket.bind((self.host, self.port))
+            self.server_socket.listen(5)
         self.running = True
         
         logger.info(f"Socket server started on {self.host}:{self.port}")
@@ -35,12 +134,48 @@ class SocketServer:
         accept_thread = threading.Thread(target=self._accept_connections)
         accept_thread.daemon = True
         accept_thread.start()
+        
+        # Heartbeats, idle timeouts and slow-consumer checks
+        reaper_thread = threading.Thread(target=self._reap)
+        reaper_thread.daemon = True
+        reaper_thread.start()
+        
+        if predecessor:
+            handover_thread = threading.Thread(target=self._receive_handover, args=(predecessor[0],))
+            handover_thread.daemon = True
+            handover_thread.start()
+        elif self.handover_path:
+            self._listen_for_handover()
+    
+    def _accepting(self):
+        return self.running and not self.draining and not self.handing_over
     
     def _accept_connections(self):
         """Accept incoming client connections"""
-        while self.running:
+        # Connections that arrive meanwhile wait in the listen backlog
+        self._ensure_keypair()
+        self.ready.set()
+        
+        # Polled with the wake pipe so drain and handover can stop this thread.
+        # The listener is non-blocking because a successor may share it.
+        poller = None
+        if hasattr(select, 'poll'):
+            poller = select.poll()
+            poller.register(self.server_socket, select.POLLIN)
+            poller.register(self.wake_r, select.POLLIN)
+            self.server_socket.setblocking(False)
+        
+        while self._accepting():
             try:
+                if poller is not None:
+                    poller.poll()
+                    if not self._accepting():
+                        break
                 client_socket, client_address = self.server_socket.accept()
+                
+                if not self._admit(client_address[0]):
+                    self._reject(client_socket, client_address)
+                    continue
                 logger.info(f"New connection from {client_address}")
                 
                 # Handle client in a separate thread
@@ -50,88 +185,858 @@ class SocketServer:
                 )
                 client_thread.daemon = True
                 client_thread.start()
+            except BlockingIOError:
+                continue  # Taken by the other process sharing the listener
             except Exception as e:
-                if self.running:
+                if self._accepting():
                     logger.error(f"Error accepting connection: {e}")
     
+    def _admit(self, ip, force=False):
+        """
+        Reserve a connection slot, enforcing the global and per-IP caps
+        
+        Args:
+            ip (str): Client IP address
+            force (bool): Count the connection even over the caps (handed-over connections)
+        """
+        with self.connection_lock:
+            if not force and self.connection_count >= self.max_connections:
+                return False
+            if not force and self.connections_by_ip.get(ip, 0) >= self.max_connections_per_ip:
+                return False
+            self.connection_count += 1
+            self.connections_by_ip[ip] = self.connections_by_ip.get(ip, 0) + 1
+            return True
+    
+    def _release(self, ip):
+        """Return a connection slot reserved by _admit"""
+        with self.connection_lock:
+            self.connection_count -= 1
+            remaining = self.connections_by_ip.get(ip, 0) - 1
+            if remaining > 0:
+                self.connections_by_ip[ip] = remaining
+            else:
+                self.connections_by_ip.pop(ip, None)
+    
+    def _reject(self, client_socket, client_address):
+        """Turn away a connection that is over the limits"""
+        self.rejected += 1
+        logger.warning(f"Rejected connection from {client_address}: connection limit reached")
+        try:
+            client_socket.send(self._control_frame('error', error='Too many connections'))
+        except OSError:
+            pass
+        client_socket.close()
+    
+    def _reap(self):
+        """Ping quiet clients, drop dead ones and enforce the outbound queue age limit"""
+        last_purge = time.monotonic()
+        while self.running:
+            time.sleep(REAP_INTERVAL)
+            now = time.monotonic()
+            
+            if self.delivery_store and now - last_purge >= PURGE_INTERVAL:
+                last_purge = now
+                try:
+                    self.delivery_store.purge()
+                except Exception as e:
+                    logger.error(f"Pending delivery purge failed: {e}")
+            
+            for address, client_info in list(self.clients.items()):
+                client_info['queue'].check_age()
+                
+                token_expires = client_info['token_expires']
+                if token_expires and time.time() >= token_expires:
+                    logger.info(f"Disconnecting {address}: access token expired")
+                    client_info['queue'].put(self._control_frame('error', error='Token expired'))
+                    self._sever(client_info['socket'])
+                    continue
+                
+                idle = now - client_info['last_seen']
+                if idle > self.idle_timeout:
+                    logger.info(f"Reaping {address}: no traffic for {idle:.0f}s")
+                    self.reaped += 1
+                    self._sever(client_info['socket'])
+                elif idle > self.heartbeat_interval and now - client_info['last_ping'] > self.heartbeat_interval:
+                    client_info['last_ping'] = now
+                    client_info['queue'].put(self._control_frame('ping'))
+    
+    @staticmethod
+    def _sever(client_socket):
+        """Shut a socket down so its reader and writer threads exit"""
+        try:
+            client_socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    
+    @staticmethod
+    def _control_frame(frame_type, **fields):
+        """Encode an unencrypted protocol control frame (ping, pong, error)"""
+        fields['type'] = frame_type
+        return json.dumps(fields).encode('utf-8')
+    
+    @staticmethod
+    def _split_frames(buffer, decoder=json.JSONDecoder()):
+        """
+        Parse every complete JSON frame at the start of the buffer
+        
+        Args:
+            buffer (str): Data received so far
+            
+        Returns:
+            tuple: (list of frames, unparsed remainder)
+        """
+        frames = []
+        while True:
+            buffer = buffer.lstrip()
+            if not buffer:
+                return frames, buffer
+            try:
+                frame, end = decoder.raw_decode(buffer)
+            except ValueError:
+                if len(buffer) > MAX_FRAME_BUFFER:
+                    raise ValueError("Inbound frame exceeds buffer limit")
+                return frames, buffer
+            frames.append(frame)
+            buffer = buffer[end:]
+    
     def _handle_client(self, client_socket, client_address):
         """Handle individual client connection"""
+        queue = None
         try:
+            # A client that never completes the handshake must not hold a thread forever
+            client_socket.settimeout(self.handshake_timeout)
+            
             # Step 1: Send server public key to client
             handshake_data = {
                 'type': 'handshake',
                 'public_key': self.public_key
             }
-            client_socket.send(json.dumps(handshake_data).encode('utf-8'))
+            client_socket.sendall(json.dumps(handshake_data).encode('utf-8'))
             logger.info(f"Sent public key to {client_address}")
             
-            # Step 2: Receive encrypted AES key from client
-            encrypted_aes_key_b64 = client_socket.recv(4096).decode('utf-8')
+            # Step 2: Receive encrypted AES key from client; base64 never contains '{',
+            # so anything from the first brace on is already the next frame
+            encrypted_aes_key_b64, brace, rest = client_socket.recv(4096).decode('utf-8').partition('{')
             encrypted_aes_key = CryptoService.decode_base64(encrypted_aes_key_b64)
+            buffer = brace + rest
             
             # Step 3: Decrypt AES key with server's private key
             aes_key = CryptoService.decrypt_rsa(encrypted_aes_key, self.private_key)
             logger.info(f"Established secure channel with {client_address}")
             
-            # Store client info
-            self.clients[client_address] = {
+            # Store client info; all further writes go through the outbound queue
+            queue = OutboundQueue(
+                client_socket,
+                client_address,
+                max_bytes=self.queue_max_bytes,
+                max_age=self.queue_max_age,
+                stats=self.outbound_stats
+            )
+            queue.start()
+            client_info = {
                 'socket': client_socket,
-                'aes_key': aes_key
+                'aes_key': aes_key,
+                'queue': queue,
+                'last_seen': time.monotonic(),
+                'last_ping': 0.0,
+                'user_id': None,
+                'token_expires': None,
+                'delivery_cursor': 0
             }
             
-            # Step 4: Listen for encrypted messages
-            while self.running:
-                data = client_socket.recv(4096)
-                if not data:
-                    break
-                
-                # Decrypt message
-                message_data = json.loads(data.decode('utf-8'))
-                ciphertext = CryptoService.decode_base64(message_data['ciphertext'])
-                iv = CryptoService.decode_base64(message_data['iv'])
-                
-                plaintext = CryptoService.decrypt_aes(ciphertext, aes_key, iv)
-                logger.info(f"Received from {client_address}: {plaintext}")
-                
-                # Echo back encrypted response
-                response = f"Server received: {plaintext}"
-                response_iv = CryptoService.generate_iv()
-                response_ciphertext = CryptoService.encrypt_aes(response, aes_key, response_iv)
-                
-                response_data = {
-                    'ciphertext': CryptoService.encode_base64(response_ciphertext),
-                    'iv': CryptoService.encode_base64(response_iv)
-                }
-                client_socket.send(json.dumps(response_data).encode('utf-8'))
+            # Step 4: The first encrypted frame carries the access token
+            frames, buffer = self._split_frames(buffer)
+            if self.require_auth:
+                while not frames:
+                    data = client_socket.recv(4096)
+                    if not data:
+                        raise ConnectionError("Connection closed during handshake")
+                    frames, buffer = self._split_frames(buffer + data.decode('utf-8'))
+                first = frames.pop(0)
+                request = self._parse_control(self._decrypt_frame(first, aes_key)) if 'ciphertext' in first else None
+                if not request or request.get('type') != 'auth':
+                    self.auth_failures += 1
+                    queue.put(self._control_frame('error', error='Authentication required'))
+                    authenticated = False
+                else:
+                    authenticated = self._authenticate(client_info, client_address, request.get('token'))
+                if not authenticated:
+                    # Let the writer deliver the error before the socket closes
+                    queue.close(flush=True)
+                    queue.thread.join(timeout=1.0)
+                    return
+            
+            client_socket.settimeout(None)
+            self._serve_client(client_socket, client_address, client_info, frames, buffer)
                 
+        except socket.timeout:
+            logger.warning(f"Handshake with {client_address} timed out")
+        except Exception as e:
+            logger.error(f"Error handling client {client_address}: {e}")
+        finally:
+            self._close_client(client_socket, client_address, queue)
+    
+    def _resume_client(self, client_socket, client_address, client_info, buffer):
+        """Serve a connection handed over by the previous process, skipping the handshake"""
+        try:
+            frames, buffer = self._split_frames(buffer)
+            self._serve_client(client_socket, client_address, client_info, frames, buffer)
         except Exception as e:
             logger.error(f"Error handling client {client_address}: {e}")
         finally:
-            # Clean up
-            if client_address in self.clients:
-                del self.clients[client_address]
-            client_socket.close()
-            logger.info(f"Connection closed: {client_address}")
+            self._close_client(client_socket, client_address, client_info['queue'])
+    
+    def _serve_client(self, client_socket, client_address, client_info, frames, buffer):
+        """Register an established connection and process its frames until it closes"""
+        self.clients[client_address] = client_info
+        if self.cluster:
+            self.cluster.register(client_address)
+        if client_info['user_id'] is not None:
+            self._bind_user(client_address, client_info)
+            self._drain(client_info)
+        if self.draining:
+            self._hint_reconnect(client_info)
+        
+        # With handover enabled, reads also wait on the wake pipe
+        poller = None
+        if self.handover_path:
+            poller = select.poll()
+            poller.register(client_socket, select.POLLIN)
+            poller.register(self.wake_r, select.POLLIN)
+        
+        # Step 5: Listen for encrypted messages and heartbeats
+        while self.running:
+            for message_data in frames:
+                self._handle_frame(client_address, client_info, message_data)
+            frames = []
+            
+            # Frames already received are handled before the connection moves
+            if self.handing_over:
+                self._hand_off(client_address, client_info, buffer)
+                return
+            
+            if poller is not None:
+                events = poller.poll()
+                if self.handing_over and not any(fd == client_socket.fileno() for fd, _ in events):
+                    continue
+            data = client_socket.recv(4096)
+            if not data:
+                break
+            client_info['last_seen'] = time.monotonic()
+            frames, buffer = self._split_frames(buffer + data.decode('utf-8'))
+    
+    def _close_client(self, client_socket, client_address, queue):
+        """Remove a connection from the server and release its slot"""
+        if client_address in self.clients:
+            client_info = self.clients.pop(client_address)
+            client_info['queue'].close()
+            self._unbind_user(client_address, client_info)
+            if self.cluster:
+                self.cluster.unregister(client_address)
+        elif queue:
+            queue.close()
+        client_socket.close()
+        self._release(client_address[0])
+        logger.info(f"Connection closed: {client_address}")
+    
+    def _handle_frame(self, client_address, client_info, message_data):
+        """Process one inbound frame from an established connection"""
+        frame_type = message_data.get('type')
+        if frame_type == 'ping':
+            client_info['queue'].put(self._control_frame('pong'))
+            return
+        if frame_type == 'pong':
+            return
+        
+        plaintext = self._decrypt_frame(message_data, client_info['aes_key'])
+        
+        # A fresh token may be presented at any time to extend the session
+        request = self._parse_control(plaintext)
+        if request and request.get('type') == 'auth':
+            previous = client_info['user_id']
+            if not self._authenticate(client_info, client_address, request.get('token')):
+                # Let the writer deliver the error before the socket closes
+                client_info['queue'].close(flush=True)
+                client_info['queue'].thread.join(timeout=1.0)
+                self._sever(client_info['socket'])
+            elif previous is None:
+                self._bind_user(client_address, client_info)
+                self._drain(client_info)
+            return
+        if request and request.get('type') == 'ack':
+            self._ack(client_info, request.get('up_to'))
+            return
+        
+        logger.info(f"Received from {client_address}: {plaintext}")
+        
+        # Echo back encrypted response
+        self._send_encrypted(client_info, f"Server received: {plaintext}")
+    
+    @staticmethod
+    def _decrypt_frame(message_data, aes_key):
+        """Decrypt a {'ciphertext', 'iv'} data frame to plaintext"""
+        ciphertext = CryptoService.decode_base64(message_data['ciphertext'])
+        iv = CryptoService.decode_base64(message_data['iv'])
+        return CryptoService.decrypt_aes(ciphertext, aes_key, iv)
+    
+    @staticmethod
+    def _parse_control(plaintext):
+        """Return the decrypted payload as a dict if it is a JSON control request"""
+        if not plaintext.startswith('{'):
+            return None
+        try:
+            request = json.loads(plaintext)
+        except ValueError:
+            return None
+        return request if isinstance(request, dict) else None
+    
+    def _verify_token(self, token):
+        """
+        Validate an access token issued by /api/auth/login
+        
+        Returns:
+            dict: Decoded claims, or None if the token is invalid or expired
+        """
+        if not token or not self.jwt_secret:
+            return None
+        try:
+            claims = jwt.decode(token, self.jwt_secret, algorithms=['HS256'])
+        except jwt.PyJWTError:
+            return None
+        if claims.get('type', 'access') != 'access' or claims.get('sub') is None:
+            return None
+        return claims
+    
+    def _authenticate(self, client_info, client_address, token):
+        """
+        Attach the identity in a token to a connection
+        
+        A connection stays bound to the first user it authenticates as;
+        later tokens may only extend that user's session.
+        
+        Returns:
+            bool: True if the token was accepted
+        """
+        claims = self._verify_token(token)
+        user_id = claims['sub'] if claims else None
+        if user_id is None or (client_info['user_id'] is not None and client_info['user_id'] != user_id):
+            self.auth_failures += 1
+            logger.warning(f"Authentication failed for {client_address}")
+            client_info['queue'].put(self._control_frame('error', error='Authentication failed'))
+            return False
+        
+        client_info['user_id'] = user_id
+        client_info['token_expires'] = claims.get('exp')
+        client_info['queue'].put(self._control_frame('auth_ok', user_id=user_id))
+        return True
+    
+    def _drain(self, client_info):
+        """
+        Send the next batch of frames queued while the user was offline
+        
+        Each frame is wrapped as {"type": "delivery", "delivery_id", "message"};
+        the client acknowledges with {"type": "ack", "up_to": delivery_id},
+        which trims the queue and releases the following batch.
+        """
+        if not self.delivery_store:
+            return
+        try:
+            batch = self.delivery_store.fetch(client_info['user_id'], client_info['delivery_cursor'], self.delivery_batch)
+        except Exception as e:
+            logger.error(f"Reading pending deliveries failed: {e}")
+            return
+        
+        for delivery_id, message in batch:
+            frame = json.dumps({'type': 'delivery', 'delivery_id': delivery_id, 'message': message})
+            if not self._send_encrypted(client_info, frame):
+                return
+            client_info['delivery_cursor'] = delivery_id
+    
+    def _ack(self, client_info, up_to):
+        """Trim acknowledged deliveries and continue draining once a batch is done"""
+        if not self.delivery_store or client_info['user_id'] is None:
+            return
+        if isinstance(up_to, bool) or not isinstance(up_to, int):
+            client_info['queue'].put(self._control_frame('error', error='ack requires an integer up_to'))
+            return
+        
+        self.delivery_store.ack(client_info['user_id'], min(up_to, client_info['delivery_cursor']))
+        if up_to >= client_info['delivery_cursor']:
+            self._drain(client_info)
+    
+    def _bind_user(self, client_address, client_info):
+        """Add an authenticated connection to the user registry"""
+        user_id = client_info['user_id']
+        with self.registry_lock:
+            devices = self.users.setdefault(user_id, {})
+            devices[client_address] = client_info
+            first_device = len(devices) == 1
+        if self.cluster:
+            self.cluster.user_online(user_id)
+        if first_device:
+            logger.info(f"User {user_id} online")
+    
+    def _unbind_user(self, client_address, client_info):
+        """Remove a connection from the user registry"""
+        user_id = client_info['user_id']
+        if user_id is None:
+            return
+        with self.registry_lock:
+            devices = self.users.get(user_id)
+            if devices is None or devices.pop(client_address, None) is None:
+                return
+            if not devices:
+                del self.users[user_id]
+        if self.cluster:
+            self.cluster.user_offline(user_id)
     
     def stop(self):
-        """Stop the socket server"""
+        """Stop the socket server and close every connection"""
+        if self.stopped.is_set():
+            return
         self.running = False
+        self._close_handover_listener()
+        self._stop_accepting()
+        for client_info in list(self.clients.values()):
+            self._sever(client_info['socket'])
+        logger.info("Socket server stopped")
+        self.stopped.set()
+    
+    def drain(self, timeout=None):
+        """
+        Stop gracefully: stop accepting, ask clients to reconnect, then stop
+        
+        Frames already received are still handled and their replies sent.
+        Each client gets {"type": "reconnect", "retry_after": seconds}, with
+        the delay drawn at random from reconnect_window, so clients return
+        to the next server gradually instead of all at once. Connections
+        still open at the timeout are closed.
+        
+        Args:
+            timeout (float): Seconds to wait for clients to leave (default drain_timeout)
+            
+        Returns:
+            int: Connections that were closed at the timeout
+        """
+        timeout = self.drain_timeout if timeout is None else timeout
+        self.draining = True
+        self._close_handover_listener()
+        self._stop_accepting()
+        
+        for client_info in list(self.clients.values()):
+            self._hint_reconnect(client_info)
+        logger.info(f"Draining {len(self.clients)} connections")
+        
+        remaining = self._wait_for_connections(timeout)
+        self.stop()
+        return remaining
+    
+    def _hint_reconnect(self, client_info):
+        """Ask a draining server's client to reconnect after a random delay"""
+        retry_after = round(random.uniform(0, self.reconnect_window), 3)
+        client_info['queue'].put(self._control_frame('reconnect', retry_after=retry_after))
+    
+    def _wait_for_connections(self, timeout):
+        """Wait until every connection has closed or moved; returns how many remain"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.connection_lock:
+                remaining = self.connection_count
+            if remaining == 0 or time.monotonic() >= deadline:
+                return remaining
+            time.sleep(0.05)
+    
+    def _wake(self):
+        """Interrupt the accept thread and, during a handover, the reader threads"""
+        if self.wake_w is not None:
+            try:
+                os.write(self.wake_w, b'x')
+            except OSError:
+                pass
+    
+    def _stop_accepting(self):
+        """
+        Close this process's listening socket
+        
+        With SO_REUSEPORT the kernel then sends new connections to the other
+        servers bound to the port. After a handover the successor holds its
+        own reference, so the socket keeps listening there.
+        """
+        self._wake()
         if self.server_socket:
             self.server_socket.close()
-        logger.info("Socket server stopped")
     
-    def broadcast_message(self, message, sender_address=None):
-        """Broadcast encrypted message to all connected clients"""
-        for address, client_info in self.clients.items():
+    def _handover_key(self):
+        """Key both processes prove knowledge of before any session key is passed"""
+        return hashlib.sha256(b'securelink-socket-handover:' + self.jwt_secret.encode('utf-8')).digest()
+    
+    def _listen_for_handover(self):
+        """Wait on handover_path for a successor started with takeover"""
+        # Left behind by a server that did not stop cleanly
+        if os.path.exists(self.handover_path):
+            os.unlink(self.handover_path)
+        
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            listener.bind(self.handover_path)
+            os.chmod(self.handover_path, 0o600)
+            listener.listen(1)
+        except OSError as e:
+            logger.error(f"Cannot listen for a handover on {self.handover_path}: {e}")
+            listener.close()
+            return
+        self.handover_inode = os.stat(self.handover_path).st_ino
+        self.handover_listener = listener
+        
+        handover_thread = threading.Thread(target=self._serve_handover, args=(listener,))
+        handover_thread.daemon = True
+        handover_thread.start()
+        logger.info(f"Listening for a successor on {self.handover_path}")
+    
+    def _close_handover_listener(self):
+        listener, self.handover_listener = self.handover_listener, None
+        if listener is None:
+            return
+        try:
+            # Leave the path alone if a newer server has bound it since
+            if os.stat(self.handover_path).st_ino == self.handover_inode:
+                os.unlink(self.handover_path)
+        except OSError:
+            pass
+        try:
+            listener.shutdown(socket.SHUT_RDWR)  # Wakes the blocked accept()
+        except OSError:
+            pass
+        listener.close()
+    
+    def _serve_handover(self, listener):
+        """
+        Hand the listening socket and every connection to a successor process
+        
+        The successor receives the listener first and accepts from then on;
+        connections waiting in the backlog stay queued on the shared socket.
+        Each established connection is then passed with its session key,
+        identity, delivery cursor and unparsed input, so its client keeps
+        the connection and never repeats the RSA handshake.
+        """
+        while True:
+            try:
+                client_socket, _ = listener.accept()
+            except OSError:
+                return  # Closed by drain() or stop()
+            conn = Connection(client_socket.detach())
+            try:
+                deliver_challenge(conn, self._handover_key())
+                answer_challenge(conn, self._handover_key())
+                break
+            except (AuthenticationError, OSError, EOFError):
+                logger.warning("Rejected a handover connection that failed authentication")
+                conn.close()
+        
+        self._close_handover_listener()
+        if not self._accepting():
+            conn.close()
+            return
+        
+        try:
+            with self.handover_lock:
+                conn.send(('listener',))
+                reduction.send_handle(conn, self.server_socket.fileno(), None)
+                self.handover_conn = conn
+        except OSError as e:
+            logger.error(f"Handover failed; continuing to serve: {e}")
+            conn.close()
+            return
+        
+        logger.info("Successor connected; handing over connections")
+        self.handing_over = True
+        self._stop_accepting()
+        
+        # Connections still in their handshake are handed over once established
+        self._wait_for_connections(self.drain_timeout)
+        with self.handover_lock:
+            try:
+                conn.send(('done',))
+            except OSError:
+                pass
+            conn.close()
+            self.handover_conn = None
+        
+        logger.info(f"Handed over {self.handed_over} connections")
+        self.stop()
+        if self.cluster:
+            self.cluster.retire()
+    
+    def _hand_off(self, client_address, client_info, buffer):
+        """
+        Pass an established connection and its session state to the successor
+        
+        The connection leaves the user registry first, so frames for its user
+        go to the pending delivery queue meanwhile, and its outbound queue is
+        flushed so the successor continues the stream at a frame boundary.
+        """
+        self.clients.pop(client_address, None)
+        self._unbind_user(client_address, client_info)
+        if self.cluster:
+            self.cluster.unregister(client_address)
+        
+        queue = client_info['queue']
+        queue.close(flush=True)
+        queue.thread.join(timeout=self.queue_max_age)
+        if queue.thread.is_alive() or queue.evicted:
+            logger.warning(f"Could not flush {client_address} for handover; closing it")
+            return
+        
+        state = {
+            'address': client_address,
+            'aes_key': client_info['aes_key'],
+            'user_id': client_info['user_id'],
+            'token_expires': client_info['token_expires'],
+            'delivery_cursor': client_info['delivery_cursor'],
+            'buffer': buffer
+        }
+        with self.handover_lock:
+            if self.handover_conn is None:
+                return
+            try:
+                self.handover_conn.send(('connection', state))
+                reduction.send_handle(self.handover_conn, client_info['socket'].fileno(), None)
+                self.handed_over += 1
+            except OSError as e:
+                logger.error(f"Handing over {client_address} failed: {e}")
+    
+    def _take_over(self):
+        """
+        Connect to the server at handover_path and receive its listening socket
+        
+        Returns:
+            tuple: (handover connection, listening socket), or None if no server is there
+        """
+        try:
+            conn = Client(self.handover_path, 'AF_UNIX', authkey=self._handover_key())
+        except (FileNotFoundError, ConnectionRefusedError):
+            logger.info(f"No server at {self.handover_path} to take over from")
+            return None
+        except (AuthenticationError, OSError, EOFError) as e:
+            logger.error(f"Handover from {self.handover_path} failed: {e}")
+            return None
+        
+        try:
+            conn.recv()
+            listener = socket.socket(fileno=reduction.recv_handle(conn))
+        except (OSError, EOFError) as e:
+            logger.error(f"Handover from {self.handover_path} failed: {e}")
+            conn.close()
+            return None
+        logger.info(f"Took over the listening socket from {self.handover_path}")
+        return conn, listener
+    
+    def _receive_handover(self, conn):
+        """Adopt connections from the previous server until it is done, then await a successor"""
+        while True:
+            try:
+                item = conn.recv()
+                if item[0] != 'connection':
+                    break
+                client_socket = socket.socket(fileno=reduction.recv_handle(conn))
+            except (OSError, EOFError) as e:
+                logger.error(f"Handover ended early: {e}")
+                break
+            self._adopt(client_socket, item[1])
+        conn.close()
+        
+        logger.info(f"Adopted {self.adopted} connections")
+        if self.handover_path and self._accepting():
+            self._listen_for_handover()
+    
+    def _adopt(self, client_socket, state):
+        """Resume a handed-over connection with the session key it already holds"""
+        client_address = tuple(state['address'])
+        self._admit(client_address[0], force=True)
+        queue = OutboundQueue(
+            client_socket,
+            client_address,
+            max_bytes=self.queue_max_bytes,
+            max_age=self.queue_max_age,
+            stats=self.outbound_stats
+        )
+        queue.start()
+        client_info = {
+            'socket': client_socket,
+            'aes_key': state['aes_key'],
+            'queue': queue,
+            'last_seen': time.monotonic(),
+            'last_ping': 0.0,
+            'user_id': state['user_id'],
+            'token_expires': state['token_expires'],
+            'delivery_cursor': state['delivery_cursor']
+        }
+        self.adopted += 1
+        
+        client_thread = threading.Thread(
+            target=self._resume_client,
+            args=(client_socket, client_address, client_info, state['buffer'])
+        )
+        client_thread.daemon = True
+        client_thread.start()
+    
+    def broadcast_message(self, message, sender_address=None, relay=True):
+        """
+        Broadcast encrypted message to all connected clients
+        
+        Args:
+            message (str): Plaintext message
+            sender_address (tuple): Client to skip (optional)
+            relay (bool): Also deliver to clients held by other cluster workers
+        """
+        for address, client_info in list(self.clients.items()):
             if address != sender_address:
                 try:
-                    iv = CryptoService.generate_iv()
-                    ciphertext = CryptoService.encrypt_aes(message, client_info['aes_key'], iv)
-                    
-                    data = {
-                        'ciphertext': CryptoService.encode_base64(ciphertext),
-                        'iv': CryptoService.encode_base64(iv)
-                    }
-                    client_info['socket'].send(json.dumps(data).encode('utf-8'))
+                    self._send_encrypted(client_info, message)
                 except Exception as e:
                     logger.error(f"Error broadcasting to {address}: {e}")
+        
+        if relay and self.cluster:
+            self.cluster.broadcast(message, sender_address)
+    
+    def send_to_client(self, address, message, relay=True):
+        """
+        Send an encrypted message to a single client
+        
+        Args:
+            address (tuple): Client address as seen by the server
+            message (str): Plaintext message
+            relay (bool): Route through the cluster if the client is on another worker
+            
+        Returns:
+            bool: True if the message was queued locally or handed to the cluster
+        """
+        client_info = self.clients.get(address)
+        if client_info:
+            try:
+                return self._send_encrypted(client_info, message)
+            except Exception as e:
+                logger.error(f"Error sending to {address}: {e}")
+                return False
+        
+        if relay and self.cluster:
+            self.cluster.send(address, message)
+            return True
+        return False
+    
+    def send_to_user(self, user_id, message, relay=True):
+        """
+        Send an encrypted message to every device of an authenticated user
+        
+        If the user has no connection anywhere, the message is kept in the
+        pending delivery queue and drained when one of their devices
+        authenticates. In a cluster the supervisor makes that decision.
+        
+        Args:
+            user_id (int): Recipient user id
+            message (str): Plaintext message
+            relay (bool): Also deliver to the user's devices on other cluster workers
+            
+        Returns:
+            int: Number of local devices the message was sent to
+        """
+        with self.registry_lock:
+            devices = list(self.users.get(user_id, {}).items())
+        
+        delivered = 0
+        for address, client_info in devices:
+            try:
+                if self._send_encrypted(client_info, message):
+                    delivered += 1
+            except Exception as e:
+                logger.error(f"Error sending to {address}: {e}")
+        
+        if relay and self.cluster:
+            self.cluster.send_user(user_id, message)
+        elif relay and not delivered and self.delivery_store:
+            self.delivery_store.append(user_id, message)
+        return delivered
+    
+    def presence(self, user_ids):
+        """
+        Connected device counts for the given users on this server
+        
+        Returns:
+            dict: {user_id: devices} for users with at least one connection
+        """
+        with self.registry_lock:
+            return {user_id: len(self.users[user_id]) for user_id in user_ids if user_id in self.users}
+    
+    def connection_metrics(self):
+        """
+        Connection counts, limits and reaper counters for this server
+        
+        Returns:
+            dict: Live connection and thread counts plus lifetime counters
+        """
+        with self.connection_lock:
+            total = self.connection_count
+            distinct_ips = len(self.connections_by_ip)
+        established = len(self.clients)
+        return {
+            'connections': total,
+            'established': established,
+            'handshaking': max(0, total - established),
+            'distinct_ips': distinct_ips,
+            'max_connections': self.max_connections,
+            'max_connections_per_ip': self.max_connections_per_ip,
+            'online_users': len(self.users),
+            'rejected': self.rejected,
+            'reaped': self.reaped,
+            'auth_failures': self.auth_failures,
+            'draining': self.draining,
+            'handed_over': self.handed_over,
+            'adopted': self.adopted,
+            'threads': threading.active_count()
+        }
+    
+    def delivery_metrics(self):
+        """
+        Pending delivery queue counters, or None if store-and-forward is off
+        
+        Returns:
+            dict: Pending frames and users plus lifetime counters
+        """
+        return self.delivery_store.metrics() if self.delivery_store else None
+    
+    def queue_metrics(self):
+        """
+        Outbound queue depth and write counters for this server
+        
+        Returns:
+            dict: Aggregate depth across connections plus lifetime counters
+        """
+        depths = [info['queue'].depth() for info in list(self.clients.values())]
+        metrics = {
+            'connections': len(depths),
+            'queued_frames': sum(frames for frames, _, _ in depths),
+            'queued_bytes': sum(nbytes for _, nbytes, _ in depths),
+            'max_queue_bytes': max((nbytes for _, nbytes, _ in depths), default=0),
+            'oldest_frame_age': round(max((age for _, _, age in depths), default=0.0), 3),
+            'queue_limit_bytes': self.queue_max_bytes,
+            'queue_limit_age': self.queue_max_age
+        }
+        metrics.update(self.outbound_stats.to_dict())
+        return metrics
+    
+    def _send_encrypted(self, client_info, message):
+        """
+        Encrypt a message with the client's session key and queue it
+        
+        Returns:
+            bool: False if the client's queue is closed or it was evicted
+        """
+        iv = CryptoService.generate_iv()
+        ciphertext = CryptoService.encrypt_aes(message, client_info['aes_key'], iv)
+        
+        data = {
+            'ciphertext': CryptoService.encode_base64(ciphertext),
+            'iv': CryptoService.encode_base64(iv)
+        }
+        return client_info['queue'].put(json.dumps(data).encode('utf-8'))
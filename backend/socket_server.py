@@ -0,0 +1,70 @@
+import os
+import argparse
+import logging
+import signal
+from config import Config
+from services.socket_cluster import SocketCluster
+
+logging.basicConfig(level=logging.INFO)
+
+# The API's instance folder (Flask's default for app.py); relative delivery paths resolve here
+INSTANCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run the SecureLink socket server as a standalone process')
+    parser.add_argument('--host', default=Config.SOCKET_HOST, help='Interface to bind')
+    parser.add_argument('--port', type=int, default=Config.SOCKET_PORT, help='Port to bind')
+    parser.add_argument('--workers', type=int, default=Config.SOCKET_WORKERS,
+                        help='Worker processes sharing the port via SO_REUSEPORT')
+    parser.add_argument('--key-path', default=Config.SOCKET_KEY_PATH,
+                        help='PEM file holding the shared server private key')
+    parser.add_argument('--health-port', type=int, default=Config.SOCKET_HEALTH_PORT,
+                        help='HTTP port for the /health and /ready probes (0 disables)')
+    parser.add_argument('--health-host', default=Config.SOCKET_HEALTH_HOST,
+                        help='Interface for the probe server; it also serves /presence, so keep it private')
+    parser.add_argument('--takeover', action='store_true',
+                        help='Take the port and open connections over from the running server '
+                             '(zero-downtime restart; needs SOCKET_HANDOVER_PATH)')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    delivery_path = Config.SOCKET_DELIVERY_PATH
+    if delivery_path:
+        os.makedirs(INSTANCE_PATH, exist_ok=True)
+        delivery_path = os.path.join(INSTANCE_PATH, delivery_path)
+    cluster = SocketCluster(
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        key_path=args.key_path,
+        queue_max_bytes=Config.SOCKET_QUEUE_MAX_BYTES,
+        queue_max_age=Config.SOCKET_QUEUE_MAX_AGE,
+        heartbeat_interval=Config.SOCKET_HEARTBEAT_INTERVAL,
+        idle_timeout=Config.SOCKET_IDLE_TIMEOUT,
+        handshake_timeout=Config.SOCKET_HANDSHAKE_TIMEOUT,
+        max_connections=Config.SOCKET_MAX_CONNECTIONS,
+        max_connections_per_ip=Config.SOCKET_MAX_CONNECTIONS_PER_IP,
+        jwt_secret=Config.JWT_SECRET_KEY,
+        require_auth=Config.SOCKET_REQUIRE_AUTH,
+        delivery_path=delivery_path,
+        delivery_max_per_user=Config.SOCKET_DELIVERY_MAX_PER_USER,
+        delivery_max_age=Config.SOCKET_DELIVERY_MAX_AGE,
+        delivery_batch=Config.SOCKET_DELIVERY_BATCH,
+        drain_timeout=Config.SOCKET_DRAIN_TIMEOUT,
+        reconnect_window=Config.SOCKET_RECONNECT_WINDOW,
+        handover_path=Config.SOCKET_HANDOVER_PATH or None
+    )
+    cluster.start(takeover=args.takeover)
+    if args.health_port:
+        cluster.serve_health(args.health_host, args.health_port)
+    # Service managers stop with SIGTERM: drain instead of dropping every client
+    signal.signal(signal.SIGTERM, lambda signum, frame: cluster.request_drain())
+    try:
+        cluster.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cluster.stop()
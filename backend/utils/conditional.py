@@ -0,0 +1,50 @@
+import hashlib
+from functools import wraps
+from flask import request, current_app, make_response
+from flask_jwt_extended import get_jwt_identity
+
+# Responses are per user and must be revalidated on every use
+CACHE_CONTROL = 'private, no-cache'
+
+
+def make_etag(parts):
+    """Weak validator for a response, from the values that determine its body"""
+    key = repr((request.full_path, get_jwt_identity(), parts)).encode('utf-8')
+    return hashlib.sha256(key).hexdigest()[:32]
+
+
+def conditional(validator):
+    """
+    Answer a GET with 304 Not Modified when the client's ETag still matches
+
+    Apply below @jwt_required(). The validator receives the view's
+    arguments and returns a tuple of values that changes whenever the
+    response would, such as row timestamps, max ids and counts, read with
+    a cheap query instead of building the body. A matching If-None-Match
+    skips the view entirely; otherwise the view runs and its 200 response
+    is tagged. A validator returning None leaves the response uncached.
+
+    Args:
+        validator (callable): View arguments -> tuple or None
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            parts = validator(*args, **kwargs)
+            if parts is None:
+                return view(*args, **kwargs)
+
+            etag = make_etag(parts)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = CACHE_CONTROL
+            response.vary.add('Authorization')
+            return response
+        return wrapper
+    return decorator
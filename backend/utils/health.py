@@ -0,0 +1,35 @@
+import threading
+
+
+class RequestCapacity:
+    """In-flight request accounting for the readiness probe"""
+
+    def __init__(self, threads):
+        self.threads = threads
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+
+    def begin(self):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def end(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def to_dict(self):
+        """
+        Convert capacity to dictionary
+
+        The probe's own request is not counted against capacity.
+        """
+        with self.lock:
+            busy = max(0, self.in_flight - 1)
+            return {
+                'threads': self.threads,
+                'busy': busy,
+                'available': max(0, self.threads - busy),
+                'peak': self.peak
+            }
@@ -0,0 +1,38 @@
+import time
+
+# Imported first by app.py, so this approximates the start of the import phase
+IMPORT_STARTED = time.perf_counter()
+
+
+class StartupReport:
+    """Wall-clock time spent in each phase of application startup"""
+
+    def __init__(self, origin=IMPORT_STARTED):
+        self.origin = origin
+        self.last = origin
+        self.phases = []
+        self.time_to_first_request = None
+
+    def mark(self, phase):
+        """Record the time elapsed since the previous mark under a phase name"""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def first_request(self):
+        """Record time-to-first-request; later calls are ignored"""
+        if self.time_to_first_request is None:
+            self.time_to_first_request = time.perf_counter() - self.origin
+
+    def total(self):
+        """Seconds from origin to the last mark"""
+        return self.last - self.origin
+
+    def to_dict(self):
+        """Convert report to dictionary (milliseconds)"""
+        return {
+            'phases_ms': [[phase, round(seconds * 1000, 3)] for phase, seconds in self.phases],
+            'ready_ms': round(self.total() * 1000, 3),
+            'first_request_ms': round(self.time_to_first_request * 1000, 3)
+            if self.time_to_first_request is not None else None
+        }
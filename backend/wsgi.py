@@ -0,0 +1,11 @@
+"""
+WSGI entry point for production serving
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The socket server is not started here; run it separately with
+socket_server.py so the two can be scaled independently.
+"""
+from app import create_app
+
+app = create_app()
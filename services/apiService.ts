@@ -1,10 +1,15 @@
-import axios, { AxiosInstance, AxiosError } from 'axios';
+import axios, { AxiosInstance, AxiosError, InternalAxiosRequestConfig } from 'axios';
 
 // Vite environment variable type declaration
 const API_BASE_URL = (import.meta as any).env?.VITE_API_URL || 'http://localhost:5000';
 
+// A 401 from these means bad credentials, not an expired access token
+const NO_REFRESH_URLS = ['/api/auth/login', '/api/auth/register', '/api/auth/refresh'];
+
 class ApiService {
     private api: AxiosInstance;
+    // Shared by every request that hits a 401 while a refresh is running
+    private refreshing: Promise<string | null> | null = null;
 
     constructor() {
         this.api = axios.create({
@@ -30,9 +35,20 @@ class ApiService {
         this.api.interceptors.response.use(
             (response) => response,
             async (error: AxiosError) => {
+                const request = error.config as (InternalAxiosRequestConfig & { _retried?: boolean }) | undefined;
                 if (error.response?.status === 401) {
-                    // Token expired or invalid
+                    // Access token expired: refresh it once and replay the request
+                    if (request && !request._retried && !NO_REFRESH_URLS.includes(request.url ?? '')) {
+                        request._retried = true;
+                        const token = await this.refreshAccessToken();
+                        if (token) {
+                            request.headers.Authorization = `Bearer ${token}`;
+                            return this.api.request(request);
+                        }
+                    }
+                    // Refresh token expired or revoked
                     localStorage.removeItem('access_token');
+                    localStorage.removeItem('refresh_token');
                     localStorage.removeItem('user');
                     window.location.href = '/#/login';
                 }
@@ -41,6 +57,39 @@ class ApiService {
         );
     }
 
+    // Exchange the stored refresh token for new tokens; concurrent callers share one request
+    refreshAccessToken(): Promise<string | null> {
+        if (!this.refreshing) {
+            this.refreshing = this.requestRefresh().finally(() => {
+                this.refreshing = null;
+            });
+        }
+        return this.refreshing;
+    }
+
+    private async requestRefresh(): Promise<string | null> {
+        const refreshToken = localStorage.getItem('refresh_token');
+        if (!refreshToken) {
+            return null;
+        }
+        try {
+            // Bare axios, so a failed refresh does not re-enter the interceptor
+            const response = await axios.post<{ access_token: string; refresh_token?: string }>(
+                `${API_BASE_URL}/api/auth/refresh`,
+                {},
+                { headers: { Authorization: `Bearer ${refreshToken}` } }
+            );
+            localStorage.setItem('access_token', response.data.access_token);
+            // Absent when another tab already rotated the refresh token
+            if (response.data.refresh_token) {
+                localStorage.setItem('refresh_token', response.data.refresh_token);
+            }
+            return response.data.access_token;
+        } catch {
+            return null;
+        }
+    }
+
     // Generic request methods
     async get<T>(url: string, params?: any): Promise<T> {
         const response = await this.api.get<T>(url, { params });
@@ -57,6 +106,24 @@ class ApiService {
         return response.data;
     }
 
+    // Raw request body, e.g. one chunk of an encrypted attachment
+    async putBinary<T>(url: string, data: Blob | ArrayBuffer, params?: any): Promise<T> {
+        const response = await this.api.put<T>(url, data, {
+            params,
+            headers: { 'Content-Type': 'application/octet-stream' },
+        });
+        return response.data;
+    }
+
+    // Inclusive byte range, sent as an HTTP Range header
+    async getBinary(url: string, range?: { start: number; end: number }): Promise<ArrayBuffer> {
+        const response = await this.api.get<ArrayBuffer>(url, {
+            responseType: 'arraybuffer',
+            headers: range ? { Range: `bytes=${range.start}-${range.end}` } : undefined,
+        });
+        return response.data;
+    }
+
     async delete<T>(url: string): Promise<T> {
         const response = await this.api.delete<T>(url);
         return response.data;
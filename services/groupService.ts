@@ -0,0 +1,80 @@
+import apiService from './apiService';
+
+export interface Group {
+    id: number;
+    name: string;
+    owner_id: number;
+    key_version: number;
+    rekey_required: boolean;
+    created_at: string;
+}
+
+export interface GroupMessage {
+    id: number;
+    group_id: number;
+    sender_id: number;
+    sender_username?: string | null;
+    key_version: number;
+    encrypted_content: string;
+    iv: string;
+    algorithm: string;
+    timestamp: string;
+}
+
+// Group key wrapped with each member's RSA public key, by username
+export type KeyEnvelopes = Record<string, string>;
+
+export interface GroupHistoryPage {
+    messages: GroupMessage[];
+    // The reader's envelope for every key version used on the page
+    keys: Record<string, string>;
+    next_cursor: number | null;
+}
+
+export interface SendGroupMessageData {
+    encrypted_content: string;
+    iv: string;
+    key_version: number;
+    algorithm?: string;
+}
+
+class GroupService {
+    async createGroup(name: string, envelopes: KeyEnvelopes): Promise<{ group: Group }> {
+        return apiService.post('/api/groups', { name, envelopes });
+    }
+
+    async getGroups(): Promise<{ groups: Group[] }> {
+        return apiService.get('/api/groups');
+    }
+
+    async getGroup(id: number): Promise<{
+        group: Group;
+        members: { id: number; username: string }[];
+        keys: Record<string, string>;
+    }> {
+        return apiService.get(`/api/groups/${id}`);
+    }
+
+    async addMember(id: number, username: string, encryptedKey: string): Promise<{ group: Group }> {
+        return apiService.post(`/api/groups/${id}/members`, { username, encrypted_key: encryptedKey });
+    }
+
+    async removeMember(id: number, username: string): Promise<{ group: Group }> {
+        return apiService.delete(`/api/groups/${id}/members/${encodeURIComponent(username)}`);
+    }
+
+    async rotateKey(id: number, keyVersion: number, envelopes: KeyEnvelopes): Promise<{ group: Group }> {
+        return apiService.post(`/api/groups/${id}/keys`, { key_version: keyVersion, envelopes });
+    }
+
+    async sendMessage(id: number, data: SendGroupMessageData): Promise<{ message: string; data: GroupMessage }> {
+        return apiService.post(`/api/groups/${id}/messages`, data);
+    }
+
+    async getHistory(id: number, before?: number, limit?: number): Promise<GroupHistoryPage> {
+        return apiService.get(`/api/groups/${id}/messages`, { before, limit });
+    }
+}
+
+export const groupService = new GroupService();
+export default groupService;
@@ -1,3 +1,4 @@
+import { AxiosError } from 'axios';
 import apiService from './apiService';
 
 export interface Message {
@@ -11,6 +12,14 @@ export interface Message {
     encrypted_aes_key: string;
     algorithm: string;
     timestamp: string;
+    expires_at?: string | null;
+    attachment_id?: number | null;
+    archived?: boolean;
+}
+
+export interface HistoryPage {
+    messages: Message[];
+    next_cursor: number | null;
 }
 
 export interface SendMessageData {
@@ -19,6 +28,39 @@ export interface SendMessageData {
     iv: string;
     encrypted_aes_key: string;
     algorithm?: string;
+    attachment_id?: number;
+}
+
+export interface Attachment {
+    id: number;
+    owner_id: number;
+    size: number;
+    sha256: string | null;
+    status: 'uploading' | 'complete';
+    received: number;
+    created_at: string;
+    completed_at: string | null;
+}
+
+interface AttachmentStatus {
+    attachment: Attachment;
+    chunk_size: number;
+}
+
+export interface ConversationSummary {
+    id: number;
+    peer: { id: number; username: string | null };
+    last_message_id: number | null;
+    last_message_at: string | null;
+    last_message: Message | null;
+    unread_count: number;
+    last_read_message_id: number;
+    cursor: number;
+}
+
+export interface InboxPage {
+    conversations: ConversationSummary[];
+    next_cursor: number | null;
 }
 
 class MessageService {
@@ -26,8 +68,51 @@ class MessageService {
         return apiService.post('/api/messages/send', data);
     }
 
-    async getHistory(): Promise<{ messages: Message[] }> {
-        return apiService.get('/api/messages/history');
+    async getHistory(before?: number, limit?: number): Promise<HistoryPage> {
+        return apiService.get('/api/messages/history', { before, limit });
+    }
+
+    async getInbox(before?: number, limit?: number): Promise<InboxPage> {
+        return apiService.get('/api/conversations', { before, limit });
+    }
+
+    async markConversationRead(username: string, lastReadMessageId?: number): Promise<{ conversation: unknown }> {
+        return apiService.post(`/api/conversations/${encodeURIComponent(username)}/read`,
+            lastReadMessageId !== undefined ? { last_read_message_id: lastReadMessageId } : {});
+    }
+
+    // Uploads already-encrypted bytes; pass attachmentId to resume an interrupted upload
+    async uploadAttachment(ciphertext: Blob, attachmentId?: number): Promise<Attachment> {
+        let { attachment, chunk_size } = attachmentId === undefined
+            ? await apiService.post<AttachmentStatus>('/api/attachments', { size: ciphertext.size })
+            : await apiService.get<AttachmentStatus>(`/api/attachments/${attachmentId}`);
+
+        while (attachment.status !== 'complete') {
+            const offset = attachment.received;
+            try {
+                ({ attachment } = await apiService.putBinary<{ attachment: Attachment }>(
+                    `/api/attachments/${attachment.id}/content`,
+                    ciphertext.slice(offset, offset + chunk_size),
+                    { offset }
+                ));
+            } catch (error) {
+                // The server expects another offset, e.g. a retried chunk had already arrived
+                const received = (error as AxiosError<{ received?: number }>).response?.data?.received;
+                if (received === undefined || received === offset) {
+                    throw error;
+                }
+                attachment = { ...attachment, received };
+            }
+        }
+        return attachment;
+    }
+
+    async downloadAttachment(id: number, range?: { start: number; end: number }): Promise<ArrayBuffer> {
+        return apiService.getBinary(`/api/attachments/${id}/content`, range);
+    }
+
+    async deleteAttachment(id: number): Promise<{ message: string }> {
+        return apiService.delete(`/api/attachments/${id}`);
     }
 
     async getMessage(id: number): Promise<{ message: Message }> {